@@ -5,6 +5,8 @@ import time
 import logging
 import csv
 import uuid
+import argparse
+import threading
 from pathlib import Path
 from datetime import datetime
 
@@ -14,6 +16,8 @@ from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
 from cflib.crazyflie.log import LogConfig
 from cflib.utils import uri_helper
 
+from qi_charging_deck_demo import timebase
+
 # ------------------------------------------------------------
 # Verbindung
 # ------------------------------------------------------------
@@ -33,21 +37,208 @@ def set_all_motors(cf, val: int):
     cf.param.set_value('motorPowerSet.m3', str(val))
     cf.param.set_value('motorPowerSet.m4', str(val))
 
+def pct_to_raw(pct: float) -> int:
+    return max(0, min(PWM_MAX, int(round(pct * PWM_MAX))))
+
+# ------------------------------------------------------------
+# Temperaturgeregelter Lüfterbetrieb (--mode temp)
+# ------------------------------------------------------------
+KICK_PERCENT = 0.20                # Anlauf-PWM aus dem Stillstand
+KICK_S = 0.15
+TEMP_SETPOINT_C = 34.0             # Soll-Temperatur baro.temp
+TEMP_OFF_BAND_C = 1.0              # Abschalten erst unterhalb Soll - Band
+CTRL_KP = 0.02                     # PWM-Anteil pro K
+CTRL_KI = 0.0005                   # PWM-Anteil pro K*s
+CTRL_PWM_MIN = 0.03                # kleinste PWM, bei der die Rotoren sicher drehen
+CTRL_PWM_MAX = 0.12
+CTRL_ICHG_GAIN = 0.0               # optionale Vorsteuerung: PWM-Anteil pro A Ladestrom
+PWM_WRITE_MIN_INTERVAL_S = 1.0     # Rate-Limit für motorPowerSet-Writes
+PWM_WRITE_MIN_DELTA = 0.005        # kleinere Änderungen werden nicht geschrieben
+
+
+class TempFanController:
+    """
+    Begrenzter PI-Regler: PWM-Anteil aus baro.temp (und optional Ladestrom).
+    - Integrator nur in [0, pwm_max] und ohne Aufintegrieren in der Sättigung
+    - unterhalb pwm_min entweder pwm_min (solange T > Soll - Band) oder aus
+    """
+
+    def __init__(self, setpoint_c=TEMP_SETPOINT_C, kp=CTRL_KP, ki=CTRL_KI,
+                 pwm_min=CTRL_PWM_MIN, pwm_max=CTRL_PWM_MAX,
+                 off_band_c=TEMP_OFF_BAND_C, ichg_gain=CTRL_ICHG_GAIN):
+        self.setpoint_c = setpoint_c
+        self.kp = kp
+        self.ki = ki
+        self.pwm_min = pwm_min
+        self.pwm_max = pwm_max
+        self.off_band_c = off_band_c
+        self.ichg_gain = ichg_gain
+        self.integ = 0.0
+        self.out = 0.0
+
+    def update(self, temp_c, ichg, dt_s: float) -> float:
+        if temp_c is None:
+            return self.out
+        e = float(temp_c) - self.setpoint_c
+        ff = self.ichg_gain * max(0.0, float(ichg)) if ichg is not None else 0.0
+        u = self.kp * e + self.integ + ff
+
+        # Anti-Windup: nicht weiter in die Sättigung integrieren
+        if not ((u >= self.pwm_max and e > 0) or (u <= 0.0 and e < 0)):
+            self.integ = min(self.pwm_max, max(0.0, self.integ + self.ki * e * dt_s))
+            u = self.kp * e + self.integ + ff
+        u = min(self.pwm_max, max(0.0, u))
+
+        # Mindestdrehzahl mit Hysterese
+        if u < self.pwm_min:
+            keep = self.out > 0.0 and e > -self.off_band_c
+            u = self.pwm_min if keep else 0.0
+        self.out = u
+        return u
+
+
+class FanActuator:
+    """
+    Setzt motorPowerSet ohne zu blockieren:
+    - Kick aus dem Stillstand (KICK_PERCENT für KICK_S), danach Ziel-PWM
+    - Writes höchstens alle min_interval_s und nur ab min_delta Änderung;
+      Abschalten (0) wird sofort geschrieben
+    """
+
+    def __init__(self, cf, min_interval_s=PWM_WRITE_MIN_INTERVAL_S,
+                 min_delta=PWM_WRITE_MIN_DELTA):
+        self.cf = cf
+        self.min_interval_s = min_interval_s
+        self.min_delta = min_delta
+        self.cmd_pct = 0.0          # aktuell an den Motoren anliegend
+        self.kick_until = None
+        self.last_write = None
+        self.writes = 0
+        self.kicks = 0
+
+    def _write(self, pct: float, now: float):
+        set_all_motors(self.cf, pct_to_raw(pct))
+        self.cmd_pct = pct
+        self.last_write = now
+        self.writes += 1
+
+    def apply(self, target_pct: float, now: float):
+        if self.kick_until is not None:
+            if target_pct <= 0.0:
+                self.kick_until = None
+                self._write(0.0, now)
+            elif now >= self.kick_until:
+                self.kick_until = None
+                self._write(target_pct, now)
+            return
+
+        if target_pct <= 0.0:
+            if self.cmd_pct > 0.0:
+                self._write(0.0, now)
+            return
+
+        if self.cmd_pct <= 0.0:
+            # Re-Kick: Rotoren laufen aus niedriger PWM nicht sicher an
+            self._write(max(KICK_PERCENT, target_pct), now)
+            self.kick_until = now + KICK_S
+            self.kicks += 1
+            return
+
+        if abs(target_pct - self.cmd_pct) < self.min_delta:
+            return
+        if self.last_write is not None and now - self.last_write < self.min_interval_s:
+            return
+        self._write(target_pct, now)
+
+
+# ------------------------------------------------------------
+# PWM-Sweep (--mode sweep): mehrere Segmente in einer Sitzung
+# ------------------------------------------------------------
+SWEEP_SCHEDULE = "0:300,0.04:600,0.07:600,0.10:600"   # PWM-Anteil:Dauer_s, ...
+SWEEP_SETTLE_S = 60.0              # Einschwingzeit je Segment, nicht in der Auswertung
+FAN_MOTORS = 4
+FAN_I_FULL_A = 1.0                 # grobe Annahme: Motorstrom bei 100 % PWM (Rotor frei)
+FAN_POWER_EXP = 2.0                # Leistung ~ PWM^exp (Propellerlast)
+
+
+def parse_schedule(text: str):
+    """'0.04:600,0.07:600' -> [(0.04, 600.0), (0.07, 600.0)]"""
+    segments = []
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        pct, dur = item.split(":")
+        pct, dur = float(pct), float(dur)
+        if not 0.0 <= pct <= 1.0 or dur <= 0:
+            raise ValueError(f"Ungültiges Segment: {item}")
+        segments.append((pct, dur))
+    if not segments:
+        raise ValueError("Leerer Sweep-Plan")
+    return segments
+
+
+def fan_power_w(pct: float, vbat_v: float) -> float:
+    """Geschätzte elektrische Lüfterleistung aller Motoren."""
+    return FAN_MOTORS * vbat_v * FAN_I_FULL_A * pct ** FAN_POWER_EXP
+
+
+class SweepSchedule:
+    """Liefert zu einem Zeitpunkt Segmentindex, Phase (settle/measure) und Ziel-PWM."""
+
+    def __init__(self, segments, settle_s=SWEEP_SETTLE_S):
+        self.segments = segments
+        self.settle_s = settle_s
+        self.start = None
+        self.ends = []
+        acc = 0.0
+        for _, dur in segments:
+            acc += dur
+            self.ends.append(acc)
+
+    @property
+    def total_s(self) -> float:
+        return self.ends[-1]
+
+    def at(self, now: float):
+        """(index, phase, pct) oder None nach dem letzten Segment."""
+        if self.start is None:
+            self.start = now
+        el = now - self.start
+        for i, end in enumerate(self.ends):
+            if el < end:
+                seg_start = end - self.segments[i][1]
+                phase = "settle" if el - seg_start < self.settle_s else "measure"
+                return i, phase, self.segments[i][0]
+        return None
+
 # ------------------------------------------------------------
 # Logging-Konfiguration
 # ------------------------------------------------------------
 LOG_PERIOD_MS = 200  # Abtastrate der Telemetrie
 LOG_DIR = Path("logs")
 LOG_DIR.mkdir(parents=True, exist_ok=True)
+# Referenzläufe mit fester PWM (Repo: experiments/sensor-logs)
+REFERENCE_LOG_DIR = Path(__file__).resolve().parents[2] / "experiments" / "sensor-logs"
 
 RUN_ID = datetime.now().strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
 CSV_PATH = LOG_DIR / f"cf_powerlog_{RUN_ID}.csv"
 CSV_HEADER = ["t_host_s", "baro.temp_C", "pm.batteryLevel_pct",
-              "pm.chargeCurrent_mA", "pm.state", "pm.vbat_V"]
+              "pm.chargeCurrent_mA", "pm.state", "pm.vbat_V", "pwm_cmd_pct",
+              "segment", "phase", "t_fw_ms", "t_fw_aligned_s", "latency_ms", "pwm_mode"]
 
 csv_file = None
 csv_writer = None
-t0 = None
+t0 = None                          # timebase.now() beim Start des Loggings
+clock_sync = timebase.ClockSync()  # Firmware-Zeitstempel -> Host-Zeitbasis
+controller = None                  # TempFanController im Modus "temp"
+actuator = None                    # FanActuator
+pwm_target = PWM_PERCENT
+_last_fw_s = None
+seg_tag = ("", "")                 # (Segment, Phase) für die CSV im Modus "sweep"
+pwm_mode = "fixed"                 # --mode, steht in jeder CSV-Zeile (Klassifikation im Report)
+_ctrl_lock = threading.Lock()
+_csv_lock = threading.Lock()   # lg.stop() ist asynchron: Callbacks können nach close_csv() noch eintreffen
 
 def _fmt(val, ndigits=3):
     try:
@@ -62,18 +253,23 @@ def init_csv():
     csv_writer.writerow(CSV_HEADER)
 
 def close_csv():
-    global csv_file
-    if csv_file:
-        csv_file.flush()
-        csv_file.close()
-        csv_file = None
+    global csv_file, csv_writer
+    with _csv_lock:
+        csv_writer = None
+        if csv_file:
+            csv_file.flush()
+            csv_file.close()
+            csv_file = None
 
 def on_log_data(timestamp, data, logconf):
     """Callback je Stichprobe: Konsole + CSV."""
     if csv_writer is None:
         return
-    t = (time.time() - t0) if t0 is not None else 0.0
-    global vbat, state
+    ts = clock_sync.update(timestamp)
+    base = t0 if t0 is not None else ts.host_s
+    t = ts.host_s - base               # Empfangszeit (monoton)
+    t_fw = ts.aligned_s - base         # Firmware-Zeit auf der Host-Zeitachse
+    global vbat, state, pwm_target, _last_fw_s
 
     batt = data.get("pm.batteryLevel")
     temp = data.get("baro.temp")
@@ -81,19 +277,38 @@ def on_log_data(timestamp, data, logconf):
     state = data.get("pm.state")
     vbat = data.get("pm.vbat")
 
+    # Regler je Stichprobe (dt aus Firmware-Zeitstempel)
+    if controller is not None:
+        dt = ts.fw_s - _last_fw_s if _last_fw_s is not None else LOG_PERIOD_MS / 1000.0
+        with _ctrl_lock:
+            pwm_target = controller.update(temp, ichg, max(0.0, dt))
+    _last_fw_s = ts.fw_s
+    pwm_cmd = actuator.cmd_pct if actuator is not None else 0.0
+
     # Konsole
     print(f"[{t:7.2f}s] T={_fmt(temp,2)} °C | Vbat={_fmt(vbat,3)} V | "
-          f"Batt={_fmt(batt,1)} % | Ichg={_fmt(ichg,1)} mA | pm.state={int(state) if state is not None else 'nan'}")
+          f"Batt={_fmt(batt,1)} % | Ichg={_fmt(ichg,1)} mA | pm.state={int(state) if state is not None else 'nan'} | "
+          f"PWM={pwm_cmd*100:.1f} %")
 
     # CSV (Werte in definierten Einheiten)
-    csv_writer.writerow([
-        f"{t:.3f}",
-        _fmt(temp,3),
-        _fmt(batt,3),
-        _fmt(ichg,3),
-        int(state) if state is not None else "",
-        _fmt(vbat,3),
-    ])
+    with _csv_lock:
+        if csv_writer is None:
+            return
+        csv_writer.writerow([
+            f"{t:.3f}",
+            _fmt(temp,3),
+            _fmt(batt,3),
+            _fmt(ichg,3),
+            int(state) if state is not None else "",
+            _fmt(vbat,3),
+            _fmt(pwm_cmd * 100.0, 2),
+            seg_tag[0],
+            seg_tag[1],
+            f"{ts.fw_s * 1000.0:.0f}",
+            f"{t_fw:.3f}",
+            f"{ts.latency_ms:.1f}",
+            pwm_mode,
+        ])
 
 def on_log_error(logconf, msg):
     print(f"[LOG][ERROR] {msg}")
@@ -129,15 +344,204 @@ def safe_stop(cf, retries: int = 5, delay_s: float = 0.05):
     time.sleep(0.3)
 
 
+# ------------------------------------------------------------
+# Auswertung am Ende: Vergleich mit Fixed-PWM-Läufen
+# ------------------------------------------------------------
+def _row_time(r) -> float:
+    """Firmware-Zeit auf Host-Achse, falls vorhanden; ältere Logs nur t_host_s."""
+    return float(r.get("t_fw_aligned_s") or r["t_host_s"])
+
+def _log_mode(fieldnames, first_row):
+    """
+    PWM-Modus eines Powerlogs aus der Spalte pwm_mode. Logs ohne pwm_cmd_pct stammen
+    aus der Zeit vor den Regelmodi und liefen immer mit fester PWM; Logs mit PWM-Spalte,
+    aber ohne pwm_mode, lassen sich nicht zuordnen (None).
+    """
+    if "pwm_mode" in fieldnames:
+        return (first_row or {}).get("pwm_mode") or None
+    return "fixed" if "pwm_cmd_pct" not in fieldnames else None
+
+def summarize_run(path: Path):
+    """Kennzahlen eines Powerlogs: Netto-Laderate, Peak-Temperatur, mittlere PWM."""
+    t, v, temp, ichg, st, pwm = [], [], [], [], [], []
+    mode = None
+    with Path(path).open(newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for r in reader:
+            if mode is None:
+                mode = _log_mode(reader.fieldnames, r)
+            try:
+                t.append(_row_time(r))
+                v.append(float(r["pm.vbat_V"]))
+                temp.append(float(r["baro.temp_C"]))
+                ichg.append(float(r["pm.chargeCurrent_mA"]))
+                st.append(int(r["pm.state"]) if r["pm.state"] else -1)
+                pwm.append(float(r["pwm_cmd_pct"]) if r.get("pwm_cmd_pct") else float("nan"))
+            except (KeyError, ValueError):
+                continue
+    if len(t) < 2:
+        return None
+
+    # Laderate ab dem ersten Lade-Sample (pm.state == 1)
+    i0 = next((i for i, s in enumerate(st) if s == 1), 0)
+    dur = t[-1] - t[i0]
+    rate = (v[-1] - v[i0]) * 1000.0 / (dur / 60.0) if dur > 0 else float("nan")
+    chg = ichg[i0:]
+    pwm_valid = [p for p in pwm if p == p]
+    return {
+        "file": Path(path).name,
+        "duration_s": t[-1] - t[0],
+        "vbat_start_V": v[i0],
+        "vbat_end_V": v[-1],
+        "rate_mV_min": rate,
+        "ichg_mean": sum(chg) / len(chg) if chg else float("nan"),
+        "temp_peak_C": max(temp),
+        "pwm_mean_pct": sum(pwm_valid) / len(pwm_valid) if pwm_valid else float("nan"),
+        "pwm_mode": mode,
+    }
+
+def print_report(run_path: Path, compare_paths):
+    own = summarize_run(run_path)
+    if own is None:
+        print("[REPORT] Zu wenige Samples für eine Auswertung.")
+        return
+    others = [summarize_run(p) for p in compare_paths if Path(p).resolve() != Path(run_path).resolve()]
+    fixed = [o for o in others if o is not None and o["pwm_mode"] == "fixed"]
+    unknown = [o["file"] for o in others if o is not None and o["pwm_mode"] is None]
+
+    print("\n[REPORT] Netto-Laderate und Peak-Temperatur")
+    print(f"{'Lauf':40s} {'Dauer s':>8s} {'mV/min':>8s} {'Ichg':>7s} {'Tmax °C':>8s} {'PWM %':>6s}")
+    for r in [own] + fixed:
+        pwm = f"{r['pwm_mean_pct']:6.2f}" if r["pwm_mean_pct"] == r["pwm_mean_pct"] else f"{'-':>6s}"
+        print(f"{r['file'][:40]:40s} {r['duration_s']:8.0f} {r['rate_mV_min']:8.2f} "
+              f"{r['ichg_mean']:7.3f} {r['temp_peak_C']:8.2f} {pwm}")
+    if unknown:
+        print(f"[REPORT] {len(unknown)} Läufe ohne pwm_mode-Spalte nicht zugeordnet: {', '.join(unknown[:5])}"
+              + (" ..." if len(unknown) > 5 else ""))
+    if not fixed:
+        print("[REPORT] Keine Fixed-PWM-Läufe zum Vergleich gefunden.")
+        return
+    n = len(fixed)
+    rate_ref = sum(r["rate_mV_min"] for r in fixed) / n
+    temp_ref = sum(r["temp_peak_C"] for r in fixed) / n
+    print(f"[REPORT] gegenüber Mittel aus {n} Fixed-PWM-Läufen: "
+          f"Laderate {own['rate_mV_min'] - rate_ref:+.2f} mV/min, "
+          f"Peak-Temperatur {own['temp_peak_C'] - temp_ref:+.2f} K")
+
+
+def _slope(xs, ys):
+    """Steigung der Ausgleichsgeraden (kleinste Quadrate)."""
+    n = len(xs)
+    if n < 2:
+        return float("nan")
+    mx = sum(xs) / n
+    my = sum(ys) / n
+    sxx = sum((x - mx) ** 2 for x in xs)
+    if sxx == 0:
+        return float("nan")
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx
+
+def summarize_segments(path: Path):
+    """Kennzahlen je Sweep-Segment (nur Phase 'measure'), Lüfterenergie über das ganze Segment."""
+    segs = {}
+    with Path(path).open(newline="", encoding="utf-8") as f:
+        prev_t = None
+        for r in csv.DictReader(f):
+            try:
+                t = _row_time(r)
+                v = float(r["pm.vbat_V"])
+                seg = r.get("segment") or ""
+                pwm = float(r["pwm_cmd_pct"]) / 100.0
+            except (KeyError, ValueError):
+                continue
+            dt = t - prev_t if prev_t is not None else 0.0
+            prev_t = t
+            if seg == "":
+                continue
+            d = segs.setdefault(seg, {"t": [], "v": [], "temp": [], "ichg": [], "pwm": [], "energy_J": 0.0})
+            d["energy_J"] += fan_power_w(pwm, v) * dt
+            if r.get("phase") != "measure":
+                continue
+            try:
+                d["temp"].append(float(r["baro.temp_C"]))
+                d["ichg"].append(float(r["pm.chargeCurrent_mA"]))
+            except ValueError:
+                continue
+            d["t"].append(t)
+            d["v"].append(v)
+            d["pwm"].append(pwm)
+
+    out = []
+    for seg in sorted(segs, key=int):
+        d = segs[seg]
+        n = len(d["t"])
+        out.append({
+            "segment": int(seg),
+            "pwm_pct": 100.0 * sum(d["pwm"]) / n if n else float("nan"),
+            "samples": n,
+            "ichg_mean": sum(d["ichg"]) / n if n else float("nan"),
+            "dv_mV_min": _slope(d["t"], d["v"]) * 1000.0 * 60.0,
+            "dtemp_K_min": _slope(d["t"], d["temp"]) * 60.0,
+            "fan_energy_J": d["energy_J"],
+        })
+    return out
+
+def print_sweep_report(path: Path):
+    rows = summarize_segments(path)
+    print("\n[SWEEP] Auswertung je Segment (ohne Einschwingphase)")
+    print(f"{'Seg':>3s} {'PWM %':>6s} {'N':>5s} {'Ichg':>7s} {'dV/dt mV/min':>13s} "
+          f"{'dT/dt K/min':>12s} {'E_fan J':>8s}")
+    for r in rows:
+        print(f"{r['segment']:3d} {r['pwm_pct']:6.2f} {r['samples']:5d} {r['ichg_mean']:7.3f} "
+              f"{r['dv_mV_min']:13.2f} {r['dtemp_K_min']:12.3f} {r['fan_energy_J']:8.1f}")
+    print(f"[SWEEP] E_fan geschätzt mit {FAN_MOTORS} x {FAN_I_FULL_A:.1f} A x PWM^{FAN_POWER_EXP:g} x Vbat")
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Rotoren als Lüfter während des Qi-Ladens")
+    ap.add_argument("--mode", choices=("fixed", "temp", "sweep"), default="fixed",
+                    help="fixed: konstante PWM_PERCENT; temp: PI-Regelung auf baro.temp; "
+                         "sweep: PWM-Plan aus --schedule")
+    ap.add_argument("--setpoint", type=float, default=TEMP_SETPOINT_C, help="Soll-Temperatur in °C")
+    ap.add_argument("--kp", type=float, default=CTRL_KP)
+    ap.add_argument("--ki", type=float, default=CTRL_KI)
+    ap.add_argument("--pwm-min", type=float, default=CTRL_PWM_MIN, help="Mindest-PWM-Anteil (0..1)")
+    ap.add_argument("--pwm-max", type=float, default=CTRL_PWM_MAX, help="Maximaler PWM-Anteil (0..1)")
+    ap.add_argument("--ichg-gain", type=float, default=CTRL_ICHG_GAIN,
+                    help="Vorsteuerung aus pm.chargeCurrent (PWM-Anteil pro A, 0 = aus)")
+    ap.add_argument("--schedule", default=SWEEP_SCHEDULE,
+                    help="Sweep-Plan 'pwm:dauer_s,...' (PWM als Anteil 0..1)")
+    ap.add_argument("--settle", type=float, default=SWEEP_SETTLE_S,
+                    help="Einschwingzeit je Segment in s (nicht ausgewertet)")
+    ap.add_argument("--compare", nargs="*", default=None,
+                    help="Powerlogs für den Vergleich (Standard: alle in logs/ und experiments/sensor-logs)")
+    ap.add_argument("--no-report", action="store_true", help="Keine Auswertung am Ende")
+    return ap.parse_args()
+
+
 # ------------------------------------------------------------
 # Hauptprogramm
 # ------------------------------------------------------------
 if __name__ == "__main__":
+    args = parse_args()
+    pwm_mode = args.mode
     logging.basicConfig(level=logging.INFO)
     cflib.crtp.init_drivers()
 
+    if args.mode == "temp":
+        controller = TempFanController(setpoint_c=args.setpoint, kp=args.kp, ki=args.ki,
+                                       pwm_min=args.pwm_min, pwm_max=args.pwm_max,
+                                       ichg_gain=args.ichg_gain)
+        pwm_target = 0.0
+    sweep = None
+    if args.mode == "sweep":
+        try:
+            sweep = SweepSchedule(parse_schedule(args.schedule), settle_s=args.settle)
+        except ValueError as e:
+            raise SystemExit(f"[ERROR] {e}")
+
     init_csv()
-    print(f"[INFO] CSV-Logging nach: {CSV_PATH.resolve()}  (Periode: {LOG_PERIOD_MS} ms)")
+    print(f"[INFO] CSV-Logging nach: {CSV_PATH.resolve()}  (Periode: {LOG_PERIOD_MS} ms, Modus: {args.mode})")
 
     cf = Crazyflie(rw_cache='./cache')
     lg = None  # Referenz auf LogConfig für sauberes Stoppen
@@ -160,24 +564,44 @@ if __name__ == "__main__":
             lg.error_cb.add_callback(on_log_error)
             scf.cf.log.add_config(lg)
 
-            t0 = time.time()
+            actuator = FanActuator(scf.cf)
+            t0 = timebase.now()
             lg.start()
 
             # 2) Direkt-PWM aktivieren
             scf.cf.param.set_value('motorPowerSet.enable', '1')  # 1 = PWM direkt an Motoren
             time.sleep(0.05)
 
-            #Kickstart: einmal kurz auf 20% setzen, damit die Motoren sicher starten
-            set_all_motors(scf.cf, int(0.2 * PWM_MAX))
-            time.sleep(0.15)
-
-            # 3) Alle Motoren auf ~5 % setzen
-            set_all_motors(scf.cf, PWM_VAL)
-            print(f"[INFO] Motors at ~{PWM_PERCENT*100:.1f}% PWM ({PWM_VAL}/{PWM_MAX})")
+            # 3) Kickstart (20 %), danach feste ~5 % bzw. Regler-PWM
+            if args.mode == "fixed":
+                print(f"[INFO] Motors at ~{PWM_PERCENT*100:.1f}% PWM ({PWM_VAL}/{PWM_MAX})")
+            elif args.mode == "temp":
+                print(f"[INFO] Temperaturregelung: Soll {args.setpoint:.1f} °C, "
+                      f"PWM {args.pwm_min*100:.1f}..{args.pwm_max*100:.1f} %")
+            else:
+                print(f"[INFO] Sweep: {len(sweep.segments)} Segmente, {sweep.total_s:.0f} s, "
+                      f"Einschwingen {sweep.settle_s:.0f} s")
 
             # Testdauer: währenddessen läuft das Logging im Hintergrund
-            while (vbat < 4.2) if vbat is not None else True:
-                time.sleep(0.2)
+            while True:
+                now = timebase.now()
+                if sweep is not None:
+                    cur = sweep.at(now)
+                    if cur is None:
+                        break
+                    idx, phase, target = cur
+                    if seg_tag[0] != str(idx):
+                        print(f"[SWEEP] Segment {idx}: PWM {target*100:.1f} %")
+                        # Segmentwechsel sofort schreiben, nicht am Rate-Limit hängen lassen
+                        actuator.last_write = None
+                    seg_tag = (str(idx), phase)
+                else:
+                    if vbat is not None and vbat >= 4.2:
+                        break
+                    with _ctrl_lock:
+                        target = pwm_target
+                actuator.apply(target, now)
+                time.sleep(0.05)
 
         finally:
             # 4) Sicher abschalten (zuerst Motoren!)
@@ -196,3 +620,18 @@ if __name__ == "__main__":
             close_csv()
             print("[INFO] Motors stopped and disarmed.")
             print(f"[INFO] Log-Datei geschrieben: {CSV_PATH.resolve()}")
+            cs = clock_sync.stats()
+            if cs["samples"]:
+                print(f"[INFO] Zeitbasis: Drift {cs['drift_ppm']:+.1f} ppm, Latenz über Minimum "
+                      f"mittel {cs['latency_mean_ms']:.1f} ms / max {cs['latency_max_ms']:.1f} ms")
+            if actuator is not None:
+                print(f"[INFO] PWM-Writes: {actuator.writes} (je 4 Params), Kicks: {actuator.kicks}")
+
+    if args.mode == "sweep":
+        if not args.no_report:
+            print_sweep_report(CSV_PATH)
+    elif not args.no_report:
+        compare = args.compare
+        if compare is None:
+            compare = sorted(LOG_DIR.glob("cf_powerlog_*.csv")) + sorted(REFERENCE_LOG_DIR.glob("cf_powerlog_*.csv"))
+        print_report(CSV_PATH, compare)
@@ -0,0 +1,849 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lokaler CRTP-Link-Emulator mit Python-Modell des custom_qi-Decks.
+
+Stellt einen UDP-Endpunkt bereit, mit dem sich cflib über den regulären
+UDP-Treiber verbindet (udp://127.0.0.1:19850). Die Skripte laufen damit
+unverändert ohne Crazyradio und Drohne:
+
+    python cf_link_emulator.py --toc qi_charging_deck_demo/cache/FCFF06F2.json --speed 200
+    CFLIB_URI=udp://127.0.0.1:19850 python Rotor_as_fan.py
+
+Emuliert werden:
+ * Link-/Plattform-Handshake, Param- und Log-TOC (Param-TOC aus gecachter
+   TOC-JSON, ergänzt um custom_qi), Param lesen/schreiben, Log-Blöcke
+ * motorPowerSet.*, pm.*, baro.temp und die custom_qi Param-/Log-Gruppe
+ * customQiTask aus stm32-firmware/src/custom_qi.c: ereignisgesteuertes
+   Aufwachen, Kick als zeitgesteuerter Zustand, Halte-PWM nur bei Änderung,
+   Mock mit TTL und IDLE/KICK/RUNNING (inkl. DEBUG_PRINT auf der Konsole)
+ * ein einfaches Akku-/Lade-/Thermomodell des Qi-Ladevorgangs
+
+Die Simulationszeit startet mit dem ersten Paket des Hosts und läuft um
+--speed beschleunigt; Log-Zeitstempel, Task-Weckzeiten und Physik
+folgen der Simulationszeit.
+"""
+
+import argparse
+import json
+import socket
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+# ------------------------------------------------------------
+# CRTP-Konstanten (vgl. cflib.crtp.crtpstack / cflib.crazyflie.*)
+# ------------------------------------------------------------
+PORT_CONSOLE = 0x00
+PORT_PARAM = 0x02
+PORT_COMMANDER = 0x03
+PORT_MEM = 0x04
+PORT_LOGGING = 0x05
+PORT_COMMANDER_GENERIC = 0x07
+PORT_SUPERVISOR = 0x09
+PORT_PLATFORM = 0x0D
+PORT_LINKCTRL = 0x0F
+
+TOC_CHANNEL = 0
+CMD_TOC_ITEM_V2 = 2
+CMD_TOC_INFO_V2 = 3
+
+PARAM_READ_CHANNEL = 1
+PARAM_WRITE_CHANNEL = 2
+PARAM_MISC_CHANNEL = 3
+MISC_VALUE_UPDATED = 1
+MISC_GET_EXTENDED_TYPE = 2
+MISC_GET_EXTENDED_TYPE_V2 = 7
+
+LOG_SETTINGS_CHANNEL = 1
+LOG_DATA_CHANNEL = 2
+CMD_DELETE_BLOCK = 2
+CMD_START_LOGGING = 3
+CMD_STOP_LOGGING = 4
+CMD_RESET_LOGGING = 5
+CMD_CREATE_BLOCK_V2 = 6
+CMD_APPEND_BLOCK_V2 = 7
+
+PROTOCOL_VERSION = 12          # >= 12: Supervisor-Port für Arming
+LINKSERVICE_ECHO = 0
+LINKSERVICE_SOURCE = 1
+LINK_MAGIC = b"Bitcraze Crazyflie"
+TYPE_STOP = 0
+TYPE_HOVER = 10
+
+ERR_OK = 0
+ERR_ENOENT = 2
+ERR_ENOMEM = 12
+ERR_EEXIST = 17
+ERR_E2BIG = 7
+
+DEFAULT_PORT = 19850
+SIM_STEP_MS = 10               # Raster für Physik und Task-Weckzeiten
+MAX_BLOCK_PAYLOAD = 26
+PWM_MAX = 65535
+
+# Typ-IDs (ParamTocElement.types / LogTocElement.types)
+PARAM_TYPES = {
+    "int8_t": (0x00, "<b"), "int16_t": (0x01, "<h"), "int32_t": (0x02, "<i"),
+    "int64_t": (0x03, "<q"), "FP16": (0x05, "<e"), "float": (0x06, "<f"),
+    "double": (0x07, "<d"), "uint8_t": (0x08, "<B"), "uint16_t": (0x09, "<H"),
+    "uint32_t": (0x0A, "<L"), "uint64_t": (0x0B, "<Q"),
+}
+PARAM_RO = 0x40
+PARAM_EXTENDED = 0x10
+LOG_TYPES = {
+    0x01: ("uint8_t", "<B"), 0x02: ("uint16_t", "<H"), 0x03: ("uint32_t", "<L"),
+    0x04: ("int8_t", "<b"), 0x05: ("int16_t", "<h"), 0x06: ("int32_t", "<i"),
+    0x07: ("float", "<f"), 0x08: ("FP16", "<e"),
+}
+LOG_TYPE_IDS = {v[0]: k for k, v in LOG_TYPES.items()}
+INT_LIMITS = {
+    "<B": (0, 0xFF), "<b": (-0x80, 0x7F), "<H": (0, 0xFFFF), "<h": (-0x8000, 0x7FFF),
+    "<L": (0, 0xFFFFFFFF), "<i": (-0x80000000, 0x7FFFFFFF),
+    "<Q": (0, 2 ** 64 - 1), "<q": (-2 ** 63, 2 ** 63 - 1),
+}
+
+# custom_qi-Params mit Firmware-Defaults (custom_qi.c)
+CUSTOM_QI_PARAMS = [
+    ("enable", "uint8_t", 1),
+    ("forceRun", "uint8_t", 0),
+    ("kickPct", "uint16_t", 15),
+    ("holdPct", "uint16_t", 5),
+    ("kickMs", "uint16_t", 200),
+    ("pmChargingValue", "int32_t", 1),
+    ("supervisorMs", "uint16_t", 250),
+    ("mockEnable", "uint8_t", 0),
+    ("mockCharging", "uint8_t", 0),
+    ("mockTtlMs", "uint16_t", 3000),
+]
+# Params, die der Emulator auch ohne TOC-Cache bereitstellt
+BASE_PARAMS = [
+    ("motorPowerSet", "enable", "uint8_t", 0),
+    ("motorPowerSet", "m1", "uint16_t", 0),
+    ("motorPowerSet", "m2", "uint16_t", 0),
+    ("motorPowerSet", "m3", "uint16_t", 0),
+    ("motorPowerSet", "m4", "uint16_t", 0),
+    ("pm", "lowVoltage", "float", 3.2),
+    ("pm", "criticalLowVoltage", "float", 3.0),
+] + [("custom_qi", n, t, v) for n, t, v in CUSTOM_QI_PARAMS]
+
+
+# ------------------------------------------------------------
+# Simulationszeit
+# ------------------------------------------------------------
+class SimClock:
+    """Beschleunigte, monotone Simulationszeit in ms."""
+
+    def __init__(self, speed: float = 1.0):
+        self.speed = float(speed)
+        self._t0 = time.monotonic()
+
+    def now_ms(self) -> float:
+        return (time.monotonic() - self._t0) * 1000.0 * self.speed
+
+
+# ------------------------------------------------------------
+# Param-Speicher
+# ------------------------------------------------------------
+@dataclass
+class ParamEntry:
+    group: str
+    name: str
+    ctype: str
+    readonly: bool = False
+    extended: bool = False
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.group}.{self.name}"
+
+    @property
+    def pytype(self) -> str:
+        return PARAM_TYPES[self.ctype][1]
+
+
+class ParamStore:
+    """Param-TOC und -Werte. Schreibzugriffe der Firmware melden sich per Callback."""
+
+    def __init__(self):
+        self.entries: List[ParamEntry] = []
+        self.values: Dict[str, float] = {}
+        self._index: Dict[str, int] = {}
+        self.on_firmware_write: Optional[Callable[[int], None]] = None
+
+    def add(self, group, name, ctype, default=0, readonly=False, extended=False):
+        full = f"{group}.{name}"
+        if full in self._index:
+            return
+        self._index[full] = len(self.entries)
+        self.entries.append(ParamEntry(group, name, ctype, readonly, extended))
+        self.values[full] = default
+
+    def ident(self, full_name: str) -> int:
+        return self._index[full_name]
+
+    def get(self, full_name: str):
+        return self.values[full_name]
+
+    def set_from_firmware(self, full_name: str, value) -> None:
+        """Entspricht paramSetInt() in der Firmware: setzt und benachrichtigt den Host."""
+        if self.values.get(full_name) == value:
+            return
+        self.values[full_name] = value
+        if self.on_firmware_write is not None:
+            self.on_firmware_write(self._index[full_name])
+
+    def pack_value(self, ident: int) -> bytes:
+        e = self.entries[ident]
+        return _pack(e.pytype, self.values[e.full_name])
+
+    def toc_crc(self) -> int:
+        return zlib.crc32("|".join(f"{e.full_name}:{e.ctype}:{e.readonly}"
+                                   for e in self.entries).encode()) & 0xFFFFFFFF
+
+
+def _pack(pytype: str, value) -> bytes:
+    if pytype in INT_LIMITS:
+        lo, hi = INT_LIMITS[pytype]
+        return struct.pack(pytype, max(lo, min(hi, int(value))))
+    return struct.pack(pytype, float(value))
+
+
+def load_param_toc(path, store: ParamStore) -> None:
+    """Übernimmt alle ParamTocElement-Einträge einer cflib-TOC-Cache-Datei."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    elems = []
+    for group, items in data.items():
+        for name, e in items.items():
+            if isinstance(e, dict) and e.get("__class__") == "ParamTocElement":
+                elems.append(e)
+    for e in sorted(elems, key=lambda x: x["ident"]):
+        store.add(e["group"], e["name"], e["ctype"], 0,
+                  readonly=bool(e.get("access")), extended=bool(e.get("extended")))
+
+
+# ------------------------------------------------------------
+# Akku-, Lade- und Thermomodell
+# ------------------------------------------------------------
+class PowerModel:
+    """
+    Grobes Modell für 1S-LiPo + Qi-Empfänger + Lade-IC (CC/CV).
+    Konstanten grob an cf_powerlog_*_07p.csv angelehnt.
+    """
+    CAPACITY_AS = 900.0        # 250 mAh
+    R_INT = 0.15               # Innenwiderstand in Ohm
+    I_CHARGE_MAX = 0.85        # A, CC-Phase
+    I_TERM = 0.05              # A, Ladeende
+    V_CHARGE = 4.21            # V, CV-Phase
+    I_BASE = 0.08              # A, Grundlast Elektronik
+    I_MOTOR_FULL = 1.0         # A je Motor bei 100 % PWM
+    T_AMBIENT = 25.0           # °C
+    C_THERMAL = 60.0           # J/K
+    K_COOL = 0.35              # W/K ohne Lüfter
+    FAN_GAIN = 10.0            # Kühlverstärkung je PWM-Anteil
+    HEAT_PER_A = 8.0           # W Verlustleistung (Spule/Gleichrichter) je A Ladestrom
+
+    def __init__(self, params: ParamStore, soc: float = 0.1, on_pad: bool = True):
+        self.params = params
+        self.soc = soc
+        self.on_pad = on_pad
+        self.temp_c = self.T_AMBIENT + 7.0
+        self.charge_current = 0.0
+        self.vbat = self.ocv()
+        self.charged = False
+
+    def ocv(self) -> float:
+        return 3.2 + 1.0 * self.soc
+
+    def motor_pwm_fraction(self) -> float:
+        if not int(self.params.get("motorPowerSet.enable")):
+            return 0.0
+        raw = [self.params.get(f"motorPowerSet.m{i}") for i in range(1, 5)]
+        return sum(raw) / (4.0 * PWM_MAX)
+
+    def step(self, dt_s: float) -> None:
+        pwm = self.motor_pwm_fraction()
+        i_load = self.I_BASE + 4 * self.I_MOTOR_FULL * pwm ** 1.5
+
+        if self.on_pad and not self.charged:
+            # CC bis V_CHARGE, dann CV mit abklingendem Strom
+            i_cv = (self.V_CHARGE - self.ocv()) / self.R_INT
+            self.charge_current = max(0.0, min(self.I_CHARGE_MAX, i_cv + i_load))
+            if i_cv < self.I_TERM:
+                self.charged = True
+        else:
+            self.charge_current = 0.0
+        if not self.on_pad:
+            self.charged = False
+
+        i_bat = self.charge_current - i_load
+        self.soc = max(0.0, min(1.0, self.soc + i_bat * dt_s / self.CAPACITY_AS))
+        self.vbat = self.ocv() + i_bat * self.R_INT
+
+        heat = self.HEAT_PER_A * self.charge_current
+        cool = self.K_COOL * (1.0 + self.FAN_GAIN * pwm) * (self.temp_c - self.T_AMBIENT)
+        self.temp_c += (heat - cool) * dt_s / self.C_THERMAL
+
+    @property
+    def pm_state(self) -> int:
+        """0 Battery, 1 Charging, 2 Charged, 3 Low power (vgl. custom_qi.c)."""
+        if self.on_pad:
+            return 2 if self.charged else 1
+        if self.vbat < float(self.params.get("pm.lowVoltage")):
+            return 3
+        return 0
+
+    @property
+    def battery_level(self) -> int:
+        return int(max(0.0, min(100.0, (self.vbat - 3.0) / 1.2 * 100.0)))
+
+
+# ------------------------------------------------------------
+# Port von customQiTask (stm32-firmware/src/custom_qi.c)
+# ------------------------------------------------------------
+QI_IDLE = 0
+QI_RUNNING = 1
+QI_KICK = 2
+
+# Params mit PARAM_ADD_WITH_CALLBACK: ein Host-Write weckt die Task sofort
+CUSTOM_QI_WAKE_PARAMS = {"enable", "forceRun", "holdPct", "pmChargingValue",
+                         "mockEnable", "mockCharging", "mockTtlMs"}
+
+
+class CustomQiTask:
+    """
+    Python-Nachbildung der ereignisgesteuerten Firmware-Task: Aufwachen bei
+    Param-Notify, Kick-Ende, Mock-TTL-Ablauf oder nach custom_qi.supervisorMs.
+    """
+
+    def __init__(self, params: ParamStore, power: PowerModel, console: Callable[[str], None]):
+        self.params = params
+        self.power = power
+        self.console = console
+        self.st = QI_IDLE
+        self.lg_state = QI_IDLE
+        self.lg_charging = 0
+        self.lg_pm_state_raw = 0
+        self.lg_wakeups = 0
+        self.lg_pwm_writes = 0
+        self.lg_overrides = 0
+        self._mock_touched_ms = 0.0
+        self._prev_mock_charging = -1
+        self._mock_remaining_ms: Optional[float] = None
+        self._kick_end_ms = 0.0
+        self._last_raw: Optional[int] = None
+        self._notified = False
+        self._wake_at_ms = float(self._p("supervisorMs"))
+        console("[CUSTOM_QI] driver initialized\n")
+        console("[CUSTOM_QI] task started\n")
+        self.params.set_from_firmware("motorPowerSet.enable", 0)
+
+    def _p(self, name):
+        return int(self.params.get(f"custom_qi.{name}"))
+
+    def notify(self) -> None:
+        """Entspricht customQiWake() / xTaskNotifyGive()."""
+        self._notified = True
+
+    def due(self, now_ms: float) -> bool:
+        return self._notified or now_ms >= self._wake_at_ms
+
+    def _set_motor_raw_all(self, raw: int) -> None:
+        for i in range(1, 5):
+            self.params.set_from_firmware(f"motorPowerSet.m{i}", raw)
+        self.lg_pwm_writes += 4
+        self._last_raw = raw
+
+    def _motors_apply_raw(self, raw: int) -> None:
+        if self._last_raw == raw:
+            if all(int(self.params.get(f"motorPowerSet.m{i}")) == raw for i in range(1, 5)):
+                return
+            self.lg_overrides += 1
+        self._set_motor_raw_all(raw)
+
+    def _stop_motors(self) -> None:
+        self._set_motor_raw_all(0)
+        self.params.set_from_firmware("motorPowerSet.enable", 0)
+
+    @staticmethod
+    def pct_to_raw(pct: int) -> int:
+        return (0xFFFF // 100) * pct
+
+    def detect_charging(self, now_ms: float) -> bool:
+        self._mock_remaining_ms = None
+        if self._p("mockEnable"):
+            mock = self._p("mockCharging")
+            if mock != self._prev_mock_charging:
+                self._prev_mock_charging = mock
+                self._mock_touched_ms = now_ms
+            ttl = self._p("mockTtlMs")
+            if ttl > 0 and (now_ms - self._mock_touched_ms) < ttl:
+                self._mock_remaining_ms = ttl - (now_ms - self._mock_touched_ms)
+                self.lg_charging = 1 if mock else 0
+                return mock != 0
+            # TTL abgelaufen -> echter PM-Pfad
+        # Fallback über pm.state (kein pm.h)
+        s = self.power.pm_state
+        self.lg_pm_state_raw = s & 0xFFFFFFFF
+        ch = s == self._p("pmChargingValue")
+        self.lg_charging = 1 if ch else 0
+        return ch
+
+    def step(self, now_ms: float) -> None:
+        """Ein Task-Durchlauf nach dem Aufwachen."""
+        self._notified = False
+        self.lg_wakeups += 1
+        self._run(now_ms)
+
+        # Nächste Weckzeit wie vor ulTaskNotifyTake() berechnen
+        wait = float(max(1, self._p("supervisorMs")))
+        if self.st == QI_KICK:
+            wait = min(wait, max(0.0, self._kick_end_ms - now_ms))
+        if self._mock_remaining_ms is not None:
+            wait = min(wait, self._mock_remaining_ms)
+        self._wake_at_ms = now_ms + wait
+
+    def _run(self, now_ms: float) -> None:
+        if not self._p("enable"):
+            if self.st != QI_IDLE:
+                self._stop_motors()
+                self.st = QI_IDLE
+                self.lg_state = self.st
+                self.console("[CUSTOM_QI] disabled -> OFF\n")
+            return
+
+        chg = self.detect_charging(now_ms)
+        should_run = self._p("forceRun") != 0 or chg
+
+        if self.st == QI_IDLE:
+            if should_run:
+                self.params.set_from_firmware("motorPowerSet.enable", 1)
+                self._set_motor_raw_all(self.pct_to_raw(self._p("kickPct")))
+                self._kick_end_ms = now_ms + self._p("kickMs")
+                self.st = QI_KICK
+                self.lg_state = self.st
+        elif self.st == QI_KICK:
+            if not should_run:
+                self._stop_motors()
+                self.st = QI_IDLE
+                self.lg_state = self.st
+                self.console("[CUSTOM_QI] kick aborted -> IDLE\n")
+            elif now_ms >= self._kick_end_ms:
+                self._motors_apply_raw(self.pct_to_raw(self._p("holdPct")))
+                self.st = QI_RUNNING
+                self.lg_state = self.st
+                self.console("[CUSTOM_QI] -> RUN (chg=%d, force=%d)\n" % (int(chg), self._p("forceRun")))
+        elif self.st == QI_RUNNING:
+            if not should_run:
+                self._stop_motors()
+                self.st = QI_IDLE
+                self.lg_state = self.st
+                self.console("[CUSTOM_QI] -> IDLE\n")
+            else:
+                self._motors_apply_raw(self.pct_to_raw(self._p("holdPct")))
+
+
+# ------------------------------------------------------------
+# Log-Blöcke
+# ------------------------------------------------------------
+@dataclass
+class LogBlockState:
+    block_id: int
+    variables: list                 # [(log_ident, fetch_pytype), ...]
+    period_ms: float = 0.0
+    started: bool = False
+    next_due_ms: float = 0.0
+
+    def size(self) -> int:
+        return sum(struct.calcsize(t) for _, t in self.variables)
+
+
+# ------------------------------------------------------------
+# Emulator
+# ------------------------------------------------------------
+class CrazyflieEmulator:
+    """UDP-Endpunkt, der CRTP wie eine Crazyflie mit custom_qi-Deck beantwortet."""
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, toc_path=None, speed=1.0,
+                 soc=0.1, on_pad=True, ranges_m=(2.0, 2.0, 2.0, 2.0, 2.0), verbose=False):
+        self.addr = (host, port)
+        self.clock = SimClock(speed)
+        self.verbose = verbose
+
+        self.params = ParamStore()
+        if toc_path:
+            load_param_toc(toc_path, self.params)
+        for group, name, ctype, default in BASE_PARAMS:
+            self.params.add(group, name, ctype, default)
+            self.params.values[f"{group}.{name}"] = default   # Firmware-Default auch bei TOC aus Cache
+        self.params.on_firmware_write = self._notify_param
+
+        self._lock = threading.RLock()
+        self._sock: Optional[socket.socket] = None
+        self._client = None
+        self._stop = threading.Event()
+        self._connected = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._last_sim_ms = 0.0
+        self._next_task_ms = 0.0
+
+        self.power = PowerModel(self.params, soc=soc, on_pad=on_pad)
+        self.qi = CustomQiTask(self.params, self.power, self._console)
+        self.armed = False
+        self.yaw_deg = 0.0
+        self.setpoint = (0.0, 0.0, 0.0, 0.0)
+        self.ranges_m = list(ranges_m)
+
+        self.log_vars = self._build_log_toc()
+        self.blocks: Dict[int, LogBlockState] = {}
+        self.stats = {"rx": 0, "tx": 0, "log_packets": 0, "param_writes": 0, "setpoints": 0}
+
+    # ---------- Log-TOC ----------
+    def _build_log_toc(self):
+        p, qi = self.power, self
+        rng = lambda i: (lambda: int(self.ranges_m[i] * 1000))
+        return [
+            ("pm", "vbat", "float", lambda: p.vbat),
+            ("pm", "state", "int8_t", lambda: p.pm_state),
+            ("pm", "batteryLevel", "uint8_t", lambda: p.battery_level),
+            ("pm", "chargeCurrent", "float", lambda: p.charge_current),
+            ("baro", "temp", "float", lambda: p.temp_c),
+            ("stabilizer", "yaw", "float", lambda: qi.yaw_deg),
+            ("range", "front", "uint16_t", rng(0)),
+            ("range", "back", "uint16_t", rng(1)),
+            ("range", "left", "uint16_t", rng(2)),
+            ("range", "right", "uint16_t", rng(3)),
+            ("range", "up", "uint16_t", rng(4)),
+            ("custom_qi", "state", "uint8_t", lambda: qi.qi.lg_state),
+            ("custom_qi", "charging", "uint8_t", lambda: qi.qi.lg_charging),
+            ("custom_qi", "pmState", "uint32_t", lambda: qi.qi.lg_pm_state_raw),
+            ("custom_qi", "wakeups", "uint32_t", lambda: qi.qi.lg_wakeups),
+            ("custom_qi", "pwmWrites", "uint32_t", lambda: qi.qi.lg_pwm_writes),
+            ("custom_qi", "overrides", "uint32_t", lambda: qi.qi.lg_overrides),
+        ]
+
+    def _log_toc_crc(self) -> int:
+        return zlib.crc32("|".join(f"{g}.{n}:{t}" for g, n, t, _ in self.log_vars).encode()) & 0xFFFFFFFF
+
+    # ---------- Lebenszyklus ----------
+    @property
+    def uri(self) -> str:
+        return "udp://%s:%d" % self.addr
+
+    def start(self) -> "CrazyflieEmulator":
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind(self.addr)
+        self._sock.settimeout(0.2)
+        self.addr = self._sock.getsockname()
+        for target, name in ((self._rx_loop, "EmuRx"), (self._sim_loop, "EmuSim")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=1.0)
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def set_on_pad(self, on_pad: bool) -> None:
+        with self._lock:
+            self.power.on_pad = on_pad
+
+    # ---------- Senden ----------
+    def _send(self, port: int, channel: int, data: bytes) -> None:
+        if self._client is None or self._sock is None:
+            return
+        header = ((port & 0x0F) << 4) | (3 << 2) | (channel & 0x03)
+        try:
+            self._sock.sendto(bytes([header]) + bytes(data), self._client)
+            self.stats["tx"] += 1
+        except OSError:
+            pass
+
+    def _console(self, text: str) -> None:
+        if self.verbose:
+            print(f"[EMU] {text}", end="")
+        raw = text.encode("ascii", "replace")
+        for i in range(0, len(raw), 30):
+            self._send(PORT_CONSOLE, 0, raw[i:i + 30])
+
+    def _notify_param(self, ident: int) -> None:
+        self._send(PORT_PARAM, PARAM_MISC_CHANNEL,
+                   struct.pack("<BH", MISC_VALUE_UPDATED, ident) + self.params.pack_value(ident))
+
+    # ---------- Simulation ----------
+    def _sim_loop(self) -> None:
+        # Simulationszeit startet mit dem ersten Paket des Hosts
+        while not self._connected.wait(0.05):
+            if self._stop.is_set():
+                return
+        with self._lock:
+            self.clock = SimClock(self.clock.speed)
+        while not self._stop.is_set():
+            with self._lock:
+                now = self.clock.now_ms()
+                self._advance(now)
+                self._emit_logs(now)
+            time.sleep(0.002)
+
+    def _advance(self, now: float) -> None:
+        # Physik und Firmware-Task im SIM_STEP_MS-Raster der Simulationszeit
+        while self._next_task_ms <= now:
+            t = self._next_task_ms
+            dt = (t - self._last_sim_ms) / 1000.0
+            self._last_sim_ms = t
+            self.power.step(dt)
+            self.yaw_deg = (self.yaw_deg + self.setpoint[2] * dt + 180.0) % 360.0 - 180.0
+            if self.qi.due(t):
+                self.qi.step(t)
+            self._next_task_ms += SIM_STEP_MS
+
+    def _emit_logs(self, now: float) -> None:
+        ts = int(now) & 0xFFFFFF
+        for b in self.blocks.values():
+            if not b.started or now < b.next_due_ms:
+                continue
+            # Bei hoher Beschleunigung Perioden zusammenfassen statt fluten
+            b.next_due_ms = max(b.next_due_ms + b.period_ms, now)
+            payload = bytearray([b.block_id, ts & 0xFF, (ts >> 8) & 0xFF, (ts >> 16) & 0xFF])
+            for ident, pytype in b.variables:
+                payload += _pack(pytype, self.log_vars[ident][3]())
+            self._send(PORT_LOGGING, LOG_DATA_CHANNEL, payload)
+            self.stats["log_packets"] += 1
+
+    # ---------- Empfangen ----------
+    def _rx_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                raw, addr = self._sock.recvfrom(64)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if not raw:
+                continue
+            self._client = addr
+            self._connected.set()
+            self.stats["rx"] += 1
+            header, data = raw[0], raw[1:]
+            port, channel = (header & 0xF0) >> 4, header & 0x03
+            with self._lock:
+                try:
+                    self._dispatch(port, channel, data)
+                except (IndexError, struct.error, KeyError) as exc:
+                    if self.verbose:
+                        print(f"[EMU] bad packet port={port} ch={channel}: {exc}")
+
+    def _dispatch(self, port: int, channel: int, data: bytes) -> None:
+        if port == PORT_LINKCTRL:
+            if channel == LINKSERVICE_SOURCE:
+                self._send(PORT_LINKCTRL, LINKSERVICE_SOURCE, LINK_MAGIC)
+            elif channel == LINKSERVICE_ECHO:
+                self._send(PORT_LINKCTRL, LINKSERVICE_ECHO, data)
+            else:
+                self._send(PORT_LINKCTRL, channel, b"")  # Null-Paket (Scan)
+        elif port == PORT_PLATFORM:
+            self._on_platform(channel, data)
+        elif port == PORT_SUPERVISOR:
+            self._on_supervisor(channel, data)
+        elif port == PORT_MEM:
+            if channel == 0 and data and data[0] == 1:   # CMD_INFO_NBR: keine Speicher
+                self._send(PORT_MEM, 0, bytes([1, 0]))
+        elif port == PORT_PARAM:
+            self._on_param(channel, data)
+        elif port == PORT_LOGGING:
+            self._on_log(channel, data)
+        elif port in (PORT_COMMANDER, PORT_COMMANDER_GENERIC):
+            self._on_setpoint(port, data)
+
+    def _on_platform(self, channel, data):
+        if channel == 1 and data:           # VERSION_COMMAND
+            if data[0] == 0:                # VERSION_GET_PROTOCOL
+                self._send(PORT_PLATFORM, 1, bytes([0, PROTOCOL_VERSION]))
+            elif data[0] == 1:              # VERSION_GET_FIRMWARE
+                self._send(PORT_PLATFORM, 1, bytes([1]) + b"custom_qi-emu")
+        elif channel == 0 and len(data) >= 2 and data[0] == 1:  # PLATFORM_REQUEST_ARMING
+            self.armed = bool(data[1])
+
+    def _on_supervisor(self, channel, data):
+        if not data:
+            return
+        if data[0] == 0x01 and len(data) >= 2:             # CMD_ARM_SYSTEM
+            self.armed = bool(data[1])
+            self._send(PORT_SUPERVISOR, channel, bytes([0x81, 1, int(self.armed)]))
+        elif data[0] == 0x0C:                              # CMD_GET_STATE_BITFIELD
+            bits = 0x01 | (0x02 if self.armed else 0)
+            self._send(PORT_SUPERVISOR, channel, bytes([0x8C]) + struct.pack("<H", bits))
+
+    def _on_param(self, channel, data):
+        if channel == TOC_CHANNEL:
+            if data[0] == CMD_TOC_INFO_V2:
+                self._send(PORT_PARAM, TOC_CHANNEL,
+                           struct.pack("<BHI", CMD_TOC_INFO_V2, len(self.params.entries),
+                                       self.params.toc_crc()))
+            elif data[0] == CMD_TOC_ITEM_V2:
+                ident = struct.unpack("<H", data[1:3])[0]
+                e = self.params.entries[ident]
+                meta = PARAM_TYPES[e.ctype][0] | (PARAM_RO if e.readonly else 0) | \
+                    (PARAM_EXTENDED if e.extended else 0)
+                self._send(PORT_PARAM, TOC_CHANNEL,
+                           struct.pack("<BHB", CMD_TOC_ITEM_V2, ident, meta) +
+                           f"{e.group}\0{e.name}\0".encode("ISO-8859-1"))
+        elif channel == PARAM_READ_CHANNEL:
+            ident = struct.unpack("<H", data[:2])[0]
+            self._send(PORT_PARAM, PARAM_READ_CHANNEL,
+                       struct.pack("<HB", ident, 0) + self.params.pack_value(ident))
+        elif channel == PARAM_WRITE_CHANNEL:
+            ident = struct.unpack("<H", data[:2])[0]
+            e = self.params.entries[ident]
+            if not e.readonly:
+                self.params.values[e.full_name] = struct.unpack(e.pytype, data[2:])[0]
+                self.stats["param_writes"] += 1
+                if e.group == "custom_qi" and e.name in CUSTOM_QI_WAKE_PARAMS:
+                    self.qi.notify()
+            self._send(PORT_PARAM, PARAM_WRITE_CHANNEL, data[:2] + self.params.pack_value(ident))
+        elif channel == PARAM_MISC_CHANNEL and len(data) >= 3:
+            ident = struct.unpack("<H", data[1:3])[0]
+            if data[0] == MISC_GET_EXTENDED_TYPE_V2:
+                self._send(PORT_PARAM, PARAM_MISC_CHANNEL, data[:3] + bytes([ERR_OK, 0]))
+            elif data[0] == MISC_GET_EXTENDED_TYPE:
+                self._send(PORT_PARAM, PARAM_MISC_CHANNEL, data[:3] + bytes([0]))
+            else:
+                self._send(PORT_PARAM, PARAM_MISC_CHANNEL, data[:3] + bytes([ERR_ENOENT]))
+
+    def _on_log(self, channel, data):
+        if channel == TOC_CHANNEL:
+            if data[0] == CMD_TOC_INFO_V2:
+                self._send(PORT_LOGGING, TOC_CHANNEL,
+                           struct.pack("<BHIBB", CMD_TOC_INFO_V2, len(self.log_vars),
+                                       self._log_toc_crc(), 16, 128))
+            elif data[0] == CMD_TOC_ITEM_V2:
+                ident = struct.unpack("<H", data[1:3])[0]
+                g, n, t, _ = self.log_vars[ident]
+                self._send(PORT_LOGGING, TOC_CHANNEL,
+                           struct.pack("<BHB", CMD_TOC_ITEM_V2, ident, LOG_TYPE_IDS[t]) +
+                           f"{g}\0{n}\0".encode("ISO-8859-1"))
+            return
+        if channel != LOG_SETTINGS_CHANNEL:
+            return
+
+        cmd = data[0]
+        if cmd == CMD_RESET_LOGGING:
+            self.blocks.clear()
+            self._send(PORT_LOGGING, channel, bytes([cmd, 0, ERR_OK]))
+            return
+        block_id = data[1]
+        status = ERR_OK
+        if cmd in (CMD_CREATE_BLOCK_V2, CMD_APPEND_BLOCK_V2):
+            if cmd == CMD_CREATE_BLOCK_V2:
+                if block_id in self.blocks:
+                    status = ERR_EEXIST
+                elif len(self.blocks) >= 16:
+                    status = ERR_ENOMEM
+                else:
+                    self.blocks[block_id] = LogBlockState(block_id, [])
+            block = self.blocks.get(block_id)
+            if block is None:
+                status = ERR_ENOENT
+            elif status == ERR_OK:
+                items = data[2:]
+                added = []
+                for i in range(0, len(items) - 2, 3):
+                    fetch = items[i] & 0x0F
+                    ident = items[i + 1] | (items[i + 2] << 8)
+                    added.append((ident, LOG_TYPES[fetch][1]))
+                if block.size() + sum(struct.calcsize(t) for _, t in added) > MAX_BLOCK_PAYLOAD:
+                    status = ERR_E2BIG
+                else:
+                    block.variables.extend(added)
+        elif cmd == CMD_START_LOGGING:
+            block = self.blocks.get(block_id)
+            if block is None:
+                status = ERR_ENOENT
+            else:
+                block.period_ms = data[2] * 10.0
+                block.started = True
+                block.next_due_ms = self.clock.now_ms()
+        elif cmd == CMD_STOP_LOGGING:
+            block = self.blocks.get(block_id)
+            if block is None:
+                status = ERR_ENOENT
+            else:
+                block.started = False
+        elif cmd == CMD_DELETE_BLOCK:
+            status = ERR_OK if self.blocks.pop(block_id, None) else ERR_ENOENT
+        self._send(PORT_LOGGING, channel, bytes([cmd, block_id, status]))
+
+    def _on_setpoint(self, port, data):
+        self.stats["setpoints"] += 1
+        if port == PORT_COMMANDER_GENERIC and data:
+            if data[0] == TYPE_HOVER and len(data) >= 17:
+                self.setpoint = struct.unpack("<ffff", data[1:17])
+            elif data[0] == TYPE_STOP:
+                self.setpoint = (0.0, 0.0, 0.0, 0.0)
+
+    # ---------- Status ----------
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "sim_s": round(self._last_sim_ms / 1000.0, 2),
+                "vbat": round(self.power.vbat, 3),
+                "pm_state": self.power.pm_state,
+                "ichg": round(self.power.charge_current, 3),
+                "temp": round(self.power.temp_c, 2),
+                "pwm": round(self.power.motor_pwm_fraction(), 3),
+                "qi_state": self.qi.lg_state,
+                "qi_wakeups": self.qi.lg_wakeups,
+                "qi_pwm_writes": self.qi.lg_pwm_writes,
+                **self.stats,
+            }
+
+
+# ------------------------------------------------------------
+# Kommandozeile
+# ------------------------------------------------------------
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="CRTP-Link-Emulator (custom_qi-Deck) für cflib udp://")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--toc", default=None, help="cflib-TOC-Cache-JSON mit dem Param-TOC")
+    ap.add_argument("--speed", type=float, default=1.0, help="Zeitraffer-Faktor der Simulation")
+    ap.add_argument("--soc", type=float, default=0.1, help="Start-Ladezustand 0..1")
+    ap.add_argument("--off-pad", action="store_true", help="Start neben dem Ladepad")
+    ap.add_argument("--pad-at", type=float, default=None,
+                    help="nach so vielen Sim-Sekunden aufs Pad setzen")
+    ap.add_argument("--status-every", type=float, default=5.0, help="Statusausgabe in s (Wanduhr)")
+    ap.add_argument("-v", "--verbose", action="store_true")
+    args = ap.parse_args(argv)
+
+    emu = CrazyflieEmulator(args.host, args.port, toc_path=args.toc, speed=args.speed,
+                            soc=args.soc, on_pad=not args.off_pad, verbose=args.verbose)
+    with emu:
+        print(f"[INFO] Emulator läuft: CFLIB_URI={emu.uri}  (speed x{args.speed:g})")
+        try:
+            while True:
+                time.sleep(args.status_every)
+                snap = emu.snapshot()
+                if args.pad_at is not None and not emu.power.on_pad and snap["sim_s"] >= args.pad_at:
+                    emu.set_on_pad(True)
+                print(f"[EMU] {snap}")
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
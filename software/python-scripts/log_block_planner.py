@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Log-Block-Planer: packt Telemetrie-Variablen in möglichst wenige CRTP-Log-Blöcke.
+
+Vorgehen:
+ 1. Speichertypen aus dem gecachten Log-TOC (cache/*.json) auflösen.
+ 2. Je Variable den kompaktesten Übertragungstyp wählen, der die geforderte
+    Auflösung im erwarteten Wertebereich einhält (int8/16, FP16, float).
+    Die Firmware konvertiert beim Loggen vom Speichertyp in diesen Typ.
+ 3. Variablen per First-Fit-Decreasing in Blöcke mit max. LogConfig.MAX_LEN
+    (26 Byte Nutzlast) packen. Langsamere Variablen dürfen freien Platz in
+    schnelleren Blöcken nutzen (Überabtastung kostet Bytes, aber keine Pakete).
+
+Der Planer läuft vollständig offline gegen die TOC-JSON-Dateien.
+
+Beispiele:
+    python log_block_planner.py --preset rotor_as_fan
+    python log_block_planner.py --preset wall_following --cache qi_charging_deck_demo/cache
+    python log_block_planner.py --var pm.vbat:100:0.01:0:4.5 --var pm.state:500
+"""
+
+import argparse
+import json
+import math
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# ------------------------------------------------------------
+# CRTP-/Log-Konstanten (vgl. cflib.crazyflie.log)
+# ------------------------------------------------------------
+MAX_BLOCK_PAYLOAD = 26       # LogConfig.MAX_LEN: 30 B CRTP - 1 B Block-ID - 3 B Timestamp
+PACKET_OVERHEAD = 5          # 1 B CRTP-Header + 1 B Block-ID + 3 B Timestamp
+PERIOD_UNIT_MS = 10          # Firmware-Periode in 10-ms-Schritten, < 0xFF
+FP16_MAX = 65504.0
+
+# Größe der Log-Typen in Byte (LogTocElement.types)
+TYPE_SIZES = {
+    "uint8_t": 1, "int8_t": 1,
+    "uint16_t": 2, "int16_t": 2, "FP16": 2,
+    "uint32_t": 4, "int32_t": 4, "float": 4,
+}
+INT_RANGES = {
+    "uint8_t": (0, 0xFF), "int8_t": (-0x80, 0x7F),
+    "uint16_t": (0, 0xFFFF), "int16_t": (-0x8000, 0x7FFF),
+    "uint32_t": (0, 0xFFFFFFFF), "int32_t": (-0x80000000, 0x7FFFFFFF),
+}
+
+# Speichertypen, falls der Log-TOC (noch) nicht im Cache liegt.
+# Entsprechen den bisher von Hand gesetzten Typen in den Skripten.
+FALLBACK_CTYPES = {
+    "baro.temp": "float",
+    "pm.batteryLevel": "uint8_t",
+    "pm.chargeCurrent": "float",
+    "pm.state": "int8_t",
+    "pm.vbat": "float",
+    "stabilizer.yaw": "float",
+    "range.front": "uint16_t",
+    "range.back": "uint16_t",
+    "range.left": "uint16_t",
+    "range.right": "uint16_t",
+    "range.up": "uint16_t",
+    "custom_qi.state": "uint8_t",
+    "custom_qi.charging": "uint8_t",
+    "custom_qi.pmState": "uint32_t",
+}
+
+
+@dataclass
+class VarRequest:
+    """Gewünschte Log-Variable mit Mindestrate und Genauigkeit."""
+    name: str
+    period_ms: int
+    resolution: Optional[float] = None           # zulässiger Fehler; None = verlustfrei
+    value_range: Optional[Tuple[float, float]] = None
+
+
+@dataclass
+class PlannedVar:
+    name: str
+    stored_as: str
+    fetch_as: str
+    period_ms: int
+
+    @property
+    def size(self) -> int:
+        return TYPE_SIZES[self.fetch_as]
+
+
+@dataclass
+class LogBlock:
+    name: str
+    period_ms: int
+    variables: List[PlannedVar] = field(default_factory=list)
+
+    @property
+    def size(self) -> int:
+        return sum(v.size for v in self.variables)
+
+    @property
+    def free(self) -> int:
+        return MAX_BLOCK_PAYLOAD - self.size
+
+
+# ------------------------------------------------------------
+# Presets (entsprechen den bestehenden Skripten)
+# ------------------------------------------------------------
+PRESETS: Dict[str, List[VarRequest]] = {
+    # Rotor_as_fan.py: PowerLog mit 200 ms
+    "rotor_as_fan": [
+        VarRequest("baro.temp", 200, 0.1, (-40.0, 85.0)),
+        VarRequest("pm.batteryLevel", 200, 1.0, (0.0, 100.0)),
+        VarRequest("pm.chargeCurrent", 200, 0.001, (0.0, 1.5)),
+        VarRequest("pm.state", 200),
+        VarRequest("pm.vbat", 200, 0.005, (0.0, 4.5)),
+    ],
+    # multiranger_wall_following.py: Stabilizer-Block + Multiranger-Block, je 100 ms
+    "wall_following": [
+        VarRequest("stabilizer.yaw", 100, 0.25, (-180.0, 180.0)),
+        VarRequest("pm.state", 100),
+        VarRequest("range.front", 100),
+        VarRequest("range.back", 100),
+        VarRequest("range.left", 100),
+        VarRequest("range.right", 100),
+        VarRequest("range.up", 100),
+    ],
+}
+# Hand-gebaute Konfigurationen zum Vergleich: (Periode, [(Name, Typ), ...])
+BASELINES = {
+    "rotor_as_fan": [
+        (200, [("baro.temp", "float"), ("pm.batteryLevel", "float"),
+               ("pm.chargeCurrent", "float"), ("pm.state", "uint8_t"), ("pm.vbat", "float")]),
+    ],
+    "wall_following": [
+        (100, [("stabilizer.yaw", "float"), ("pm.state", "uint8_t")]),
+        (100, [("range.front", "uint16_t"), ("range.back", "uint16_t"), ("range.left", "uint16_t"),
+               ("range.right", "uint16_t"), ("range.up", "uint16_t")]),
+    ],
+}
+
+
+# ------------------------------------------------------------
+# TOC laden
+# ------------------------------------------------------------
+def load_log_toc(cache_dirs) -> Dict[str, str]:
+    """Liest alle cache/*.json und liefert {'gruppe.name': ctype} der Log-Variablen."""
+    toc = {}
+    for d in cache_dirs:
+        for path in sorted(Path(d).glob("*.json")):
+            try:
+                with path.open("r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for group, elems in data.items():
+                if not isinstance(elems, dict):
+                    continue
+                for name, elem in elems.items():
+                    if isinstance(elem, dict) and elem.get("__class__") == "LogTocElement":
+                        toc[f"{group}.{name}"] = elem["ctype"]
+    return toc
+
+
+def resolve_stored_type(name: str, toc: Dict[str, str]) -> Tuple[str, bool]:
+    """Speichertyp aus TOC, sonst Fallback. Rückgabe (ctype, aus_toc)."""
+    if name in toc:
+        return toc[name], True
+    if name in FALLBACK_CTYPES:
+        return FALLBACK_CTYPES[name], False
+    raise KeyError(f"Variable {name} weder im Log-TOC noch in FALLBACK_CTYPES")
+
+
+# ------------------------------------------------------------
+# Typwahl
+# ------------------------------------------------------------
+def _fp16_step(max_abs: float) -> float:
+    """Abstand benachbarter FP16-Werte bei |x| = max_abs (10 Bit Mantisse)."""
+    if max_abs <= 0:
+        return 2.0 ** -24
+    return 2.0 ** (math.floor(math.log2(max_abs)) - 10)
+
+
+def choose_wire_type(req: VarRequest, stored_as: str) -> str:
+    """Kompaktester Übertragungstyp, der Auflösung und Wertebereich einhält."""
+    if stored_as in INT_RANGES:
+        # Ganzzahlen: nur verkleinern, wenn der Wertebereich bekannt ist
+        if req.value_range is None:
+            return stored_as
+        lo, hi = req.value_range
+        for t in ("uint8_t", "int8_t", "uint16_t", "int16_t"):
+            if TYPE_SIZES[t] < TYPE_SIZES[stored_as] and INT_RANGES[t][0] <= lo and hi <= INT_RANGES[t][1]:
+                return t
+        return stored_as
+
+    # float (bzw. FP16) gespeichert
+    if req.resolution is None or req.value_range is None:
+        return stored_as
+    lo, hi = req.value_range
+    max_abs = max(abs(lo), abs(hi))
+    candidates = []
+    if req.resolution >= 1.0:
+        # Ganzzahl-Konvertierung schneidet ab: Fehler < 1
+        for t in ("uint8_t", "int8_t", "uint16_t", "int16_t"):
+            if INT_RANGES[t][0] <= lo and hi <= INT_RANGES[t][1]:
+                candidates.append(t)
+    if max_abs <= FP16_MAX and _fp16_step(max_abs) <= req.resolution:
+        candidates.append("FP16")
+    candidates.append(stored_as)
+    return min(candidates, key=lambda t: TYPE_SIZES[t])
+
+
+# ------------------------------------------------------------
+# Bin-Packing
+# ------------------------------------------------------------
+def plan_blocks(requests: List[VarRequest], toc: Dict[str, str],
+                allow_upsample: bool = True, name_prefix: str = "Plan") -> List[LogBlock]:
+    """
+    Verteilt die Variablen auf möglichst wenige Log-Blöcke.
+    Gleiche Variable mehrfach angefordert -> schnellste Rate / feinste Auflösung gewinnt.
+    """
+    merged: Dict[str, VarRequest] = {}
+    for r in requests:
+        if r.period_ms // PERIOD_UNIT_MS not in range(1, 0xFF):
+            raise ValueError(f"{r.name}: Periode {r.period_ms} ms außerhalb 10..2540 ms")
+        prev = merged.get(r.name)
+        if prev is None:
+            merged[r.name] = r
+            continue
+        res = [x for x in (prev.resolution, r.resolution) if x is not None]
+        merged[r.name] = VarRequest(
+            r.name, min(prev.period_ms, r.period_ms),
+            min(res) if len(res) == 2 else None,
+            prev.value_range or r.value_range)
+
+    planned = []
+    for r in merged.values():
+        stored, _ = resolve_stored_type(r.name, toc)
+        planned.append(PlannedVar(r.name, stored, choose_wire_type(r, stored), r.period_ms))
+
+    # Schnellste Raten zuerst, innerhalb einer Rate größte Variablen zuerst (FFD)
+    planned.sort(key=lambda v: (v.period_ms, -v.size, v.name))
+    blocks: List[LogBlock] = []
+    for v in planned:
+        fits = [b for b in blocks if b.free >= v.size and
+                (b.period_ms == v.period_ms or (allow_upsample and b.period_ms < v.period_ms))]
+        if fits:
+            # gleiche Rate bevorzugen, dann Best-Fit
+            target = min(fits, key=lambda b: (b.period_ms != v.period_ms, b.free))
+        else:
+            target = LogBlock(f"{name_prefix}{len(blocks)}", v.period_ms)
+            blocks.append(target)
+        target.variables.append(v)
+    return blocks
+
+
+# ------------------------------------------------------------
+# Kennzahlen & Ausgabe
+# ------------------------------------------------------------
+def bandwidth(blocks) -> Tuple[float, float]:
+    """(Pakete/s, Bytes/s) auf dem Funkkanal für eine Liste von Blöcken."""
+    pkts = sum(1000.0 / b.period_ms for b in blocks)
+    byts = sum((b.size + PACKET_OVERHEAD) * 1000.0 / b.period_ms for b in blocks)
+    return pkts, byts
+
+
+def baseline_blocks(preset: str, toc: Dict[str, str]) -> List[LogBlock]:
+    blocks = []
+    for i, (period, variables) in enumerate(BASELINES.get(preset, [])):
+        b = LogBlock(f"Baseline{i}", period)
+        for name, fetch_as in variables:
+            b.variables.append(PlannedVar(name, resolve_stored_type(name, toc)[0], fetch_as, period))
+        blocks.append(b)
+    return blocks
+
+
+def build_log_configs(blocks):
+    """Erzeugt cflib-LogConfig-Objekte aus einem Plan."""
+    from cflib.crazyflie.log import LogConfig
+    configs = []
+    for b in blocks:
+        lg = LogConfig(name=b.name, period_in_ms=b.period_ms)
+        for v in b.variables:
+            lg.add_variable(v.name, v.fetch_as)
+        configs.append(lg)
+    return configs
+
+
+def print_plan(blocks, title="Plan"):
+    print(f"== {title} ==")
+    for b in blocks:
+        print(f"  {b.name}: {b.period_ms} ms, {b.size}/{MAX_BLOCK_PAYLOAD} B")
+        for v in b.variables:
+            note = "" if v.period_ms == b.period_ms else f"  (angefordert {v.period_ms} ms)"
+            print(f"    {v.name:24s} {v.stored_as:>9s} -> {v.fetch_as:<9s} {v.size} B{note}")
+    pkts, byts = bandwidth(blocks)
+    print(f"  Blöcke={len(blocks)}  Pakete/s={pkts:.1f}  Bytes/s={byts:.0f}")
+
+
+def _parse_var(spec: str) -> VarRequest:
+    """name:period_ms[:resolution[:lo:hi]]"""
+    parts = spec.split(":")
+    req = VarRequest(parts[0], int(parts[1]))
+    if len(parts) > 2 and parts[2]:
+        req.resolution = float(parts[2])
+    if len(parts) > 4:
+        req.value_range = (float(parts[3]), float(parts[4]))
+    return req
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Packt Log-Variablen in minimale CRTP-Log-Blöcke")
+    ap.add_argument("--cache", action="append", default=None,
+                    help="TOC-Cache-Verzeichnis (mehrfach möglich, Default: ./cache)")
+    ap.add_argument("--preset", choices=sorted(PRESETS), help="vordefinierte Variablenliste")
+    ap.add_argument("--var", action="append", default=[],
+                    help="name:period_ms[:resolution[:lo:hi]]")
+    ap.add_argument("--no-upsample", action="store_true",
+                    help="langsame Variablen nicht in schnellere Blöcke legen")
+    args = ap.parse_args(argv)
+
+    toc = load_log_toc(args.cache or ["cache"])
+    requests = list(PRESETS.get(args.preset, [])) + [_parse_var(s) for s in args.var]
+    if not requests:
+        ap.error("keine Variablen angegeben (--preset oder --var)")
+
+    missing = sorted({r.name for r in requests if r.name not in toc})
+    if missing:
+        print(f"[WARN] nicht im Log-TOC-Cache, nutze Fallback-Typen: {', '.join(missing)}")
+
+    try:
+        blocks = plan_blocks(requests, toc, allow_upsample=not args.no_upsample)
+    except (KeyError, ValueError) as exc:
+        ap.error(str(exc))
+    if args.preset in BASELINES:
+        print_plan(baseline_blocks(args.preset, toc), title=f"Bisher ({args.preset})")
+    print_plan(blocks)
+
+
+if __name__ == "__main__":
+    main()
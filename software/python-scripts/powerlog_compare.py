@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vergleich beliebig vieler Ladeläufe (cf_powerlog_*.csv aus Rotor_as_fan.py).
+
+ * Laden, Kennzahlen je Lauf und Ereignis-Erkennung parallel über die Dateien
+   (ProcessPoolExecutor, --jobs)
+ * Ausrichten auf ein Ereignis: Ladebeginn (pm.state -> 1 bzw. Ladestrom > Schwelle),
+   beliebiger pm.state-Wechsel, Erreichen einer Spannung oder Dateianfang
+ * Resampling auf eine gemeinsame Zeitachse (relativ zum Ereignis) oder auf eine
+   gemeinsame vbat-Achse, vektorisiert mit np.interp je Lauf (keine Schleifen über Zeilen)
+ * Kennzahlen je Lauf: Abtastperiode und Jitter, Zeit 3.7 -> 4.2 V, mittlerer Ladestrom,
+   Temperaturanstieg; paarweise: Differenz der Ladezeit, RMS-Abstand der vbat- und
+   Temperaturkurven auf der gemeinsamen Achse (Matrixprodukte statt Paar-Schleifen)
+
+Zeitspalte wie in telemetry_db.py: t_fw_aligned_s (timebase), sonst t_host_s.
+Der Ladestrom wird in der Einheit der Spalte pm.chargeCurrent_mA ausgegeben.
+
+Beispiele:
+    python powerlog_compare.py ../../experiments/sensor-logs
+    python powerlog_compare.py logs/ --align charge --axis time --dt 5 --out vergleich.json
+    python powerlog_compare.py a.csv b.csv --align state:0-1 --axis vbat --save-resampled kurven.npz
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from telemetry_db import KIND_POWER, detect_kind, run_id_from_path
+
+# ------------------------------------------------------------
+# Konfiguration
+# ------------------------------------------------------------
+COLS = {                          # Schlüssel -> Spaltenname im Power-Log
+    "t_host": "t_host_s",
+    "t_fw": "t_fw_aligned_s",
+    "temp": "baro.temp_C",
+    "level": "pm.batteryLevel_pct",
+    "ichg": "pm.chargeCurrent_mA",
+    "state": "pm.state",
+    "vbat": "pm.vbat_V",
+}
+PM_STATE_CHARGING = 1
+V_LOW, V_HIGH = 3.7, 4.2          # Fenster für die Ladezeit
+VBAT_SMOOTH_S = 5.0               # gleitender Mittelwert vor der Schwellen-/Achsenbildung
+ICHG_START = 0.05                 # Ladebeginn ohne pm.state: Ladestrom über dieser Schwelle
+DEFAULT_DT_S = 1.0
+DEFAULT_DV = 0.005
+TOP_RUNS = 20                     # darüber Verteilung statt Tabelle je Lauf
+TOP_PAIRS = 15                    # bei vielen Läufen nur die unähnlichsten Paare ausgeben
+
+
+@dataclass
+class RunMetrics:
+    run_id: str
+    path: str
+    samples: int
+    duration_s: float
+    dt_median_s: float
+    dt_jitter_p95_s: float        # 95. Perzentil |dt - Median|
+    gaps: int                     # Abstände > 2 x Median
+    align_t_s: Optional[float]    # Ereigniszeit in der Zeitachse des Logs
+    vbat_start_v: float
+    vbat_end_v: float
+    t_3v7_4v2_s: Optional[float]
+    ichg_mean: Optional[float]    # über das 3.7 -> 4.2 V-Fenster, sonst über die Ladephase
+    temp_start_c: float
+    temp_rise_c: float            # max - Wert am Ereignis (bzw. Start)
+
+
+# ------------------------------------------------------------
+# Laden und Ereignisse (läuft in den Worker-Prozessen)
+# ------------------------------------------------------------
+def load_powerlog(path: Path) -> Dict[str, np.ndarray]:
+    """Numerische Spalten als float64-Arrays, sortiert nach der Zeit, doppelte Zeitstempel entfernt."""
+    with path.open(newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f))
+    idx = {k: header.index(c) for k, c in COLS.items() if c in header}
+    if "t_host" not in idx or "vbat" not in idx:
+        raise ValueError(f"{path}: kein Power-Log (t_host_s / pm.vbat_V fehlen)")
+    keys = sorted(idx, key=idx.get)
+    usecols = [idx[k] for k in keys]
+    try:
+        # C-Parser; scheitert an leeren Feldern (neuere Logs, z. B. t_fw_aligned_s ohne Sync)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)   # nur Header: leere Matrix, Warnung kommt aus main()
+            data = np.loadtxt(path, delimiter=",", skiprows=1, usecols=usecols, dtype=np.float64, ndmin=2)
+    except ValueError:
+        data = np.genfromtxt(path, delimiter=",", skip_header=1, usecols=usecols,
+                             dtype=np.float64, invalid_raise=False)
+        data = data.reshape(-1, len(usecols))
+    cols = {k: data[:, i] for i, k in enumerate(keys)}
+    t = cols["t_host"]
+    if "t_fw" in cols and np.isfinite(cols["t_fw"]).all():
+        t = cols["t_fw"]
+    ok = np.isfinite(t) & np.isfinite(cols["vbat"])
+    t = t[ok]
+    order = np.argsort(t, kind="stable")
+    t_sorted = t[order]
+    keep = np.diff(t_sorted, prepend=-np.inf) > 0      # auch für Logs ohne gültige Zeile
+    sel = np.flatnonzero(ok)[order][keep]
+    out = {k: (cols[k][sel] if k in cols else np.full(sel.size, np.nan)) for k in COLS if k not in ("t_host", "t_fw")}
+    out["t"] = t_sorted[keep]
+    return out
+
+
+def smooth(x: np.ndarray, t: np.ndarray, window_s: float = VBAT_SMOOTH_S) -> np.ndarray:
+    """Gleitender Mittelwert über window_s (kumulative Summe, Ränder mit kürzerem Fenster)."""
+    if x.size < 3:
+        return x.copy()
+    n = max(1, int(round(window_s / np.median(np.diff(t)))))
+    c = np.concatenate(([0.0], np.cumsum(x)))
+    i = np.arange(x.size)
+    lo = np.maximum(0, i - n // 2)
+    hi = np.minimum(x.size, i + n // 2 + 1)
+    return (c[hi] - c[lo]) / (hi - lo)
+
+
+def first_crossing(t: np.ndarray, x: np.ndarray, level: float) -> Optional[float]:
+    """Erster Zeitpunkt, an dem x level von unten erreicht (linear interpoliert)."""
+    above = x >= level
+    if not above.any():
+        return None
+    i = int(np.argmax(above))
+    if i == 0:
+        return float(t[0]) if x[0] == level or x.size == 1 else None
+    x0, x1 = x[i - 1], x[i]
+    return float(t[i - 1] + (level - x0) / (x1 - x0) * (t[i] - t[i - 1]))
+
+
+def find_event(run: Dict[str, np.ndarray], align: str) -> Optional[float]:
+    """
+    align: 'start' | 'charge' | 'state' (erster Wechsel) | 'state:A-B' | 'vbat:<V>'
+    Liefert die Ereigniszeit in der Zeitachse des Logs oder None.
+    """
+    t, st = run["t"], run["state"]
+    if align == "start":
+        return float(t[0])
+    if align == "charge":
+        hit = (st == PM_STATE_CHARGING) | (run["ichg"] > ICHG_START)
+        return float(t[int(np.argmax(hit))]) if hit.any() else None
+    if align.startswith("state"):
+        change = np.flatnonzero(np.diff(st) != 0) + 1
+        if ":" in align:
+            a, b = (float(s) for s in align.split(":", 1)[1].split("-"))
+            change = change[(st[change - 1] == a) & (st[change] == b)]
+        return float(t[change[0]]) if change.size else None
+    if align.startswith("vbat:"):
+        return first_crossing(t, smooth(run["vbat"], t), float(align.split(":", 1)[1]))
+    raise ValueError(f"unbekannte Ausrichtung '{align}'")
+
+
+def run_metrics(path: Path, run: Dict[str, np.ndarray], align_t: Optional[float]) -> RunMetrics:
+    t, v, ichg, temp, st = run["t"], run["vbat"], run["ichg"], run["temp"], run["state"]
+    dt = np.diff(t)
+    dt_med = float(np.median(dt)) if dt.size else float("nan")
+    v_s = smooth(v, t)
+    t_lo, t_hi = first_crossing(t, v_s, V_LOW), first_crossing(t, v_s, V_HIGH)
+    if v_s[0] >= V_LOW and t_hi is not None:
+        t_lo = None                              # Lauf beginnt schon über 3.7 V: Fenster unvollständig
+    window = (t >= t_lo) & (t <= t_hi) if t_lo is not None and t_hi is not None else (st == PM_STATE_CHARGING)
+    i_win = ichg[window & np.isfinite(ichg)]
+    t_ref = align_t if align_t is not None else t[0]
+    temp_ref = float(np.interp(t_ref, t, temp)) if np.isfinite(temp).any() else float("nan")
+    return RunMetrics(
+        run_id=run_id_from_path(path),
+        path=str(path),
+        samples=int(t.size),
+        duration_s=float(t[-1] - t[0]),
+        dt_median_s=dt_med,
+        dt_jitter_p95_s=float(np.percentile(np.abs(dt - dt_med), 95)) if dt.size else float("nan"),
+        gaps=int(np.count_nonzero(dt > 2.0 * dt_med)),
+        align_t_s=align_t,
+        vbat_start_v=float(v_s[0]),
+        vbat_end_v=float(v_s[-1]),
+        t_3v7_4v2_s=(t_hi - t_lo) if t_lo is not None and t_hi is not None else None,
+        ichg_mean=float(i_win.mean()) if i_win.size else None,
+        temp_start_c=temp_ref,
+        temp_rise_c=float(np.nanmax(temp) - temp_ref) if np.isfinite(temp).any() else float("nan"),
+    )
+
+
+def process_file(path: str, align: str):
+    """
+    Worker: Log laden, Ereignis suchen, Kennzahlen berechnen; Arrays gehen an den Hauptprozess zurück.
+    Kein Power-Log (Header wie in telemetry_db.detect_kind) oder keine gültigen Zeilen: None.
+    """
+    p = Path(path)
+    with p.open(newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), [])
+    if detect_kind(p, header) != KIND_POWER:
+        return None
+    run = load_powerlog(p)
+    if run["t"].size == 0:
+        return None
+    align_t = find_event(run, align)
+    return run_metrics(p, run, align_t), run
+
+
+# ------------------------------------------------------------
+# Gemeinsame Achsen
+# ------------------------------------------------------------
+def resample_time(runs: List[Dict[str, np.ndarray]], offsets: np.ndarray, dt: float, keys=("vbat", "ichg", "temp")):
+    """
+    Gemeinsame Zeitachse relativ zum Ereignis (Vereinigung aller Läufe, außerhalb NaN).
+    Liefert (achse, {key: Matrix Läufe x Punkte}).
+    """
+    t0 = min(float(r["t"][0]) - o for r, o in zip(runs, offsets))
+    t1 = max(float(r["t"][-1]) - o for r, o in zip(runs, offsets))
+    axis = np.arange(np.floor(t0 / dt) * dt, t1 + dt, dt)
+    out = {k: np.full((len(runs), axis.size), np.nan) for k in keys}
+    for i, (r, o) in enumerate(zip(runs, offsets)):
+        tr = r["t"] - o
+        for k in keys:
+            y = r[k]
+            good = np.isfinite(y)
+            if good.sum() >= 2:
+                out[k][i] = np.interp(axis, tr[good], y[good], left=np.nan, right=np.nan)
+    return axis, out
+
+
+def resample_vbat(runs: List[Dict[str, np.ndarray]], offsets: np.ndarray, dv: float, keys=("t", "ichg", "temp")):
+    """
+    Gemeinsame vbat-Achse: je Lauf geglättete, monoton gemachte Spannung (laufendes Maximum)
+    als Stützstellen; t ist die Zeit relativ zum Ereignis, zu der die Spannung erreicht wurde.
+    """
+    mono = []
+    for r, o in zip(runs, offsets):
+        v = np.maximum.accumulate(smooth(r["vbat"], r["t"]))
+        v_u, first = np.unique(v, return_index=True)
+        mono.append((v_u, first, o))
+    lo = min(m[0][0] for m in mono)
+    hi = max(m[0][-1] for m in mono)
+    axis = np.arange(np.ceil(lo / dv) * dv, hi + dv / 2, dv)
+    out = {k: np.full((len(runs), axis.size), np.nan) for k in keys}
+    for i, (r, (v_u, first, o)) in enumerate(zip(runs, mono)):
+        if v_u.size < 2:
+            continue
+        for k in keys:
+            y = (r["t"] - o) if k == "t" else r[k]
+            out[k][i] = np.interp(axis, v_u, y[first], left=np.nan, right=np.nan)
+    return axis, out
+
+
+def pairwise_rms(m: np.ndarray):
+    """
+    RMS-Abstand aller Zeilenpaare über die gemeinsam gültigen Punkte:
+    sum (a-b)^2 = A^2 M^T + M (B^2)^T - 2 A B^T mit NaN -> 0 und Maske M.
+    """
+    mask = np.isfinite(m).astype(np.float64)
+    a = np.where(mask > 0, m, 0.0)
+    a2 = a * a
+    n = mask @ mask.T
+    ss = a2 @ mask.T + mask @ a2.T - 2.0 * (a @ a.T)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rms = np.sqrt(np.maximum(ss, 0.0) / n)
+    rms[n == 0] = np.nan
+    return rms, n
+
+
+# ------------------------------------------------------------
+# Bericht
+# ------------------------------------------------------------
+def _f(x, fmt):
+    return format(x, fmt) if x is not None and x == x else "-"
+
+
+def print_report(metrics: List[RunMetrics], pairs: List[dict], curve_key: str, align: str, n_axis: int, runtime_s: float):
+    axis_name, curve_label = ("time", "RMS vbat mV") if curve_key == "rms_vbat_mv" else ("vbat", "RMS t s")
+    print(f"[CMP] {len(metrics)} Läufe, Ausrichtung '{align}', Achse {axis_name} ({n_axis} Punkte), "
+          f"Laufzeit {runtime_s:.1f} s")
+    rows = metrics
+    if len(metrics) > TOP_RUNS:
+        # kompakt: Verteilung je Kennzahl, danach nur die Läufe mit kürzester/längster Ladezeit
+        print(f"{'Kennzahl':12s} {'min':>9s} {'median':>9s} {'max':>9s} {'n':>5s}")
+        for key, label in (("duration_s", "Dauer s"), ("dt_jitter_p95_s", "Jit95 s"), ("t_3v7_4v2_s", "3.7->4.2 s"),
+                           ("ichg_mean", "I mittel"), ("temp_rise_c", "dT °C")):
+            v = np.array([getattr(m, key) for m in metrics if getattr(m, key) is not None], dtype=np.float64)
+            v = v[np.isfinite(v)]
+            if v.size:
+                print(f"{label:12s} {v.min():9.3f} {np.median(v):9.3f} {v.max():9.3f} {v.size:5d}")
+        timed = sorted((m for m in metrics if m.t_3v7_4v2_s is not None), key=lambda m: m.t_3v7_4v2_s)
+        rows = timed[:TOP_RUNS // 2] + timed[-(TOP_RUNS // 2):] if len(timed) > TOP_RUNS else timed
+        print(f"Läufe mit kürzester/längster Ladezeit ({len(rows)} von {len(metrics)}):")
+    print(f"{'Lauf':14s} {'Samples':>7s} {'Dauer s':>8s} {'dt ms':>6s} {'Jit95 ms':>8s} {'Lücken':>6s} "
+          f"{'Ereig. s':>8s} {'V start':>7s} {'V end':>6s} {'3.7->4.2 s':>10s} {'I mittel':>8s} {'dT °C':>6s}")
+    for m in rows:
+        print(f"{m.run_id[:14]:14s} {m.samples:7d} {m.duration_s:8.1f} {1000 * m.dt_median_s:6.0f} "
+              f"{1000 * m.dt_jitter_p95_s:8.1f} {m.gaps:6d} {_f(m.align_t_s, '8.1f'):>8s} {m.vbat_start_v:7.3f} "
+              f"{m.vbat_end_v:6.3f} {_f(m.t_3v7_4v2_s, '10.1f'):>10s} {_f(m.ichg_mean, '8.3f'):>8s} "
+              f"{_f(m.temp_rise_c, '6.2f'):>6s}")
+    if not pairs:
+        return
+    shown = pairs if len(pairs) <= TOP_PAIRS else pairs[:TOP_PAIRS]
+    title = "Paare" if len(pairs) <= TOP_PAIRS else f"{TOP_PAIRS} unähnlichste von {len(pairs)} Paaren"
+    print(f"{title} (RMS auf gemeinsamer Achse, Überlappung in Punkten):")
+    print(f"{'Lauf A':14s} {'Lauf B':14s} {'d 3.7->4.2 s':>12s} {'d I mittel':>10s} {'d dT °C':>7s} "
+          f"{curve_label:>11s} {'RMS T °C':>8s} {'Überl.':>6s}")
+    for p in shown:
+        print(f"{p['a'][:14]:14s} {p['b'][:14]:14s} {_f(p['d_t_3v7_4v2_s'], '12.1f'):>12s} "
+              f"{_f(p['d_ichg_mean'], '10.3f'):>10s} {_f(p['d_temp_rise_c'], '7.2f'):>7s} "
+              f"{_f(p[curve_key], '11.1f'):>11s} {_f(p['rms_temp_c'], '8.2f'):>8s} {p['overlap']:6d}")
+
+
+def _nan_to_none(x):
+    return None if x is None or x != x else x
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Ausrichten und Vergleichen mehrerer Power-Logs")
+    ap.add_argument("paths", nargs="+", help="CSV-Dateien oder Ordner (cf_powerlog_*.csv)")
+    ap.add_argument("--align", default="charge",
+                    help="start | charge | state | state:A-B | vbat:<V> (Default: charge)")
+    ap.add_argument("--axis", choices=("time", "vbat"), default="time", help="gemeinsame Achse")
+    ap.add_argument("--dt", type=float, default=DEFAULT_DT_S, help="Raster der Zeitachse (s)")
+    ap.add_argument("--dv", type=float, default=DEFAULT_DV, help="Raster der vbat-Achse (V)")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Worker-Prozesse")
+    ap.add_argument("--out", default=None, help="Bericht als JSON")
+    ap.add_argument("--save-resampled", default=None, help="Achse und Matrizen als .npz")
+    args = ap.parse_args(argv)
+
+    files = []
+    for p in map(Path, args.paths):
+        files += sorted(p.glob("cf_powerlog_*.csv")) if p.is_dir() else [p]
+    if not files:
+        print("[ERR] keine Power-Logs gefunden", file=sys.stderr)
+        return 1
+
+    t_start = time.perf_counter()
+    jobs = max(1, min(args.jobs, len(files)))
+    if jobs == 1:
+        results = [process_file(str(f), args.align) for f in files]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            results = list(ex.map(process_file, map(str, files), [args.align] * len(files),
+                                  chunksize=max(1, len(files) // (4 * jobs))))
+    skipped = [str(f) for f, r in zip(files, results) if r is None]
+    if skipped:
+        print(f"[WARN] kein Power-Log oder keine gültigen Zeilen, übersprungen: {', '.join(skipped)}")
+    results = [r for r in results if r is not None]
+    if not results:
+        print("[ERR] keine auswertbaren Power-Logs", file=sys.stderr)
+        return 1
+    metrics = [m for m, _ in results]
+    runs = [r for _, r in results]
+    missing = [m.run_id for m in metrics if m.align_t_s is None]
+    if missing:
+        print(f"[WARN] Ereignis '{args.align}' nicht gefunden, Ausrichtung auf Dateianfang: {', '.join(missing)}")
+    offsets = np.array([m.align_t_s if m.align_t_s is not None else float(r["t"][0]) for m, r in zip(metrics, runs)])
+
+    if args.axis == "time":
+        axis, mats = resample_time(runs, offsets, args.dt)
+    else:
+        axis, mats = resample_vbat(runs, offsets, args.dv)
+
+    # Paarweise Kennzahlen: Differenzen per Broadcasting, Kurvenabstände per Matrixprodukt
+    ids = [m.run_id for m in metrics]
+    iu = np.triu_indices(len(runs), k=1)
+    vec = {k: np.array([_nan_to_none(getattr(m, k)) for m in metrics], dtype=np.float64)
+           for k in ("t_3v7_4v2_s", "ichg_mean", "temp_rise_c")}
+    diff = {k: (v[:, None] - v[None, :])[iu] for k, v in vec.items()}
+    # Kurvenabstand: auf der Zeitachse vbat (mV), auf der vbat-Achse die Zeit bis zur Spannung (s)
+    if args.axis == "time":
+        rms_c, overlap = pairwise_rms(mats["vbat"])
+        rms_c, curve_key = rms_c * 1000.0, "rms_vbat_mv"
+    else:
+        (rms_c, overlap), curve_key = pairwise_rms(mats["t"]), "rms_t_s"
+    rms_t, _ = pairwise_rms(mats["temp"])
+    pairs = [{
+        "a": ids[i], "b": ids[j],
+        "d_t_3v7_4v2_s": _nan_to_none(float(diff["t_3v7_4v2_s"][k])),
+        "d_ichg_mean": _nan_to_none(float(diff["ichg_mean"][k])),
+        "d_temp_rise_c": _nan_to_none(float(diff["temp_rise_c"][k])),
+        curve_key: _nan_to_none(float(rms_c[i, j])),
+        "rms_temp_c": _nan_to_none(float(rms_t[i, j])),
+        "overlap": int(overlap[i, j]),
+    } for k, (i, j) in enumerate(zip(*iu))]
+    # unähnlichste zuerst: größte |Ladezeit-Differenz|, dann RMS vbat
+    pairs.sort(key=lambda p: (-(abs(p["d_t_3v7_4v2_s"]) if p["d_t_3v7_4v2_s"] is not None else -1.0),
+                              -(p[curve_key] or 0.0)))
+
+    print_report(metrics, pairs, curve_key, args.align, axis.size, time.perf_counter() - t_start)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"align": args.align, "axis": args.axis,
+                       "runs": [{k: _nan_to_none(v) for k, v in asdict(m).items()} for m in metrics],
+                       "pairs": pairs}, f, indent=1)
+        print(f"[OUT] {args.out}")
+    if args.save_resampled:
+        np.savez_compressed(args.save_resampled, axis=axis, run_ids=np.array(ids), **mats)
+        print(f"[OUT] {args.save_resampled}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# fault_injection.py
+# Timing-Fehler zwischen Sensorquellen und FSM sowie zwischen FSM und Kommando-Senke:
+# Sensorlatenz, Tick-Jitter, verlorene Samples, veraltetes Yaw und Kommandolatenz.
+# Offline (timing_limits_sim.py) und live im Flugskript als "degraded"-Modus
+# (WF_FAULTS="period=0.2,delay=0.1,jitter=0.05,drop=0.1,stale_yaw=0.3,cmd_delay=0.1").
+
+from __future__ import annotations
+from collections import deque
+from dataclasses import dataclass, fields
+from typing import Any, Optional, Tuple
+import random
+
+
+@dataclass
+class FaultConfig:
+    period: float = 0.1          # s, nominale Tick-Periode (Log-Block im Flugskript)
+    delay: float = 0.0           # s, Sensorlatenz bis zur FSM
+    jitter: float = 0.0          # s, Tick-Periode gleichverteilt in [period - jitter, period + jitter]
+    drop: float = 0.0            # Wahrscheinlichkeit, dass ein Sample verloren geht (FSM-Tick fällt aus)
+    stale_yaw: float = 0.0       # s, zusätzliches Alter des Yaw gegenüber den Abständen
+    cmd_delay: float = 0.0       # s, Latenz FSM -> Kommando-Senke
+    seed: Optional[int] = None
+
+    def __post_init__(self):
+        if self.period <= 0.0:
+            raise ValueError(f"period={self.period} muss > 0 sein")
+        if not 0.0 <= self.jitter < self.period:
+            raise ValueError(f"jitter={self.jitter} muss in [0, period) liegen")
+        if not 0.0 <= self.drop < 1.0:
+            raise ValueError(f"drop={self.drop} muss in [0, 1) liegen")
+        if min(self.delay, self.stale_yaw, self.cmd_delay) < 0.0:
+            raise ValueError("delay, stale_yaw und cmd_delay müssen >= 0 sein")
+
+    @property
+    def active(self) -> bool:
+        return any((self.delay, self.jitter, self.drop, self.stale_yaw, self.cmd_delay))
+
+    @classmethod
+    def from_string(cls, spec: str) -> "FaultConfig":
+        """'period=0.2,delay=0.1,...' -> FaultConfig (unbekannte Schlüssel -> ValueError)."""
+        names = {f.name: f for f in fields(cls)}
+        kwargs = {}
+        for part in filter(None, (p.strip() for p in spec.split(","))):
+            key, _, val = part.partition("=")
+            key = key.strip()
+            if key not in names:
+                raise ValueError(f"unbekannter Fault-Parameter '{key}' (erlaubt: {', '.join(names)})")
+            kwargs[key] = int(val) if key == "seed" else float(val)
+        return cls(**kwargs)
+
+
+class DelayLine:
+    """Verzögert Werte um delay_s; liefert den neuesten fälligen Wert (Halteglied), vorher 'initial'."""
+
+    def __init__(self, delay_s: float, initial: Any = None):
+        self.delay_s = delay_s
+        self._q: deque = deque()
+        self._out = initial
+
+    def push(self, t: float, value: Any) -> Any:
+        self._q.append((t, value))
+        return self.at(t)
+
+    def at(self, t: float) -> Any:
+        while self._q and self._q[0][0] + self.delay_s <= t + 1e-9:
+            self._out = self._q.popleft()[1]
+        return self._out
+
+
+class FaultInjector:
+    """
+    Sensoren -> sense() -> FSM -> command() -> Senke.
+    sense() liefert None für ein verlorenes Sample: die FSM wird in diesem Tick
+    nicht aufgerufen und die Senke hält das letzte Kommando.
+    """
+
+    def __init__(self, cfg: Optional[FaultConfig] = None):
+        self.cfg = cfg or FaultConfig()
+        self.rng = random.Random(self.cfg.seed)
+        self._ranges = DelayLine(self.cfg.delay)
+        self._yaw = DelayLine(self.cfg.delay + self.cfg.stale_yaw)
+        self._cmd = DelayLine(self.cfg.cmd_delay, (0.0, 0.0, 0.0))
+        self.ticks = 0
+        self.dropped = 0
+        self.max_period = 0.0
+        self._last_tick: Optional[float] = None
+
+    def next_period(self) -> float:
+        """Dauer bis zum nächsten Tick (s), mit Jitter."""
+        if self.cfg.jitter <= 0.0:
+            return self.cfg.period
+        return self.cfg.period + self.rng.uniform(-self.cfg.jitter, self.cfg.jitter)
+
+    def sense(self, t: float, ranges: Tuple[float, ...], yaw: float) -> Optional[Tuple[Tuple[float, ...], float]]:
+        """Messung zum Zeitpunkt t einspeisen; liefert (ranges, yaw) wie die FSM sie sieht oder None."""
+        if self._last_tick is not None:
+            self.max_period = max(self.max_period, t - self._last_tick)
+        self._last_tick = t
+        self.ticks += 1
+        r = self._ranges.push(t, ranges)
+        y = self._yaw.push(t, yaw)
+        if r is None or y is None:          # noch nichts durch die Verzögerung gekommen
+            return None
+        if self.cfg.drop > 0.0 and self.rng.random() < self.cfg.drop:
+            self.dropped += 1
+            return None
+        return r, y
+
+    def command(self, t: float, cmd: Optional[Tuple[float, float, float]] = None) -> Tuple[float, float, float]:
+        """FSM-Kommando einspeisen (None = kein neues); liefert das an der Senke gültige Kommando."""
+        if cmd is not None:
+            return self._cmd.push(t, cmd)
+        return self._cmd.at(t)
+
+    def stats(self) -> dict:
+        return {
+            "ticks": self.ticks,
+            "dropped": self.dropped,
+            "dropped_pct": 100.0 * self.dropped / self.ticks if self.ticks else 0.0,
+            "max_period_s": self.max_period,
+        }
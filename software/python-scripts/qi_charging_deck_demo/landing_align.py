@@ -0,0 +1,92 @@
+# landing_align.py
+# Alternativer Ausrichtregler für PREPARE_TO_LAND: PD je Achse mit
+# ratenbegrenzter Stellgröße und Settling-Detektor statt fester Haltezeit.
+# Auswahl über WallFollowing(landing_controller=PDAlignController(...)),
+# Gains aus landing_autotune.py (landing_gains.json).
+
+from __future__ import annotations
+from dataclasses import dataclass, asdict
+from typing import Optional, Tuple
+import json
+import math
+
+
+@dataclass
+class PDAlignGains:
+    # Defaults: handgewählter Startpunkt, nicht getunt (getunte Werte per landing_gains.json)
+    kp: float = 2.0               # (m/s) / m
+    kd: float = 0.8               # (m/s) / (m/s)
+    accel_limit: float = 0.45     # m/s^2, Ratenbegrenzung der Stellgröße
+    d_filter_s: float = 0.2       # s, Tiefpass auf die Fehlerableitung (Ranger-Rauschen)
+    settle_rate: float = 0.15     # m/s, |Fehleränderung| unter dieser Schwelle gilt als ruhig
+    settle_time: float = 0.9      # s, so lange in Toleranz und ruhig, dann LANDING
+
+    def __post_init__(self):
+        if min(self.kp, self.accel_limit, self.settle_rate) <= 0.0 or min(self.kd, self.d_filter_s, self.settle_time) < 0.0:
+            raise ValueError(f"ungültige Gains: {self}")
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "PDAlignGains":
+        with open(path, encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+
+class PDAlignController:
+    """
+    Zwei unabhängige PD-Achsen (Front, Seite) auf die Abstandsfehler.
+    update() liefert (vx, vy_body) wie calc_landing; settled wird True, wenn beide
+    Fehler seit settle_time in der Toleranz liegen und sich kaum noch ändern.
+    """
+
+    def __init__(self, gains: Optional[PDAlignGains] = None):
+        self.gains = gains or PDAlignGains()
+        self.reset()
+
+    def reset(self, u0: Tuple[float, float] = (0.0, 0.0)) -> None:
+        """
+        Beim Eintritt in PREPARE_TO_LAND aufrufen; u0 = zuletzt kommandierte (vx, vy_body).
+        Die Ratenbegrenzung startet dort, das erste update() hält also u0 (nur gesättigt).
+        """
+        self._t: Optional[float] = None
+        self._e = (0.0, 0.0)
+        self._de = (0.0, 0.0)
+        self._u = (float(u0[0]), float(u0[1]))
+        self._ok_since: Optional[float] = None
+        self.settled = False
+
+    @property
+    def in_tolerance(self) -> bool:
+        """Beide Fehler in Toleranz und ruhig (Settling-Zeit läuft)."""
+        return self._ok_since is not None
+
+    def update(self, e_front: float, e_side: float, t: float, v_max: float, tol: float) -> Tuple[float, float]:
+        g = self.gains
+        e = (e_front, e_side)
+        if self._t is None:
+            dt = 0.0
+        else:
+            dt = max(0.0, t - self._t)
+        if dt > 0.0:
+            a = dt / (g.d_filter_s + dt)
+            self._de = tuple(d + a * ((ei - ep) / dt - d) for d, ei, ep in zip(self._de, e, self._e))
+        u = []
+        step = g.accel_limit * dt          # erstes update(): dt = 0, kein Sprung gegenüber u0
+        for ei, di, ui in zip(e, self._de, self._u):
+            target = max(-v_max, min(v_max, g.kp * ei + g.kd * di))
+            target = max(ui - step, min(ui + step, target))
+            u.append(max(-v_max, min(v_max, target)))
+        self._u = (u[0], u[1])
+        self._e = e
+        self._t = t
+
+        calm = all(abs(ei) < tol for ei in e) and math.hypot(*self._de) < g.settle_rate
+        if not calm:
+            self._ok_since = None
+        elif self._ok_since is None:
+            self._ok_since = t
+        self.settled = self._ok_since is not None and t - self._ok_since >= g.settle_time
+        return self._u
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline-Autotuning des PD-Ausrichtreglers (landing_align.py) für PREPARE_TO_LAND.
+
+Bewertet wird die unveränderte WallFollowing-FSM im Zustand PREPARE_TO_LAND gegen
+ein einfaches Anflugmodell in Wandkoordinaten:
+ * Geschwindigkeits-Setpoint -> Istgeschwindigkeit als PT1 (TAU_S) mit Totzeit
+   (LATENCY_S, fault_injection.DelayLine), FSM-Tick alle PERIOD_S
+ * Luftdrift als Ornstein-Uhlenbeck-Störung, Ranger-Rauschen gaußsch
+ * Startbedingungen: simulierte Anflüge (Seite nahe Soll, Front 0.1..0.8 m,
+   Restgeschwindigkeit aus FORWARD_ALONG_WALL) und optional aufgezeichnete
+   Anflüge aus wall_following_status.csv (erste Zeile je PREPARE_TO_LAND-Abschnitt;
+   Rauschen wird dann aus den Aufzeichnungen geschätzt)
+
+Zielgröße: mittlere Zeit bis LANDING. Die FSM-Toleranz (halber Ranger-Puffer,
+10 cm) ist weiter als die Spule verträgt: Landungen mit wahrem Fehler über
+QI_ALIGN_TOL_M kosten zusätzlich RELAND_PENALTY_S (Abheben, neu ausrichten),
+Timeouts zählen als TIMEOUT_S. Sonst gewinnt ein Regler, der beim ersten
+Eintritt ins Band landet. Suche: Zufallssuche, danach
+koordinatenweise Verfeinerung, gleiche Szenarien für alle Kandidaten.
+
+Beispiel:
+    python landing_autotune.py --scenarios 40 --out landing_gains.json
+    python landing_autotune.py --recorded logs/wall_following_status.csv
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import math
+import random
+import statistics
+import time
+from dataclasses import asdict, replace
+
+from wf_logging import start_new_session, LogConfig
+from wall_following import WallFollowing
+from landing_align import PDAlignController, PDAlignGains
+from fault_injection import DelayLine
+
+S = WallFollowing.StateWallFollowing
+
+REFERENCE_DISTANCE = 0.15
+MAX_FORWARD_SPEED = 0.1
+PERIOD_S = 0.1                   # Log-Block des Flugskripts
+PHYS_DT = 0.02
+TAU_S = 0.35                     # Geschwindigkeitsregler der Firmware (grob)
+LATENCY_S = 0.1                  # Sensor + Funk + Setpoint
+RANGE_NOISE_M = 0.008
+DRIFT_SIGMA = 0.02               # m/s, stationäre Streuung der Luftdrift
+DRIFT_TAU_S = 2.0
+TIMEOUT_S = 60.0
+QI_ALIGN_TOL_M = 0.05            # Versatz Empfänger-/Senderspule, bei dem noch geladen wird
+RELAND_PENALTY_S = 10.0
+
+# Suchraum (log-uniform, kd linear)
+SEARCH = {
+    "kp": (0.2, 3.0),
+    "kd": (0.0, 1.0),
+    "accel_limit": (0.05, 1.0),
+    "d_filter_s": (0.05, 1.0),
+    "settle_rate": (0.01, 0.2),
+    "settle_time": (0.2, 1.5),
+}
+
+
+def simulated_starts(n, seed):
+    rng = random.Random(seed)
+    return [(rng.uniform(0.1, 0.8), REFERENCE_DISTANCE + rng.uniform(-0.05, 0.05),
+             MAX_FORWARD_SPEED * rng.uniform(0.5, 1.0), rng.uniform(-0.02, 0.02))
+            for _ in range(n)]
+
+
+def recorded_starts(paths):
+    """Startbedingungen und Ist-Zeiten bis LANDING aus Status-CSVs von wf_logging."""
+    starts, durations, diffs = [], [], []
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = [r for r in csv.DictReader(f)]
+        seg = []
+        for r in rows + [None]:
+            if r is not None and r.get("state") == "PREPARE_TO_LAND" and r.get("front_m") not in (None, ""):
+                seg.append(r)
+                continue
+            if seg:
+                f0, s0 = float(seg[0]["front_m"]), float(seg[0]["side_m"])
+                if f0 < 5.0 and s0 < 5.0:
+                    starts.append((f0, s0, 0.0, 0.0))
+                    if r is not None and r.get("state") == "LANDING" and seg[0].get("t_host_s"):
+                        durations.append(float(r["t_host_s"]) - float(seg[0]["t_host_s"]))
+                f = [float(r_["front_m"]) for r_ in seg]
+                diffs += [f[i + 1] - 2.0 * f[i] + f[i - 1] for i in range(1, len(f) - 1)]
+                seg = []
+    # 2. Differenz: Streuung sigma * sqrt(6), langsame Bewegung fällt weitgehend heraus
+    noise = statistics.pstdev(diffs) / math.sqrt(6.0) if len(diffs) > 10 else None
+    return starts, durations, noise
+
+
+def run_approach(start, seed, gains=None, noise=RANGE_NOISE_M):
+    """Ein Anflug; liefert (Zeit bis LANDING, wahrer Fehler bei LANDING, Anzahl Toleranz-Resets)."""
+    rng = random.Random(seed)
+    d_front, d_side, v_front, v_side = start
+    ctrl = PDAlignController(gains) if gains is not None else None
+    wf = WallFollowing(reference_distance_from_wall=REFERENCE_DISTANCE, max_forward_speed=MAX_FORWARD_SPEED,
+                       init_state=S.PREPARE_TO_LAND, landing_controller=ctrl)
+    wf.is_battery_low = True
+    direction = WallFollowing.WallFollowingDirection.RIGHT
+    cmd = DelayLine(LATENCY_S, (0.0, 0.0))
+    drift = [0.0, 0.0]
+    k_drift = math.exp(-PHYS_DT / DRIFT_TAU_S)
+    q_drift = DRIFT_SIGMA * math.sqrt(1.0 - k_drift * k_drift)
+    t, next_tick, resets, was_ok = 0.0, 0.0, 0, False
+    u = (0.0, 0.0)
+    while t < TIMEOUT_S:
+        if t >= next_tick - 1e-9:
+            next_tick += PERIOD_S
+            front = d_front + rng.gauss(0.0, noise)
+            side = d_side + rng.gauss(0.0, noise)
+            vx, vy, _, st = wf.wall_follower(front, side, 0.0, direction, t)
+            if st == S.LANDING:
+                return t, max(abs(d_front - REFERENCE_DISTANCE), abs(d_side - REFERENCE_DISTANCE)), resets
+            ok = wf.align_ok_since is not None if ctrl is None else ctrl.in_tolerance
+            resets += was_ok and not ok
+            was_ok = ok
+            # vy positiv = links; Seitensensor links -> Abstand sinkt
+            u = cmd.push(t, (vx, vy))
+        else:
+            u = cmd.at(t)
+        for i in (0, 1):
+            drift[i] = k_drift * drift[i] + q_drift * rng.gauss(0.0, 1.0)
+        a = PHYS_DT / TAU_S
+        v_front += a * (u[0] - v_front)
+        v_side += a * (u[1] - v_side)
+        d_front -= (v_front + drift[0]) * PHYS_DT
+        d_side -= (v_side + drift[1]) * PHYS_DT
+        t += PHYS_DT
+    return TIMEOUT_S, float("nan"), resets
+
+
+def evaluate(starts, gains, seed, noise):
+    times, costs, errs, resets, misaligned, timeouts = [], [], [], 0, 0, 0
+    for k, s in enumerate(starts):
+        t, err, r = run_approach(s, seed * 10007 + k, gains, noise)
+        resets += r
+        times.append(t)
+        if t >= TIMEOUT_S:
+            timeouts += 1
+            costs.append(TIMEOUT_S)
+            continue
+        errs.append(err)
+        if err > QI_ALIGN_TOL_M:
+            misaligned += 1
+            t += RELAND_PENALTY_S
+        costs.append(t)
+    times_sorted = sorted(times)
+    return {
+        "cost_s": statistics.mean(costs),
+        "mean_s": statistics.mean(times),
+        "median_s": statistics.median(times),
+        "p90_s": times_sorted[int(0.9 * (len(times_sorted) - 1))],
+        "misaligned": misaligned,
+        "timeouts": timeouts,
+        "resets": resets,
+        "err_mean_cm": 100.0 * statistics.mean(errs) if errs else float("nan"),
+    }
+
+
+def _sample(rng):
+    vals = {}
+    for k, (lo, hi) in SEARCH.items():
+        vals[k] = rng.uniform(lo, hi) if lo == 0.0 else math.exp(rng.uniform(math.log(lo), math.log(hi)))
+    return PDAlignGains(**vals)
+
+
+def autotune(starts, seed, noise, candidates, rounds):
+    rng = random.Random(seed)
+    best = PDAlignGains()
+    best_score = evaluate(starts, best, seed, noise)["cost_s"]
+    for _ in range(candidates):
+        g = _sample(rng)
+        score = evaluate(starts, g, seed, noise)["cost_s"]
+        if score < best_score:
+            best, best_score = g, score
+    step = 1.4
+    for _ in range(rounds):
+        improved = False
+        for k, (lo, hi) in SEARCH.items():
+            for f in (step, 1.0 / step):
+                v = getattr(best, k) * f if getattr(best, k) > 0 else 0.05
+                g = replace(best, **{k: min(hi, max(lo, v))})
+                score = evaluate(starts, g, seed, noise)["cost_s"]
+                if score < best_score:
+                    best, best_score, improved = g, score, True
+        if not improved:
+            step = math.sqrt(step)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Autotuning des PD-Ausrichtreglers für PREPARE_TO_LAND")
+    ap.add_argument("--scenarios", type=int, default=40, help="simulierte Anflüge")
+    ap.add_argument("--recorded", nargs="*", default=[], help="wall_following_status.csv mit PREPARE_TO_LAND-Abschnitten")
+    ap.add_argument("--candidates", type=int, default=120, help="Zufallskandidaten")
+    ap.add_argument("--rounds", type=int, default=4, help="Verfeinerungsrunden")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default=None, help="getunte Gains als JSON (z.B. landing_gains.json)")
+    args = ap.parse_args()
+
+    start_new_session(LogConfig(console=False, to_file=False))
+    starts = simulated_starts(args.scenarios, args.seed)
+    noise = RANGE_NOISE_M
+    if args.recorded:
+        rec, durations, rec_noise = recorded_starts(args.recorded)
+        starts += rec
+        noise = rec_noise or noise
+        msg = f"[REC] {len(rec)} aufgezeichnete Anflüge, Rauschen {100 * noise:.1f} cm"
+        if durations:
+            msg += f", Ist-Zeit bis LANDING: Mittel {statistics.mean(durations):.1f} s, Median {statistics.median(durations):.1f} s"
+        print(msg)
+
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # FSM-Debug-Prints unterdrücken
+        before = evaluate(starts, None, args.seed, noise)
+        default = evaluate(starts, PDAlignGains(), args.seed, noise)
+        tuned_gains = autotune(starts, args.seed, noise, args.candidates, args.rounds)
+        tuned = evaluate(starts, tuned_gains, args.seed, noise)
+        # Gegenprobe auf frischen Szenarien (nicht zum Tunen benutzt)
+        fresh = simulated_starts(args.scenarios, args.seed + 1)
+        check_before = evaluate(fresh, None, args.seed + 1, noise)
+        check_tuned = evaluate(fresh, tuned_gains, args.seed + 1, noise)
+
+    print(f"[CFG] {len(starts)} Anflüge, Periode {PERIOD_S} s, Latenz {LATENCY_S} s, PT1 {TAU_S} s, "
+          f"Spulentoleranz {100 * QI_ALIGN_TOL_M:.0f} cm, Laufzeit {time.perf_counter() - t0:.0f} s")
+    print("Zeit bis LANDING; Kosten = inkl. Neuausrichtung bei Versatz > Spulentoleranz")
+    print(f"{'Regler':22s} {'mean s':>7s} {'median s':>9s} {'p90 s':>6s} {'Kosten s':>8s} {'Versatz':>7s} "
+          f"{'Timeout':>7s} {'Resets':>7s} {'Fehler cm':>9s}")
+    for name, r in (("P + 2 s Haltezeit", before), ("PD Default", default), ("PD getunt", tuned),
+                    ("P (Gegenprobe)", check_before), ("PD getunt (Gegenprobe)", check_tuned)):
+        print(f"{name:22s} {r['mean_s']:7.1f} {r['median_s']:9.1f} {r['p90_s']:6.1f} {r['cost_s']:8.1f} "
+              f"{r['misaligned']:7d} {r['timeouts']:7d} {r['resets']:7d} {r['err_mean_cm']:9.1f}")
+    print("[GAINS] " + ", ".join(f"{k}={v:.3f}" for k, v in asdict(tuned_gains).items()))
+    print(f"[RESULT] Zeit bis LANDING: {before['mean_s']:.1f} s -> {tuned['mean_s']:.1f} s "
+          f"({100.0 * (tuned['mean_s'] - before['mean_s']) / before['mean_s']:+.0f} %), "
+          f"Kosten {before['cost_s']:.1f} s -> {tuned['cost_s']:.1f} s")
+    if args.out:
+        tuned_gains.save(args.out)
+        print(f"[OUT] {args.out}")
+
+
+if __name__ == "__main__":
+    main()
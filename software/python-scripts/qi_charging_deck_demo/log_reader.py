@@ -0,0 +1,50 @@
+# log_reader.py
+# Adapter um cflib SyncLogger: zusätzlich zum blockierenden next() ein Lesen mit Timeout
+# (poll) und latest() (Rückstau verwerfen, nur das neueste Paket). SyncLogger bietet
+# beides nicht; der Zugriff auf seine interne, unbegrenzte Queue steckt nur hier.
+
+from __future__ import annotations
+from typing import Any, Optional, Tuple
+import queue
+
+
+class LogReader:
+    """Liest Pakete (ts, data, logconf) eines geöffneten SyncLogger; StopIteration bei Disconnect."""
+
+    def __init__(self, sync_logger):
+        self._logger = sync_logger
+        self._queue: queue.Queue = sync_logger._queue
+        self.skipped = 0            # von latest() verworfene Pakete
+
+    def _check(self, item: Any) -> Any:
+        if item == self._logger.DISCONNECT_EVENT:
+            raise StopIteration
+        return item
+
+    def next(self) -> Tuple[int, dict, Any]:
+        return self._logger.next()
+
+    def poll(self, timeout: float) -> Optional[Tuple[int, dict, Any]]:
+        """Nächstes Paket oder None, wenn binnen timeout s keines kommt."""
+        if not self._logger.is_connected():
+            raise StopIteration
+        try:
+            return self._check(self._queue.get(timeout=max(0.0, timeout)))
+        except queue.Empty:
+            return None
+
+    def latest(self) -> Tuple[Tuple[int, dict, Any], int]:
+        """
+        Nächstes Paket; liegen schon weitere in der Queue, zählt nur das neueste.
+        Liefert (Paket, Anzahl verworfener Pakete).
+        """
+        entry = self.next()
+        skipped = 0
+        while True:
+            try:
+                entry = self._check(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            skipped += 1
+        self.skipped += skipped
+        return entry, skipped
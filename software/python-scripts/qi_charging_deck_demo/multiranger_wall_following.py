@@ -38,13 +38,25 @@ For the example to run the following hardware is needed:
  * Flow deck
  * Multiranger deck
 """
+import contextlib
 import logging
+from dataclasses import asdict
+import os
 import time
 from wf_logging import start_new_session, log_status, log_event, instrument_wall_following, LogConfig, get_logger
+from wf_logging import set_clock_sync, start_metrics_export, end_session
+import timebase
+import wf_trace as trace
 from math import degrees
 from math import radians
 
 from wall_following import WallFollowing
+from log_reader import LogReader
+from setpoint_filter import SetpointFilter, SetpointFilterConfig, CommanderPacketCounter
+from pad_map import PadMap
+from fault_injection import FaultConfig, FaultInjector
+from landing_align import PDAlignController, PDAlignGains
+import wall_following as wall_following_module
 
 import cflib.crtp
 from cflib.crazyflie import Crazyflie
@@ -58,6 +70,24 @@ import keyboard
 
 URI = uri_helper.uri_from_env(default='radio://0/80/2M/E7E7E7E7E7')
 
+# Setpoints nur bei Änderung an den MotionCommander geben; dessen Setpoint-Thread
+# wiederholt den letzten Setpoint selbst alle 0.2 s (Firmware-Timeout 500 ms)
+SETPOINT_EPS_VELOCITY = 0.005   # m/s
+SETPOINT_EPS_YAW_RATE = 0.5     # deg/s
+
+# Belegungskarte + gelernte Pad-Position, bleibt über Flüge erhalten. Nach dem Laden
+# fliegt GO_TO_PAD erst nach der ersten bestätigten Ladung (Relokalisierung, pad_map.py)
+PAD_MAP_FILE = 'pad_map.json'
+PM_STATE_CHARGING = (1, 2)      # pm.state: 1 = lädt, 2 = geladen
+RESTART_DELAY_S = 60.0          # Pause am Boden nach der Landung
+
+# Gains aus landing_autotune.py; ohne Datei bleibt der P-Regler mit 2 s Haltezeit aktiv
+LANDING_GAINS_FILE = 'landing_gains.json'
+
+# Degraded-Modus für Timing-Tests (siehe fault_injection.py / timing_limits_sim.py), z.B.
+# WF_FAULTS="period=0.2,delay=0.1,jitter=0.05,drop=0.1,stale_yaw=0.3,cmd_delay=0.1"
+FAULTS = FaultConfig.from_string(os.getenv('WF_FAULTS', ''))
+
 
 def handle_range_measurement(range):
     if range is None:
@@ -65,28 +95,60 @@ def handle_range_measurement(range):
     return range
 
 
+@contextlib.contextmanager
+def closing_session():
+    """Logging-Session auch bei Abbruch (Exception, Strg+C) mit end_session() abschließen."""
+    try:
+        yield
+    finally:
+        end_session()
+
+
 if __name__ == '__main__':
     # Initialize the low-level drivers
     cflib.crtp.init_drivers()
 
     # Only output errors from the logging framework
     logging.basicConfig(level=logging.ERROR)
+    # Span-Tracing (nur mit WF_TRACE=1 bzw. WF_TRACE=<datei.json>, sonst No-op)
+    trace.trace_wf_logging(globals(), vars(wall_following_module))
     # Start a new logging session
     start_new_session()
+    # Firmware-Zeitstempel der Log-Blöcke auf die monotone Host-Zeit abbilden
+    clock_sync = timebase.ClockSync()
+    set_clock_sync(clock_sync)
+    faults = FaultInjector(FAULTS) if FAULTS.active else None
+    if FAULTS.active or FAULTS.period != FaultConfig.period:
+        log_event("FAULTS", "Degraded-Modus aktiv", **asdict(FAULTS))
 
 
 
     # Tastatur-Listener registrieren
 
     keep_flying = True
+    next_tick = None        # Soll-Zeitpunkt des nächsten FSM-Ticks im Degraded-Modus (Jitter)
+
+    pad_map = PadMap.load(PAD_MAP_FILE) if os.path.exists(PAD_MAP_FILE) else PadMap()
+    log_event("PAD", "Karte geladen", pads=len(pad_map.pads), occupied=pad_map.occupied_cells(),
+              localized=pad_map.localized)
+
+    landing_controller = None
+    if os.path.exists(LANDING_GAINS_FILE):
+        landing_controller = PDAlignController(PDAlignGains.load(LANDING_GAINS_FILE))
+        log_event("LANDING_CTRL", "PD-Ausrichtregler", **asdict(landing_controller.gains))
 
     wall_following = WallFollowing(
         angle_value_buffer=0.1, reference_distance_from_wall=0.15,
-        max_forward_speed=0.1, init_state=WallFollowing.StateWallFollowing.FORWARD)
+        max_forward_speed=0.1, init_state=WallFollowing.StateWallFollowing.FORWARD,
+        pad_map=pad_map, landing_controller=landing_controller)
 
     instrument_wall_following(wall_following)
+    # Verweildauer/Übergänge: Dump bei end_session(), periodisch mit WF_METRICS_EXPORT
+    start_metrics_export()
+    trace.trace_wall_following(wall_following)
 
 
+    @trace.traced("keyboard.on_key_press")
     def on_key_press(e):
         if e.name == 'c':
             # green console print, charging initiated
@@ -114,20 +176,36 @@ if __name__ == '__main__':
     keyboard.on_press(on_key_press)
 
     # Setup logging to get the yaw data
-    lg_stab = LogConfig(name='Stabilizer', period_in_ms=100)
+    lg_stab = LogConfig(name='Stabilizer', period_in_ms=int(round(FAULTS.period * 1000)))
     lg_stab.add_variable('stabilizer.yaw', 'float')
     lg_stab.add_variable('pm.state', 'uint8_t')
+    lg_stab.add_variable('stateEstimate.x', 'float')
+    lg_stab.add_variable('stateEstimate.y', 'float')
+    if trace.enabled():
+        # Paketempfang im cflib-Thread markieren: Abstand zu logger.next() = Wartezeit in der Queue
+        lg_stab.data_received_cb.add_callback(
+            lambda ts, data, conf: trace.instant("cflib.log_rx", fw_ms=ts))
 
     cf = Crazyflie(rw_cache='./cache')
-    with SyncCrazyflie(URI, cf=cf) as scf:
+    with closing_session(), SyncCrazyflie(URI, cf=cf) as scf:
         # Arm the Crazyflie
         scf.cf.platform.send_arming_request(True)
         time.sleep(1.0)
+        # Funkpakete zählen, bevor der MotionCommander seinen Setpoint-Thread startet
+        radio_packets = CommanderPacketCounter(scf.cf.commander, clock=timebase.now)
 
         with MotionCommander(scf) as motion_commander:
+            setpoint_out = SetpointFilter(
+                trace.traced("MotionCommander.start_linear_motion")(
+                    lambda vx, vy, yaw_rate_deg: motion_commander.start_linear_motion(
+                        vx, vy, 0, rate_yaw=yaw_rate_deg)),
+                SetpointFilterConfig(eps_velocity=SETPOINT_EPS_VELOCITY,
+                                     eps_yaw_rate=SETPOINT_EPS_YAW_RATE))
             with Multiranger(scf) as multiranger:
-                with SyncLogger(scf, lg_stab) as logger:
+                with SyncLogger(scf, lg_stab) as sync_logger:
+                    logger = LogReader(sync_logger)
                     while keep_flying:
+                        trace.begin("tick")   # Tick = ein Schleifendurchlauf, endet beim nächsten begin
 
                         # initialize variables
                         velocity_x = 0.0
@@ -136,8 +214,17 @@ if __name__ == '__main__':
                         state_wf = WallFollowing.StateWallFollowing.HOVER
 
                         # Get Yaw
-                        log_entry = logger.next()
+                        trace.begin("logger.next")
+                        if faults is not None:
+                            # Degraded-Modus ohne sleep: Rückstau verwerfen, nur das neueste Sample zählt
+                            log_entry, _ = logger.latest()
+                        else:
+                            log_entry = logger.next()
+                        trace.end("logger.next")
                         data = log_entry[1]
+                        # latency_ms = Alter des Samples bei Verarbeitung (über Minimum)
+                        sample_t = clock_sync.update(log_entry[0])
+                        t_loop = timebase.now()
                         actual_yaw = data['stabilizer.yaw']
                         actual_yaw_rad = radians(actual_yaw)
 
@@ -145,49 +232,100 @@ if __name__ == '__main__':
                         check_battery_level(data)
 
                         # get front range in meters
+                        trace.begin("multiranger.read")
                         front_range = handle_range_measurement(multiranger.front)
                         top_range = handle_range_measurement(multiranger.up)
                         left_range = handle_range_measurement(multiranger.left)
                         right_range = handle_range_measurement(multiranger.right)
+                        trace.end("multiranger.read")
+
+                        # Karte mit Flow-Odometrie und Multiranger-Strahlen fortschreiben (None = kein Echo)
+                        trace.begin("pad_map.update")
+                        pad_map.update(data['stateEstimate.x'], data['stateEstimate.y'], actual_yaw_rad,
+                                       {'front': multiranger.front, 'left': multiranger.left,
+                                        'right': multiranger.right, 'back': multiranger.back})
+                        trace.end("pad_map.update")
+
+                        dropped = False
+                        if faults is not None:
+                            # Jitter als gehaltene Ticks: der FSM-Tick fällt auf das erste Sample ab dem
+                            # gejitterten Soll-Zeitpunkt (Auflösung = Log-Periode), dazwischen hält die
+                            # Senke das letzte Kommando. Nicht schlafen, sonst staut sich die Log-Queue.
+                            if next_tick is not None and t_loop < next_tick:
+                                velocity_x, velocity_y, yaw_rate = faults.command(t_loop)
+                                setpoint_out.submit(velocity_x, velocity_y, degrees(yaw_rate))
+                                keep_flying = top_range >= 0.2
+                                continue
+                            next_tick = (t_loop if next_tick is None else next_tick) + faults.next_period()
+                            seen = faults.sense(t_loop, (front_range, left_range), actual_yaw_rad)
+                            if seen is None:
+                                # Sample verloren: FSM-Tick fällt aus, Senke hält das letzte Kommando
+                                dropped = True
+                            else:
+                                (front_range, left_range), actual_yaw_rad = seen
 
                         # choose here the direction that you want the wall following to turn to
                         wall_following_direction = WallFollowing.WallFollowingDirection.RIGHT
                         side_range = left_range
 
                         # get velocity commands and current state from wall following state machine
-                        velocity_x, velocity_y, yaw_rate, state_wf = wall_following.wall_follower(
-                            front_range, side_range, actual_yaw_rad, wall_following_direction, time.time())
+                        if dropped:
+                            state_wf = wall_following.state
+                            velocity_x, velocity_y, yaw_rate = faults.command(t_loop)
+                        else:
+                            velocity_x, velocity_y, yaw_rate, state_wf = wall_following.wall_follower(
+                                front_range, side_range, actual_yaw_rad, wall_following_direction, t_loop)
 
                         #--- Logging: zyklischer Status ---
                         try:
-                            dt_state = (time.time() - getattr(wall_following, 'state_change_time', time.time()))
+                            dt_state = (t_loop - getattr(wall_following, 'state_change_time', t_loop))
                             log_status(state_wf if 'state_wf' in locals() else WallFollowing.StateWallFollowing.HOVER,
                                        front_range, side_range, getattr(wall_following, 'is_battery_low', False),
-                                       dt_in_state_s=dt_state)
+                                       dt_in_state_s=dt_state, t_fw_s=sample_t.fw_s)
                         except Exception:
                             pass
                         #----------------------------------
                         pm_state = data.get('pm.state', None)
+                        trace.begin("log.cmd_line")
                         get_logger().info(
-                            f"CMD: vx={velocity_x:.2f} vy={velocity_y:.2f} yaw_rate={yaw_rate:.3f} rad/s | state={state_wf} | battery_level={pm_state}")
+                            f"CMD: vx={velocity_x:.2f} vy={velocity_y:.2f} yaw_rate={yaw_rate:.3f} rad/s | state={state_wf} | battery_level={pm_state}"
+                            f" | sample_age={sample_t.latency_ms:.0f} ms" + (" | DROPPED" if dropped else ""))
+                        trace.end("log.cmd_line")
 
                         # If battery is low and we are in a corner, land and take off again
                         # here handling of the LANDING state is done
                         if state_wf == WallFollowing.StateWallFollowing.LANDING:
                             get_logger().info("IM HERE LANDING")
                             motion_commander.land(velocity=0.3)
-                            for countdown in range(60, 0, -1):
+                            charging = False
+                            t_restart = timebase.now() + RESTART_DELAY_S
+                            for countdown in range(int(RESTART_DELAY_S), 0, -1):
                                 log_event("COUNTDOWN", f"Restart in {countdown} Sekunden")
-                                time.sleep(1)
+                                # statt sleep(1): bis zur Sekundenmarke Log-Pakete lesen und Laden erkennen;
+                                # Frist über die Uhr, nicht über die Paketzahl (Log-Periode, Funkabbruch)
+                                t_mark = t_restart - (countdown - 1)
+                                while timebase.now() < t_mark:
+                                    entry = logger.poll(t_mark - timebase.now())
+                                    if entry is not None and entry[1].get('pm.state') in PM_STATE_CHARGING:
+                                        charging = True
                             log_event("COUNTDOWN", "Restart jetzt!")
+
+                            # Landung in die Karte: Pad lernen bzw. Fehlversuch merken
+                            pad = pad_map.record_landing(charging, t=t_loop)
+                            pad_map.save(PAD_MAP_FILE)
+                            log_event("PAD", "Laden erkannt" if charging else "kein Laden",
+                                      pad_x=pad.x if pad else None, pad_y=pad.y if pad else None,
+                                      pads=len(pad_map.pads), localized=pad_map.localized)
                             #ensure pwm mode of motors is disabled, so that we can take off again
                             scf.cf.param.set_value('motorPowerSet.enable', '0')
                             time.sleep(0.5)
                             charging_take_off(motion_commander)
                             log_event("CHARGE", "Ladezyklus beendet, Neustart vom Pad")
 
-                            # FSM & Flags sauber resetten
-                            wall_following.is_battery_low = False
+                            # FSM & Flags sauber resetten; ohne Laden geht die Suche weiter.
+                            # Zuerst die Zeit nach Countdown und Take-off, sonst zählt die Landepause zum Folgezustand
+                            wall_following.time_now = timebase.now()
+                            wall_following.is_battery_low = not charging
                             wall_following.align_ok_since = None
                             wall_following.first_run = True  # Heading-Baseline sauber neu setzen
                             wall_following.state = wall_following.state_transition(
@@ -195,14 +333,26 @@ if __name__ == '__main__':
                             )
 
                             motion_commander.stop()
+                            setpoint_out.reset()
+                            next_tick = None
                             continue
 
+                        if faults is not None and not dropped:
+                            velocity_x, velocity_y, yaw_rate = faults.command(t_loop, (velocity_x, velocity_y, yaw_rate))
+
                         # convert yaw_rate from rad to deg
                         yaw_rate_deg = degrees(yaw_rate)
 
-                        motion_commander.start_linear_motion(
-                            velocity_x, velocity_y, 0, rate_yaw=yaw_rate_deg)
+                        setpoint_out.submit(velocity_x, velocity_y, yaw_rate_deg)
 
                         # if top_range is activated, stop the demo
                         if top_range < 0.2:
                             keep_flying = False
+                    trace.end("tick")
+
+            # Bandbreitenbilanz: Aufrufe an den MotionCommander und tatsächliche Setpoint-Pakete
+            log_event("CMD_STATS", "Setpoint-Filter", **setpoint_out.stats(), **radio_packets.stats())
+            log_event("CLOCK_SYNC", "Zeitbasis Firmware -> Host", **clock_sync.stats(),
+                      stale_samples=logger.skipped)
+            if faults is not None:
+                log_event("FAULTS", "Degraded-Modus", **faults.stats())
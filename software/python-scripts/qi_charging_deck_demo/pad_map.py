@@ -0,0 +1,357 @@
+# pad_map.py
+# Inkrementelle Belegungskarte aus Multiranger-Messungen und gelernte Ladepad-Positionen.
+# Gespeist aus Pose (Flow-Deck-Odometrie bzw. stateEstimate.x/y) und Yaw;
+# die FSM nutzt best_pad() und plan_path(), um direkt zum bekannten Pad zu fliegen.
+# Jede erfolgreiche Landung auf einem bekannten Pad setzt die Odometrie-Drift zurück
+# (das Pad ist die Landmarke, die den Kartenrahmen festlegt).
+# Der State-Estimate startet nach jedem Einschalten bei x = y = yaw = 0: eine geladene
+# Karte gilt deshalb erst nach der ersten bestätigten Ladung als lokalisiert (Lage und
+# Heading des Pads legen Verschiebung und Drehung Odometrie -> Kartenrahmen fest).
+
+from __future__ import annotations
+from array import array
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Tuple
+import base64
+import heapq
+import json
+import math
+
+# Sensorrichtungen relativ zur Flugrichtung (rad, CCW positiv)
+RANGER_ANGLES = {"front": 0.0, "left": math.pi / 2, "back": math.pi, "right": -math.pi / 2}
+
+# Log-Odds in int8: frei/belegt-Inkremente und Sättigung
+L_FREE = -1
+L_OCC = 4
+L_MIN = -40
+L_MAX = 60
+L_OCC_THRESHOLD = 8
+
+
+@dataclass
+class Pad:
+    x: float
+    y: float
+    yaw: float            # Heading bei der Landung (rad), ausrichten vor PREPARE_TO_LAND
+    successes: int = 1
+    failures: int = 0
+    last_t: float = 0.0
+
+    @property
+    def score(self) -> int:
+        return self.successes - 2 * self.failures
+
+
+class PadMap:
+    """
+    Belegungsgitter (int8 Log-Odds, Ursprung in der Mitte) plus Liste gelernter Pads.
+    update() kostet nur die Zellen entlang der vier Messstrahlen.
+    """
+
+    def __init__(self, resolution_m: float = 0.05, size_m: float = 8.0,
+                 max_range_m: float = 3.0, pad_merge_radius_m: float = 0.25,
+                 relocalize_radius_m: float = 1.0, relocalize_weight: float = 0.5):
+        self.res = resolution_m
+        self.n = int(round(size_m / resolution_m))
+        self.max_range_m = max_range_m
+        self.pad_merge_radius_m = pad_merge_radius_m
+        self.relocalize_radius_m = relocalize_radius_m
+        self.relocalize_weight = relocalize_weight   # <1: Landestreuung auf dem Pad nicht voll übernehmen
+        self.offset = (0.0, 0.0)     # Korrektur Odometrie -> Kartenrahmen (nach der Drehung)
+        self.yaw_offset = 0.0        # Drehung Odometrie -> Kartenrahmen (rad)
+        self.localized = True        # False: Kartenrahmen unbekannt (geladene Karte, neue Session)
+        self.odom: Optional[Tuple[float, float, float]] = None   # letzte Pose im Odometrierahmen
+        self.grid = array("b", bytes(self.n * self.n))
+        self.pads: List[Pad] = []
+        self.pose: Optional[Tuple[float, float, float]] = None
+        self.last_ranges: Dict[str, Optional[float]] = {}   # letzte Messung je Sensor (m, None = kein Echo)
+        self.updates = 0
+
+    # ---------- Koordinaten ----------
+
+    def to_cell(self, x: float, y: float) -> Optional[Tuple[int, int]]:
+        ix = int(math.floor(x / self.res)) + self.n // 2
+        iy = int(math.floor(y / self.res)) + self.n // 2
+        if 0 <= ix < self.n and 0 <= iy < self.n:
+            return ix, iy
+        return None
+
+    def to_world(self, ix: int, iy: int) -> Tuple[float, float]:
+        return ((ix - self.n // 2 + 0.5) * self.res, (iy - self.n // 2 + 0.5) * self.res)
+
+    def _add(self, ix: int, iy: int, delta: int) -> None:
+        i = iy * self.n + ix
+        self.grid[i] = max(L_MIN, min(L_MAX, self.grid[i] + delta))
+
+    def is_occupied(self, ix: int, iy: int) -> bool:
+        return self.grid[iy * self.n + ix] >= L_OCC_THRESHOLD
+
+    def to_map_pose(self, x: float, y: float, yaw: float) -> Tuple[float, float, float]:
+        """Odometrie-Pose -> Kartenrahmen (erst um yaw_offset drehen, dann offset addieren)."""
+        c, s = math.cos(self.yaw_offset), math.sin(self.yaw_offset)
+        return (c * x - s * y + self.offset[0], s * x + c * y + self.offset[1],
+                math.atan2(math.sin(yaw + self.yaw_offset), math.cos(yaw + self.yaw_offset)))
+
+    # ---------- Kartierung ----------
+
+    def update(self, x: float, y: float, yaw: float, ranges: Dict[str, Optional[float]]) -> None:
+        """
+        Odometrie-Pose setzen und die Strahlen der Multiranger-Sensoren eintragen (m, None = kein Echo).
+        Ohne Lokalisierung wird nichts eingetragen: die Strahlen lägen im falschen Rahmen.
+        """
+        self.odom = (x, y, yaw)
+        x, y, yaw = self.pose = self.to_map_pose(x, y, yaw)
+        self.last_ranges = dict(ranges)
+        self.updates += 1
+        if not self.localized:
+            return
+        for name, r in ranges.items():
+            ang = RANGER_ANGLES.get(name)
+            if ang is None:
+                continue
+            hit = r is not None and 0.0 < r < self.max_range_m
+            length = r if hit else self.max_range_m
+            c, s = math.cos(yaw + ang), math.sin(yaw + ang)
+            steps = int(length / self.res)
+            last = None
+            for k in range(steps):
+                cell = self.to_cell(x + c * k * self.res, y + s * k * self.res)
+                if cell is None:
+                    break
+                if cell != last:
+                    self._add(cell[0], cell[1], L_FREE)
+                    last = cell
+            if hit:
+                cell = self.to_cell(x + c * length, y + s * length)
+                if cell is not None:
+                    self._add(cell[0], cell[1], L_OCC - L_FREE if cell == last else L_OCC)
+
+    def nearest_obstacle(self, radius_m: float) -> Optional[Tuple[float, float]]:
+        """
+        Nächstes Hindernis um die aktuelle Pose innerhalb radius_m: letzte Multiranger-Messungen
+        und belegte Zellen (deckt die Diagonalen zwischen den Strahlen ab).
+        Liefert (Abstand m, Richtung rad im Kartenrahmen) oder None.
+        """
+        if self.pose is None:
+            return None
+        x, y, yaw = self.pose
+        best = None
+        for name, r in self.last_ranges.items():
+            ang = RANGER_ANGLES.get(name)
+            if ang is not None and r is not None and r < radius_m and (best is None or r < best[0]):
+                best = (r, yaw + ang)
+        c = self.to_cell(x, y)
+        if c is not None:
+            k = int(math.ceil(radius_m / self.res))
+            for iy in range(max(0, c[1] - k), min(self.n, c[1] + k + 1)):
+                for ix in range(max(0, c[0] - k), min(self.n, c[0] + k + 1)):
+                    if not self.is_occupied(ix, iy):
+                        continue
+                    wx, wy = self.to_world(ix, iy)
+                    # Zellrand statt Zellmitte: Wand liegt irgendwo in der Zelle
+                    d = max(0.0, math.hypot(wx - x, wy - y) - 0.5 * self.res)
+                    if d < radius_m and (best is None or d < best[0]):
+                        best = (d, math.atan2(wy - y, wx - x))
+        return best
+
+    def occupied_cells(self) -> int:
+        return sum(1 for v in self.grid if v >= L_OCC_THRESHOLD)
+
+    # ---------- Pads ----------
+
+    def record_landing(self, success: bool, t: float = 0.0) -> Optional[Pad]:
+        """Landung an der aktuellen Pose merken; success = Laden erkannt."""
+        if self.pose is None:
+            return None
+        if not self.localized:
+            return self._relocalize(success, t)
+        x, y, yaw = self.pose
+        if not success:
+            pad = self.nearest_pad(x, y)
+            if pad is not None:
+                pad.failures += 1
+            return pad
+
+        pad = self.nearest_pad(x, y, self.relocalize_radius_m)
+        if pad is None:
+            pad = Pad(x, y, yaw, last_t=t)
+            self.pads.append(pad)
+            return pad
+        # Geladen -> wir stehen auf diesem Pad: Odometrie-Drift auf das Pad zurücksetzen
+        w = self.relocalize_weight
+        self.offset = (self.offset[0] + w * (pad.x - x), self.offset[1] + w * (pad.y - y))
+        self.pose = (x + w * (pad.x - x), y + w * (pad.y - y), yaw)
+        # pad.yaw bleibt das Heading der ersten Landung (Wandsuche, an der Wand ausgerichtet).
+        # GO_TO_PAD dreht nur bis auf angle_value_buffer auf pad.yaw; das Landeheading zu
+        # übernehmen würde den Fehler je Landung aufaddieren und den Anflug diagonal machen
+        pad.successes += 1
+        pad.last_t = t
+        return pad
+
+    def _relocalize(self, success: bool, t: float) -> Optional[Pad]:
+        """
+        Erste Landung einer Session mit geladener Karte. Bei Ladung steht die Drohne auf dem
+        besten bekannten Pad, und zwar mit dessen Lande-Heading (Ausrichtung an den Wänden
+        der Pad-Ecke): daraus Drehung und Verschiebung Odometrie -> Kartenrahmen.
+        Ohne vertrauenswürdiges Pad wird die alte Karte verworfen.
+        """
+        if not success:
+            return None      # Fehlversuch lässt sich ohne Kartenrahmen keinem Pad zuordnen
+        pad = self._best()
+        ox, oy, oyaw = self.odom
+        if pad is None:
+            self.grid = array("b", bytes(self.n * self.n))
+            self.pads = []
+            self.offset, self.yaw_offset = (0.0, 0.0), 0.0
+        else:
+            self.yaw_offset = math.atan2(math.sin(pad.yaw - oyaw), math.cos(pad.yaw - oyaw))
+            c, s = math.cos(self.yaw_offset), math.sin(self.yaw_offset)
+            self.offset = (pad.x - (c * ox - s * oy), pad.y - (s * ox + c * oy))
+        self.localized = True
+        self.pose = self.to_map_pose(ox, oy, oyaw)
+        if pad is None:
+            return self.record_landing(True, t)
+        pad.successes += 1
+        pad.last_t = t
+        return pad
+
+    def nearest_pad(self, x: float, y: float, radius: Optional[float] = None) -> Optional[Pad]:
+        best, best_d = None, self.pad_merge_radius_m if radius is None else radius
+        for p in self.pads:
+            d = math.hypot(p.x - x, p.y - y)
+            if d <= best_d:
+                best, best_d = p, d
+        return best
+
+    def best_pad(self) -> Optional[Pad]:
+        """Bestes Pad für GO_TO_PAD; None, solange die Karte nicht lokalisiert ist."""
+        return self._best() if self.localized else None
+
+    def _best(self) -> Optional[Pad]:
+        cands = [p for p in self.pads if p.score > 0]
+        if not cands:
+            return None
+        return max(cands, key=lambda p: (p.score, p.last_t))
+
+    # ---------- Pfadplanung ----------
+
+    def _blocked(self, inflate_m: float) -> set:
+        r = int(math.ceil(inflate_m / self.res))
+        offs = [(dx, dy) for dx in range(-r, r + 1) for dy in range(-r, r + 1) if dx * dx + dy * dy <= r * r]
+        blocked = set()
+        n = self.n
+        for i, v in enumerate(self.grid):
+            if v >= L_OCC_THRESHOLD:
+                ix, iy = i % n, i // n
+                for dx, dy in offs:
+                    blocked.add((ix + dx, iy + dy))
+        return blocked
+
+    def _line_free(self, a, b, blocked) -> bool:
+        (x0, y0), (x1, y1) = a, b
+        steps = max(abs(x1 - x0), abs(y1 - y0))
+        for k in range(steps + 1):
+            t = k / steps if steps else 0.0
+            if (int(round(x0 + (x1 - x0) * t)), int(round(y0 + (y1 - y0) * t))) in blocked:
+                return False
+        return True
+
+    def plan_path(self, start: Tuple[float, float], goal: Tuple[float, float],
+                  inflate_m: float = 0.2, max_expansions: int = 50000) -> Optional[List[Tuple[float, float]]]:
+        """
+        A* (8er-Nachbarschaft) auf dem Gitter; unbekannte Zellen gelten als frei.
+        Liefert Wegpunkte in m (ohne Start, mit Ziel) oder None.
+        """
+        s, g = self.to_cell(*start), self.to_cell(*goal)
+        if s is None or g is None:
+            return None
+        blocked = self._blocked(inflate_m)
+        # Start und Ziel liegen nah an Wänden (Pad in der Ecke): dort nicht blockieren
+        for c in (s, g):
+            r = int(math.ceil(inflate_m / self.res)) + 1
+            for dx in range(-r, r + 1):
+                for dy in range(-r, r + 1):
+                    if not self.is_occupied(min(self.n - 1, max(0, c[0] + dx)), min(self.n - 1, max(0, c[1] + dy))):
+                        blocked.discard((c[0] + dx, c[1] + dy))
+
+        if self._line_free(s, g, blocked):
+            return [goal]
+
+        nbrs = [(1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0),
+                (1, 1, math.sqrt(2)), (1, -1, math.sqrt(2)), (-1, 1, math.sqrt(2)), (-1, -1, math.sqrt(2))]
+        def h(c):
+            return math.hypot(c[0] - g[0], c[1] - g[1])
+
+        open_ = [(h(s), 0.0, s)]
+        came = {s: None}
+        cost = {s: 0.0}
+        exp = 0
+        while open_ and exp < max_expansions:
+            _, gc, cur = heapq.heappop(open_)
+            if cur == g:
+                break
+            if gc > cost.get(cur, math.inf):
+                continue
+            exp += 1
+            for dx, dy, w in nbrs:
+                nb = (cur[0] + dx, cur[1] + dy)
+                if not (0 <= nb[0] < self.n and 0 <= nb[1] < self.n) or nb in blocked:
+                    continue
+                nc = gc + w
+                if nc < cost.get(nb, math.inf):
+                    cost[nb] = nc
+                    came[nb] = cur
+                    heapq.heappush(open_, (nc + h(nb), nc, nb))
+        if g not in came:
+            return None
+
+        cells = []
+        c = g
+        while c is not None:
+            cells.append(c)
+            c = came[c]
+        cells.reverse()
+
+        # Wegpunkte ausdünnen: nur behalten, wenn keine Sichtlinie zum übernächsten besteht
+        pts = [cells[0]]
+        for i in range(1, len(cells) - 1):
+            if not self._line_free(pts[-1], cells[i + 1], blocked):
+                pts.append(cells[i])
+        pts.append(g)
+        way = [self.to_world(*c) for c in pts[1:-1]]
+        return way + [goal]
+
+    # ---------- Persistenz ----------
+
+    def save(self, path: str) -> None:
+        """Gitter und Pads liegen im Kartenrahmen; offset/yaw_offset gelten nur bis zum nächsten Einschalten."""
+        data = {
+            "frame": "map",
+            "resolution_m": self.res,
+            "n": self.n,
+            "offset": list(self.offset),
+            "yaw_offset": self.yaw_offset,
+            "grid": base64.b64encode(self.grid.tobytes()).decode("ascii"),
+            "pads": [asdict(p) for p in self.pads],
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, path: str, same_session: bool = False, **kwargs) -> "PadMap":
+        """
+        Karte laden. Default: neue Session (Odometrie neu gestartet), die Karte ist bis zur
+        ersten bestätigten Ladung nicht lokalisiert. same_session=True übernimmt offset und
+        yaw_offset, z.B. nach einem Neustart des Skripts ohne Neustart des Crazyflie.
+        """
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        m = cls(resolution_m=data["resolution_m"], size_m=data["n"] * data["resolution_m"], **kwargs)
+        m.grid = array("b", base64.b64decode(data["grid"]))
+        m.pads = [Pad(**p) for p in data["pads"]]
+        if same_session:
+            m.offset = tuple(data.get("offset", (0.0, 0.0)))
+            m.yaw_offset = data.get("yaw_offset", 0.0)
+        else:
+            m.localized = False
+        return m
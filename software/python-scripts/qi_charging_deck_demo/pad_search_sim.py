@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline-Benchmark: mittlere Zeit bis zum Ladepad mit und ohne gelernte Pad-Position.
+
+Simuliert einen L-förmigen Raum mit einem Pad in einer Ecke, Multiranger-Strahlen,
+Flow-Deck-Odometrie mit Skalenfehler/Rauschen und die unveränderte WallFollowing-FSM.
+Je Zyklus: Start vom Pad, zufällige Missionsdauer im Wall-Following, dann
+is_battery_low = True und Messung der Zeit bis zur Landung auf dem Pad.
+Landet die FSM in einer Ecke ohne Pad, wird kein Laden erkannt: kurzer Start
+an Ort und Stelle, die Suche läuft weiter.
+
+Eine Variante mit Wandkontakten gilt als durchgefallen (Exit-Code 1), unabhängig
+von der Zeit bis zum Pad; Zyklen im Timeout werden mit CYCLE_TIMEOUT_S gezählt.
+
+Konventionen wie in der FSM: Yaw-Rate positiv = CCW (rad/s), vy positiv = links.
+
+Beispiel:
+    python pad_search_sim.py --cycles 20 --seed 1
+"""
+
+import argparse
+import contextlib
+import io
+import math
+import random
+import statistics
+import sys
+import time
+
+from wf_logging import start_new_session, LogConfig
+from wall_following import WallFollowing
+from pad_map import PadMap
+
+S = WallFollowing.StateWallFollowing
+
+# L-Raum (m), Ecken gegen den Uhrzeigersinn
+ROOM = [(0.0, 0.0), (4.0, 0.0), (4.0, 1.5), (2.0, 1.5), (2.0, 3.0), (0.0, 3.0)]
+REFERENCE_DISTANCE = 0.15
+PAD_CORNER = (0.0, 0.0)
+PAD_RADIUS = 0.12                # Landung zählt als "auf dem Pad" innerhalb dieses Radius
+MAX_RANGE = 4.0
+DT = 0.1                         # s, wie der 100-ms-Log-Block im Flugskript
+TAKEOFF_PENALTY_S = 5.0          # Fehlversuch: Landen, kein Laden, wieder starten
+CYCLE_TIMEOUT_S = 300.0
+
+
+def _segments(poly):
+    return [(poly[i], poly[(i + 1) % len(poly)]) for i in range(len(poly))]
+
+
+WALLS = _segments(ROOM)
+
+
+def raycast(x, y, ang, walls=WALLS, max_range=MAX_RANGE):
+    dx, dy = math.cos(ang), math.sin(ang)
+    best = max_range
+    for (x1, y1), (x2, y2) in walls:
+        ex, ey = x2 - x1, y2 - y1
+        den = dx * ey - dy * ex
+        if abs(den) < 1e-12:
+            continue
+        t = ((x1 - x) * ey - (y1 - y) * ex) / den
+        u = ((x1 - x) * dy - (y1 - y) * dx) / den
+        if t > 0 and 0.0 <= u <= 1.0 and t < best:
+            best = t
+    return best
+
+
+class SimDrone:
+    """Wahre Pose, Odometrie-Pose und Multiranger-Messungen."""
+
+    def __init__(self, rng, x, y, yaw, range_noise=0.01, odom_scale_err=0.01, odom_noise=0.002):
+        self.rng = rng
+        self.x, self.y, self.yaw = x, y, yaw
+        self.ox, self.oy = 0.0, 0.0          # Odometrie startet bei (0, 0)
+        self.range_noise = range_noise
+        self.odom_scale = 1.0 + rng.uniform(-odom_scale_err, odom_scale_err)
+        self.odom_noise = odom_noise
+        self.collisions = 0
+
+    def ranges(self):
+        out = {}
+        for name, off in (("front", 0.0), ("left", math.pi / 2), ("back", math.pi), ("right", -math.pi / 2)):
+            r = raycast(self.x, self.y, self.yaw + off)
+            out[name] = None if r >= MAX_RANGE else max(0.0, r + self.rng.gauss(0.0, self.range_noise))
+        return out
+
+    def step(self, vx, vy, yaw_rate, dt=DT):
+        c, s = math.cos(self.yaw), math.sin(self.yaw)
+        wx, wy = (vx * c - vy * s) * dt, (vx * s + vy * c) * dt
+        nx, ny = self.x + wx, self.y + wy
+        # nicht durch Wände fliegen
+        step = math.hypot(wx, wy)
+        if step > 0 and raycast(self.x, self.y, math.atan2(wy, wx)) < step + 0.05:
+            self.collisions += 1
+            wx, wy, nx, ny = 0.0, 0.0, self.x, self.y
+        self.x, self.y = nx, ny
+        self.yaw = math.atan2(math.sin(self.yaw + yaw_rate * dt), math.cos(self.yaw + yaw_rate * dt))
+        self.ox += wx * self.odom_scale + self.rng.gauss(0.0, self.odom_noise)
+        self.oy += wy * self.odom_scale + self.rng.gauss(0.0, self.odom_noise)
+
+    def on_pad(self):
+        px = PAD_CORNER[0] + REFERENCE_DISTANCE
+        py = PAD_CORNER[1] + REFERENCE_DISTANCE
+        return math.hypot(self.x - px, self.y - py) <= PAD_RADIUS
+
+
+def reset_after_takeoff(wf, battery_low, t):
+    """Wie multiranger_wall_following.py nach dem Ladezyklus (t = Zeit nach dem Take-off)."""
+    wf.time_now = t     # zuerst, sonst endet LANDING zur Zeit des letzten Ticks (Verweildauer 0)
+    wf.is_battery_low = battery_low
+    wf.align_ok_since = None
+    wf.first_run = True
+    wf.state = wf.state_transition(S.TURN_TO_FIND_WALL)
+
+
+def run_variant(use_map, cycles, seed, mission_s=(20.0, 60.0), map_every=1):
+    rng = random.Random(seed)
+    drone = SimDrone(rng, 1.0, 0.6, math.pi)
+    pad_map = PadMap(max_range_m=2.0) if use_map else None
+    wf = WallFollowing(angle_value_buffer=0.1, reference_distance_from_wall=REFERENCE_DISTANCE,
+                       max_forward_speed=0.1, init_state=S.FORWARD, pad_map=pad_map)
+    direction = WallFollowing.WallFollowingDirection.RIGHT
+    t = 0.0
+    results = []
+    tick = 0
+
+    for _ in range(cycles):
+        mission_end = t + rng.uniform(*mission_s)
+        t_low = None
+        wrong = 0
+        go_to_pad = False
+        while True:
+            rg = drone.ranges()
+            if pad_map is not None and tick % map_every == 0:
+                pad_map.update(drone.ox, drone.oy, drone.yaw, rg)
+            tick += 1
+            if t_low is None and t >= mission_end:
+                t_low = t
+                wf.is_battery_low = True
+            front = rg["front"] if rg["front"] is not None else 999
+            side = rg["left"] if rg["left"] is not None else 999
+            vx, vy, yr, st = wf.wall_follower(front, side, drone.yaw, direction, t)
+            go_to_pad |= st == S.GO_TO_PAD
+
+            if st == S.LANDING:
+                if drone.on_pad():
+                    if pad_map is not None:
+                        pad_map.record_landing(True, t=t)
+                    if t_low is not None:
+                        results.append((t - t_low, wrong, go_to_pad, True))
+                        reset_after_takeoff(wf, False, t)
+                        break
+                    reset_after_takeoff(wf, False, t)
+                else:
+                    if pad_map is not None:
+                        pad_map.record_landing(False, t=t)
+                    wrong += 1
+                    t += TAKEOFF_PENALTY_S
+                    reset_after_takeoff(wf, t_low is not None, t)
+                continue
+
+            if t_low is not None and t - t_low > CYCLE_TIMEOUT_S:
+                results.append((CYCLE_TIMEOUT_S, wrong, go_to_pad, False))
+                reset_after_takeoff(wf, False, t)
+                break
+
+            drone.step(vx, vy, yr)
+            t += DT
+    return results, drone.collisions, pad_map
+
+
+def summarize(name, results, collisions):
+    ttp = [r[0] for r in results]
+    ok = sum(1 for r in results if r[3])
+    return {
+        "variant": name,
+        "cycles": len(results),
+        "success": ok,
+        "timeouts": len(results) - ok,
+        "mean_s": statistics.mean(ttp) if ttp else float("nan"),
+        "median_s": statistics.median(ttp) if ttp else float("nan"),
+        "max_s": max(ttp) if ttp else float("nan"),
+        "wrong_corner": sum(r[1] for r in results),
+        "go_to_pad": sum(1 for r in results if r[2]),
+        "collisions": collisions,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Time-to-pad-Benchmark: Wandsuche vs. gelernte Pad-Position")
+    ap.add_argument("--cycles", type=int, default=20, help="Ladezyklen je Variante")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--mission-min", type=float, default=20.0, help="min. Missionsdauer vor Battery-Low (s)")
+    ap.add_argument("--mission-max", type=float, default=60.0, help="max. Missionsdauer vor Battery-Low (s)")
+    ap.add_argument("--map-every", type=int, default=1, help="Karte nur jeden n-ten Tick aktualisieren")
+    args = ap.parse_args()
+
+    start_new_session(LogConfig(console=False, to_file=False))
+    rows = []
+    for name, use_map in (("wall_search", False), ("pad_map", True)):
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):  # FSM-Debug-Prints unterdrücken
+            res, coll, pad_map = run_variant(use_map, args.cycles, args.seed,
+                                             (args.mission_min, args.mission_max), args.map_every)
+        r = summarize(name, res, coll)
+        r["runtime_s"] = time.perf_counter() - t0
+        rows.append(r)
+        if pad_map is not None:
+            pads = ", ".join(f"({p.x:.2f}, {p.y:.2f}) ok={p.successes} fail={p.failures}" for p in pad_map.pads)
+            print(f"[MAP] {pad_map.occupied_cells()} belegte Zellen, Pads: {pads or '-'}")
+
+    print(f"{'Variante':12s} {'Zyklen':>6s} {'ok':>4s} {'Timeout':>7s} {'mean s':>8s} {'median s':>9s} {'max s':>7s} "
+          f"{'Fehlecke':>8s} {'GO_TO_PAD':>9s} {'Kontakte':>8s} {'Laufzeit':>8s}")
+    for r in rows:
+        print(f"{r['variant']:12s} {r['cycles']:6d} {r['success']:4d} {r['timeouts']:7d} {r['mean_s']:8.1f} "
+              f"{r['median_s']:9.1f} {r['max_s']:7.1f} {r['wrong_corner']:8d} {r['go_to_pad']:9d} "
+              f"{r['collisions']:8d} {r['runtime_s']:7.1f}s")
+    base, learned = rows[0], rows[1]
+    if base["mean_s"] == base["mean_s"] and learned["mean_s"] == learned["mean_s"] and base["mean_s"] > 0:
+        print(f"[RESULT] mittlere Zeit bis zum Pad: {base['mean_s']:.1f} s -> {learned['mean_s']:.1f} s "
+              f"({100.0 * (learned['mean_s'] - base['mean_s']) / base['mean_s']:+.0f} %), "
+              f"Timeouts {base['timeouts']} -> {learned['timeouts']}, "
+              f"Wandkontakte {base['collisions']} -> {learned['collisions']}")
+    failed = [r["variant"] for r in rows if r["collisions"] > 0]
+    for name in failed:
+        print(f"[FAIL] {name}: Wandkontakte")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
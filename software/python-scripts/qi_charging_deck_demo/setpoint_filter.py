@@ -0,0 +1,94 @@
+# setpoint_filter.py
+# Ausgabestufe für Geschwindigkeits-Setpoints: gibt einen Setpoint nur bei
+# Änderung (> Epsilon) an die Senke weiter, z.B. MotionCommander.start_linear_motion.
+# Kein eigener Keepalive: der Setpoint-Thread des MotionCommander sendet den
+# letzten Hover-Setpoint ohnehin alle 0.2 s erneut (Firmware-Timeout 500 ms).
+# Die tatsächlich gesendeten Funkpakete zählt CommanderPacketCounter an cf.commander.
+
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+import time
+
+
+@dataclass
+class SetpointFilterConfig:
+    eps_velocity: float = 0.005       # m/s
+    eps_yaw_rate: float = 0.5         # deg/s
+
+
+class SetpointFilter:
+    """
+    Delta-Unterdrückung vor einer Senke send(vx, vy, yaw_rate_deg).
+    sent/suppressed zählen Aufrufe der Senke, nicht Funkpakete.
+    """
+
+    def __init__(self, send: Callable[[float, float, float], None],
+                 cfg: Optional[SetpointFilterConfig] = None):
+        self._send = send
+        self.cfg = cfg or SetpointFilterConfig()
+        self._last: Optional[Tuple[float, float, float]] = None
+        self.sent = 0
+        self.suppressed = 0
+
+    def reset(self) -> None:
+        """Nächsten Setpoint unbedingt senden (z.B. nach Landung/Take-off)."""
+        self._last = None
+
+    def _changed(self, sp: Tuple[float, float, float]) -> bool:
+        if self._last is None:
+            return True
+        vx, vy, yr = sp
+        lvx, lvy, lyr = self._last
+        return (abs(vx - lvx) > self.cfg.eps_velocity or
+                abs(vy - lvy) > self.cfg.eps_velocity or
+                abs(yr - lyr) > self.cfg.eps_yaw_rate)
+
+    def submit(self, vx: float, vy: float, yaw_rate_deg: float) -> bool:
+        """Gibt True zurück, wenn der Setpoint an die Senke ging."""
+        sp = (vx, vy, yaw_rate_deg)
+        if not self._changed(sp):
+            self.suppressed += 1
+            return False
+        self._send(vx, vy, yaw_rate_deg)
+        self._last = sp
+        self.sent += 1
+        return True
+
+    def stats(self) -> dict:
+        total = self.sent + self.suppressed
+        return {
+            "sent": self.sent,
+            "suppressed": self.suppressed,
+            "suppressed_pct": 100.0 * self.suppressed / total if total else 0.0,
+        }
+
+
+class CommanderPacketCounter:
+    """
+    Zählt die Setpoint-Pakete, die wirklich über den Link gehen: ersetzt die
+    send_*_setpoint-Methoden einer cflib-Commander-Instanz durch zählende Wrapper.
+    """
+
+    def __init__(self, commander, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._t0 = clock()
+        self.packets: Dict[str, int] = {}
+        for name in dir(commander):
+            if name.startswith("send_") and name.endswith("_setpoint"):
+                setattr(commander, name, self._wrap(name, getattr(commander, name)))
+
+    def _wrap(self, name: str, fn):
+        def counted(*args, **kwargs):
+            self.packets[name] = self.packets.get(name, 0) + 1
+            return fn(*args, **kwargs)
+        return counted
+
+    def stats(self) -> dict:
+        total = sum(self.packets.values())
+        elapsed = self._clock() - self._t0
+        return {
+            "radio_packets": total,
+            "radio_packets_per_s": total / elapsed if elapsed > 0 else 0.0,
+            **{f"radio_{k}": v for k, v in sorted(self.packets.items())},
+        }
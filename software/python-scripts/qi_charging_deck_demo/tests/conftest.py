@@ -0,0 +1,14 @@
+# Die Module liegen flach im Elternverzeichnis (kein Paket): für die Tests importierbar machen.
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def quiet_logging_session():
+    """wf_logging ohne Konsole und Dateien, bevor eine FSM den Logger anlegt."""
+    from wf_logging import LogConfig, start_new_session
+    start_new_session(LogConfig(console=False, to_file=False))
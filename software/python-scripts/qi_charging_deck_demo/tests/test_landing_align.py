@@ -0,0 +1,76 @@
+# test_landing_align.py
+# PDAlignController: Sättigung, Ratenbegrenzung (auch beim ersten update nach reset) und Settling.
+
+import pytest
+
+from landing_align import PDAlignController, PDAlignGains
+from wall_following import WallFollowing
+
+GAINS = PDAlignGains(kp=2.0, kd=0.0, accel_limit=0.5, d_filter_s=0.2, settle_rate=0.15, settle_time=0.5)
+V_MAX = 0.05
+TOL = 0.05
+DT = 0.1
+
+
+def run(ctrl, errors, t0=0.0):
+    return [ctrl.update(ef, es, t0 + k * DT, V_MAX, TOL) for k, (ef, es) in enumerate(errors)]
+
+
+def test_first_update_after_reset_does_not_jump():
+    ctrl = PDAlignController(GAINS)
+    assert ctrl.update(1.0, -1.0, 10.0, V_MAX, TOL) == (0.0, 0.0)
+
+
+def test_first_update_starts_from_last_command():
+    ctrl = PDAlignController(GAINS)
+    ctrl.reset((0.03, -0.01))
+    assert ctrl.update(-1.0, 1.0, 10.0, V_MAX, TOL) == pytest.approx((0.03, -0.01))
+
+
+def test_last_command_beyond_saturation_is_clamped():
+    ctrl = PDAlignController(GAINS)
+    ctrl.reset((0.1, -0.1))
+    assert ctrl.update(0.0, 0.0, 0.0, V_MAX, TOL) == pytest.approx((V_MAX, -V_MAX))
+
+
+def test_rate_limit_and_saturation_on_large_error():
+    ctrl = PDAlignController(GAINS)
+    out = run(ctrl, [(1.0, -1.0)] * 20)
+    step = GAINS.accel_limit * DT
+    for (ux0, uy0), (ux1, uy1) in zip(out, out[1:]):
+        assert abs(ux1 - ux0) <= step + 1e-12 and abs(uy1 - uy0) <= step + 1e-12
+    assert all(abs(ux) <= V_MAX and abs(uy) <= V_MAX for ux, uy in out)
+    assert out[-1] == pytest.approx((V_MAX, -V_MAX))
+
+
+def test_small_error_is_proportional_once_ramped():
+    ctrl = PDAlignController(GAINS)
+    out = run(ctrl, [(0.01, -0.005)] * 10)
+    assert out[-1] == pytest.approx((GAINS.kp * 0.01, GAINS.kp * -0.005))
+
+
+def test_settles_after_settle_time_in_tolerance():
+    ctrl = PDAlignController(GAINS)
+    run(ctrl, [(0.01, 0.01)] * 5)
+    assert ctrl.in_tolerance and not ctrl.settled
+    run(ctrl, [(0.01, 0.01)] * 2, t0=0.5)
+    assert ctrl.settled
+    ctrl.update(0.2, 0.0, 0.7, V_MAX, TOL)            # aus der Toleranz: Settling beginnt neu
+    assert not ctrl.in_tolerance and not ctrl.settled
+
+
+def test_reset_clears_state():
+    ctrl = PDAlignController(GAINS)
+    run(ctrl, [(1.0, 1.0)] * 10)
+    ctrl.reset()
+    assert not ctrl.settled and not ctrl.in_tolerance
+    assert ctrl.update(1.0, 1.0, 100.0, V_MAX, TOL) == (0.0, 0.0)
+
+
+def test_fsm_seeds_controller_with_last_command():
+    wf = WallFollowing(reference_distance_from_wall=0.15, max_forward_speed=0.1,
+                       landing_controller=PDAlignController(GAINS))
+    wf.last_command = (0.04, 0.02)
+    wf.state = wf.state_transition(WallFollowing.StateWallFollowing.PREPARE_TO_LAND)
+    # großer Fehler, trotzdem erstes Kommando = letztes Kommando (vy über die Richtungskonvention zurück)
+    assert wf.calc_landing(1.0, 1.0) == pytest.approx((0.04, 0.02))
@@ -0,0 +1,200 @@
+# test_pad_map.py
+# Deterministische Tests für PadMap: A*-Pfadplanung mit Wandabstand, Pad-Lernen und
+# Odometrie-Korrektur, Persistenz mit Kartenrahmen und Relokalisierung.
+
+import math
+
+import pytest
+
+from pad_map import L_MAX, PadMap
+
+
+def wall(m, x0, y0, x1, y1):
+    """Gerade Wand als belegte Zellen von (x0, y0) nach (x1, y1) in m."""
+    steps = int(max(abs(x1 - x0), abs(y1 - y0)) / m.res) + 1
+    for k in range(steps + 1):
+        t = k / steps
+        ix, iy = m.to_cell(x0 + (x1 - x0) * t, y0 + (y1 - y0) * t)
+        m.grid[iy * m.n + ix] = L_MAX
+
+
+def path_cells_clear(m, start, path, inflate_m):
+    blocked = m._blocked(inflate_m)
+    pts = [m.to_cell(*start)] + [m.to_cell(*p) for p in path]
+    return all(m._line_free(a, b, blocked) for a, b in zip(pts, pts[1:]))
+
+
+# ---------- Pfadplanung ----------
+
+def test_free_line_of_sight_gives_goal_only():
+    m = PadMap(size_m=4.0)
+    assert m.plan_path((-1.0, 0.0), (1.0, 0.0)) == [(1.0, 0.0)]
+
+
+def test_path_detours_around_wall_with_clearance():
+    m = PadMap(size_m=4.0)
+    wall(m, 0.0, -1.0, 0.0, 1.0)          # Wand quer zur Sichtlinie, oben/unten offen
+    path = m.plan_path((-1.0, 0.0), (1.0, 0.0), inflate_m=0.2)
+    assert path is not None and len(path) > 1
+    assert path[-1] == (1.0, 0.0)
+    assert path_cells_clear(m, (-1.0, 0.0), path, 0.2)
+    # Umweg über ein Wandende: mindestens ein Wegpunkt jenseits |y| = 1 m
+    assert max(abs(y) for _, y in path[:-1]) > 1.0
+
+
+def test_fully_blocked_goal_returns_none():
+    m = PadMap(size_m=4.0)
+    wall(m, 0.0, -2.0, 0.0, 1.99)         # durchgehende Wand über die ganze Karte
+    assert m.plan_path((-1.0, 0.0), (1.0, 0.0)) is None
+
+
+def test_goal_inside_clearance_zone_is_reachable():
+    # Pad in der Ecke: das Ziel liegt näher als inflate_m an zwei Wänden
+    m = PadMap(size_m=4.0)
+    wall(m, 1.2, -1.0, 1.2, 1.0)
+    wall(m, -1.0, 0.5, 1.2, 0.5)
+    goal = (1.05, 0.35)
+    path = m.plan_path((-0.5, -0.5), goal, inflate_m=0.2)
+    assert path is not None
+    assert path[-1] == goal
+
+
+def test_start_or_goal_outside_map_returns_none():
+    m = PadMap(size_m=2.0)
+    assert m.plan_path((0.0, 0.0), (5.0, 0.0)) is None
+
+
+# ---------- Kartierung ----------
+
+def test_update_marks_hit_occupied_and_ray_free():
+    m = PadMap(size_m=4.0)
+    m.update(0.0, 0.0, 0.0, {"front": 1.0, "left": None})
+    assert not m.is_occupied(*m.to_cell(1.0, 0.0))   # ein Treffer reicht nicht (Log-Odds-Schwelle)
+    m.update(0.0, 0.0, 0.0, {"front": 1.0, "left": None})
+    assert m.is_occupied(*m.to_cell(1.0, 0.0))
+    assert not m.is_occupied(*m.to_cell(0.5, 0.0))
+    assert m.grid[m.to_cell(0.5, 0.0)[1] * m.n + m.to_cell(0.5, 0.0)[0]] < 0
+    assert m.occupied_cells() == 1
+    assert m.nearest_obstacle(1.5)[0] == pytest.approx(1.0, abs=0.03)
+
+
+# ---------- Pads ----------
+
+def test_first_successful_landing_creates_pad():
+    m = PadMap()
+    m.update(1.0, 2.0, 0.3, {})
+    pad = m.record_landing(True, t=10.0)
+    assert (pad.x, pad.y, pad.yaw, pad.successes, pad.failures) == (1.0, 2.0, 0.3, 1, 0)
+    assert m.best_pad() is pad
+
+
+def test_confirmed_landing_blends_odometry_offset_towards_pad():
+    m = PadMap(relocalize_weight=0.5)
+    m.update(1.0, 2.0, 0.0, {})
+    pad = m.record_landing(True)
+    m.update(1.2, 1.9, 0.1, {})           # Drift: 20 cm / -10 cm neben dem Pad gelandet
+    assert m.record_landing(True) is pad
+    assert pad.successes == 2
+    assert (pad.x, pad.y) == (1.0, 2.0)   # Pad bleibt Landmarke
+    assert pad.yaw == 0.0                  # Heading der ersten Landung bleibt
+    assert m.offset == pytest.approx((-0.1, 0.05))
+    assert m.pose[:2] == pytest.approx((1.1, 1.95))
+    m.update(1.2, 1.9, 0.1, {})
+    assert m.pose[:2] == pytest.approx((1.1, 1.95))
+
+
+def test_landing_outside_relocalize_radius_is_a_new_pad():
+    m = PadMap(relocalize_radius_m=1.0)
+    m.update(0.0, 0.0, 0.0, {})
+    m.record_landing(True)
+    m.update(2.0, 0.0, 0.0, {})
+    m.record_landing(True)
+    assert len(m.pads) == 2
+    assert m.offset == (0.0, 0.0)
+
+
+def test_failed_landings_reject_pad():
+    m = PadMap()
+    m.update(0.0, 0.0, 0.0, {})
+    pad = m.record_landing(True)
+    m.update(0.1, 0.0, 0.0, {})
+    assert m.record_landing(False) is pad
+    assert pad.failures == 1 and pad.score == -1
+    assert m.best_pad() is None
+    m.update(2.0, 2.0, 0.0, {})
+    assert m.record_landing(False) is None     # kein Pad in der Nähe: nichts zu bestrafen
+    assert len(m.pads) == 1
+
+
+def test_best_pad_prefers_score_then_recency():
+    m = PadMap()
+    for x, t in ((0.0, 1.0), (2.0, 2.0)):
+        m.update(x, 0.0, 0.0, {})
+        m.record_landing(True, t=t)
+    assert m.best_pad().x == 2.0
+    m.update(0.0, 0.0, 0.0, {})
+    m.record_landing(True, t=3.0)
+    assert m.best_pad().x == 0.0
+
+
+# ---------- Persistenz / Relokalisierung ----------
+
+def odom_in_new_session(x, y, yaw, origin=(3.0, -1.0), heading=1.2):
+    """Kartenpose -> Odometrie einer Session, die bei 'origin' mit 'heading' eingeschaltet wurde."""
+    c, s = math.cos(-heading), math.sin(-heading)
+    dx, dy = x - origin[0], y - origin[1]
+    return c * dx - s * dy, s * dx + c * dy, yaw - heading
+
+
+@pytest.fixture
+def saved_map(tmp_path):
+    m = PadMap(size_m=6.0)
+    m.update(1.0, 2.0, 0.5, {"front": 0.3})
+    m.record_landing(True)
+    path = tmp_path / "pad_map.json"
+    m.save(str(path))
+    return m, str(path)
+
+
+def test_loaded_map_is_not_trusted_before_relocalization(saved_map):
+    m, path = saved_map
+    n = PadMap.load(path)
+    assert not n.localized
+    assert n.best_pad() is None
+    occupied = n.occupied_cells()
+    n.update(*odom_in_new_session(0.0, 0.0, 0.0), {"front": 0.5})
+    assert n.occupied_cells() == occupied      # Strahlen im unbekannten Rahmen nicht eintragen
+    assert n.record_landing(False) is None
+
+
+def test_first_charge_relocalizes_rotation_and_translation(saved_map):
+    m, path = saved_map
+    n = PadMap.load(path)
+    n.update(*odom_in_new_session(1.0, 2.0, 0.5), {})
+    pad = n.record_landing(True, t=5.0)
+    assert n.localized and pad.successes == 2
+    assert n.best_pad() is pad
+    assert n.to_map_pose(*odom_in_new_session(0.3, -0.7, 2.0)) == pytest.approx((0.3, -0.7, 2.0))
+
+
+def test_relocalization_without_trusted_pad_discards_old_map(tmp_path):
+    m = PadMap(size_m=6.0)
+    m.update(0.0, 0.0, 0.0, {"front": 0.5})
+    m.record_landing(True)
+    m.record_landing(False)                    # score -1: kein vertrauenswürdiges Pad
+    m.save(str(tmp_path / "m.json"))
+    n = PadMap.load(str(tmp_path / "m.json"))
+    n.update(1.0, 1.0, 0.0, {})
+    pad = n.record_landing(True)
+    assert n.localized and n.occupied_cells() == 0
+    assert n.pads == [pad] and (pad.x, pad.y) == (1.0, 1.0)
+
+
+def test_same_session_load_keeps_frame(saved_map, tmp_path):
+    m, _ = saved_map
+    m.offset, m.yaw_offset = (0.2, -0.1), 0.3
+    m.save(str(tmp_path / "m2.json"))
+    n = PadMap.load(str(tmp_path / "m2.json"), same_session=True)
+    assert n.localized
+    assert n.offset == pytest.approx((0.2, -0.1)) and n.yaw_offset == pytest.approx(0.3)
+    assert n.grid == m.grid and n.pads == m.pads
@@ -0,0 +1,88 @@
+# test_setpoint_filter.py
+# Delta-Unterdrückung (nur Epsilon, kein Keepalive), reset() und Paketzählung je send_*_setpoint.
+
+import pytest
+
+from setpoint_filter import CommanderPacketCounter, SetpointFilter, SetpointFilterConfig
+
+
+@pytest.fixture
+def sink():
+    calls = []
+    flt = SetpointFilter(lambda vx, vy, yr: calls.append((vx, vy, yr)),
+                         SetpointFilterConfig(eps_velocity=0.01, eps_yaw_rate=1.0))
+    return flt, calls
+
+
+def test_first_setpoint_is_always_sent(sink):
+    flt, calls = sink
+    assert flt.submit(0.0, 0.0, 0.0)
+    assert calls == [(0.0, 0.0, 0.0)]
+
+
+def test_changes_within_epsilon_are_suppressed_without_keepalive(sink):
+    flt, calls = sink
+    flt.submit(0.1, 0.0, 0.0)
+    # beliebig viele gleiche bzw. knapp geänderte Setpoints: nichts geht an die Senke
+    for _ in range(100):
+        assert not flt.submit(0.105, 0.005, 0.9)
+    assert len(calls) == 1
+    assert flt.stats() == {"sent": 1, "suppressed": 100, "suppressed_pct": pytest.approx(100 * 100 / 101)}
+
+
+@pytest.mark.parametrize("sp", [(0.12, 0.0, 0.0), (0.1, -0.02, 0.0), (0.1, 0.0, -1.5)])
+def test_change_beyond_epsilon_on_any_axis_is_sent(sink, sp):
+    flt, calls = sink
+    flt.submit(0.1, 0.0, 0.0)
+    assert flt.submit(*sp)
+    assert calls[-1] == sp
+
+
+def test_epsilon_compares_against_last_sent_not_last_submitted(sink):
+    flt, calls = sink
+    flt.submit(0.0, 0.0, 0.0)
+    # schleichende Drift in Schritten < eps summiert sich, bis sie gesendet wird
+    sent = [flt.submit(0.004 * k, 0.0, 0.0) for k in range(1, 4)]
+    assert sent == [False, False, True]
+    assert calls[-1] == (pytest.approx(0.012), 0.0, 0.0)
+
+
+def test_reset_forces_next_setpoint(sink):
+    flt, calls = sink
+    flt.submit(0.1, 0.0, 0.0)
+    flt.reset()
+    assert flt.submit(0.1, 0.0, 0.0)
+    assert len(calls) == 2
+
+
+class FakeCommander:
+    def __init__(self):
+        self.sent = []
+
+    def send_hover_setpoint(self, vx, vy, yawrate, zdistance):
+        self.sent.append(("hover", vx, vy, yawrate, zdistance))
+
+    def send_stop_setpoint(self):
+        self.sent.append(("stop",))
+
+    def send_notify_setpoint_stop(self, remain_valid_milliseconds=0):
+        self.sent.append(("notify",))
+
+
+def test_packet_counter_counts_per_method_and_forwards():
+    cmd = FakeCommander()
+    t = [100.0]
+    counter = CommanderPacketCounter(cmd, clock=lambda: t[0])
+    for _ in range(3):
+        cmd.send_hover_setpoint(0.1, 0.0, 0.0, 0.3)
+    cmd.send_stop_setpoint()
+    cmd.send_notify_setpoint_stop()      # endet nicht auf _setpoint: kein Setpoint-Paket, nicht gezählt
+    t[0] = 102.0
+    assert cmd.sent[0] == ("hover", 0.1, 0.0, 0.0, 0.3)
+    assert len(cmd.sent) == 5
+    assert counter.stats() == {
+        "radio_packets": 4,
+        "radio_packets_per_s": 2.0,
+        "radio_send_hover_setpoint": 3,
+        "radio_send_stop_setpoint": 1,
+    }
@@ -0,0 +1,127 @@
+# test_wf_metrics.py
+# StateMetrics mit synthetischen Zeiten: Verweildauer, Übergangsmatrix, Battery-Low -> LANDING,
+# snapshot/Export sowie die Zeitstempel der FSM nach Landung und Neustart.
+
+import json
+from enum import Enum
+
+import pytest
+
+import wf_logging
+from pad_search_sim import reset_after_takeoff
+from wall_following import WallFollowing
+from wf_metrics import StateMetrics
+
+S = WallFollowing.StateWallFollowing
+RIGHT = WallFollowing.WallFollowingDirection.RIGHT
+
+
+class St(Enum):
+    A = 1
+    B = 2
+    LAND = 3
+
+
+def test_dwell_visits_and_transition_matrix():
+    m = StateMetrics(St, landing_state=St.LAND)
+    m.tick(St.A, 0.0)
+    m.tick(St.A, 1.0)
+    m.transition(St.A, St.B, 2.0)
+    m.transition(St.B, St.A, 5.0)
+    m.transition(St.A, St.B, 6.0)
+    snap = m.snapshot(t=10.0)
+    assert snap["state"] == "B" and snap["in_state_s"] == 4.0
+    assert snap["states"]["A"] == {"total_s": 3.0, "visits": 2, "mean_visit_s": 1.5,
+                                   "max_visit_s": 2.0, "last_visit_s": 1.0}
+    # laufender Besuch zählt bis t mit
+    assert snap["states"]["B"] == {"total_s": 7.0, "visits": 2, "mean_visit_s": 3.5,
+                                   "max_visit_s": 4.0, "last_visit_s": 3.0}
+    assert "LAND" not in snap["states"]
+    assert snap["transitions"]["states"] == ["A", "B", "LAND"]
+    assert snap["transitions"]["matrix"] == [[0, 2, 0], [1, 0, 0], [0, 0, 0]]
+
+
+def test_snapshot_defaults_to_last_tick():
+    m = StateMetrics(St)
+    m.tick(St.A, 3.0)
+    m.tick(St.A, 4.5)
+    snap = m.snapshot()
+    assert snap["t"] == 4.5 and snap["states"]["A"]["total_s"] == 1.5
+
+
+def test_first_transition_without_previous_state_starts_clock():
+    m = StateMetrics(St)
+    m.transition(None, St.B, 7.0)
+    m.transition(St.B, St.A, 9.0)
+    assert m.snapshot()["states"]["B"]["total_s"] == 2.0
+
+
+def test_battery_low_to_landing_episodes():
+    m = StateMetrics(St, landing_state=St.LAND)
+    m.tick(St.A, 0.0)
+    m.battery_low(True, 3.0)
+    m.battery_low(True, 4.0)                # nur die erste Flanke je Episode zählt
+    assert m.snapshot(t=5.0)["battery_low_to_landing"]["pending_s"] == 2.0
+    m.transition(St.A, St.LAND, 10.0)
+    m.transition(St.LAND, St.A, 20.0)
+    m.battery_low(True, 30.0)
+    m.battery_low(False, 31.0)              # Flag zurückgenommen: Episode verworfen
+    m.transition(St.A, St.LAND, 32.0)        # Landung ohne Battery-Low zählt nicht
+    m.transition(St.LAND, St.A, 33.0)
+    m.battery_low(True, 40.0)
+    m.transition(St.A, St.LAND, 44.0)
+    bl = m.snapshot()["battery_low_to_landing"]
+    assert bl == {"count": 2, "last_s": 4.0, "mean_s": 5.5, "min_s": 4.0, "max_s": 7.0, "pending_s": None}
+
+
+def test_metrics_export_writes_snapshot(tmp_path):
+    m = StateMetrics(St)
+    m.tick(St.A, 0.0)
+    m.transition(St.A, St.B, 1.25)
+    wf_logging.register_metrics("test_metrics", m.snapshot)
+    try:
+        exporter = wf_logging.start_metrics_export(str(tmp_path / "metrics.json"), interval_s=60.0)
+        exporter.stop()                     # stop() exportiert den letzten Stand
+        wf_logging._metrics_exporter = None
+    finally:
+        wf_logging._metrics_sources.pop("test_metrics")
+    data = json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8"))
+    assert data["test_metrics"]["states"]["A"]["total_s"] == 1.25
+    assert data["test_metrics"]["state"] == "B"
+
+
+# ---------- Zeitstempel der FSM ----------
+
+@pytest.fixture
+def wf():
+    return WallFollowing(angle_value_buffer=0.1, reference_distance_from_wall=0.15,
+                         max_forward_speed=0.1, init_state=S.FORWARD)
+
+
+def tick(wf, t):
+    wf.wall_follower(999, 999, 0.0, RIGHT, t)
+
+
+def test_landing_pause_counts_as_landing_not_next_state(wf):
+    tick(wf, 10.0)
+    wf.is_battery_low = True
+    tick(wf, 11.0)
+    wf.state = wf.state_transition(S.LANDING)
+    reset_after_takeoff(wf, True, 72.0)      # 60 s Countdown + Take-off, kein Laden
+    tick(wf, 72.1)
+    snap = wf.metrics.snapshot()
+    assert snap["states"]["LANDING"]["total_s"] == pytest.approx(61.0)
+    assert snap["states"]["TURN_TO_FIND_WALL"]["total_s"] == pytest.approx(0.1)
+    # neue Battery-Low-Episode beginnt nach dem Take-off, nicht beim Landetick
+    wf.time_now = 80.0
+    wf.state = wf.state_transition(S.LANDING)
+    bl = wf.metrics.snapshot()["battery_low_to_landing"]
+    assert bl["count"] == 2 and bl["last_s"] == pytest.approx(7.9)
+
+
+def test_battery_low_set_between_ticks_uses_next_tick_time(wf):
+    tick(wf, 1.0)
+    wf.is_battery_low = True                 # z.B. Tastatur-Callback, time_now ist noch 1.0
+    tick(wf, 4.0)
+    wf.state = wf.state_transition(S.LANDING)
+    assert wf.metrics.snapshot()["battery_low_to_landing"]["last_s"] == 0.0
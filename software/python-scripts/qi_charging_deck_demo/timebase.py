@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gemeinsame Zeitbasis für die Wall-Following-Skripte und Rotor_as_fan.py
+(dort als qi_charging_deck_demo.timebase importiert).
+
+ * now(): monotone Host-Uhr (time.monotonic), springt nicht bei NTP-Korrekturen
+ * to_wall(t): monotone Zeit -> Unix-Zeit über einen einmaligen Anker beim
+   Import; nur für Anzeige und Dateinamen, nicht zum Rechnen
+ * ClockSync: Online-Schätzung von Offset und Drift der Firmware-Uhr
+   (Log-Zeitstempel, ms seit Boot, 24 Bit) gegenüber now()
+
+Schätzverfahren: Für jedes Paket gilt host_rx - fw = Offset + Drift*fw + Latenz,
+mit Latenz >= Minimum. Je Block von block_s Sekunden wird das Minimum von
+host_rx - fw gemerkt (Paket mit der kleinsten Latenz). Die Drift ist die
+Steigung der Ausgleichsgeraden durch diese Minima, der Offset die untere
+Einhüllende. Die Latenz je Sample ist damit die Latenz über der kleinsten
+beobachteten Latenz; die absolute Einweglatenz ist ohne Rückkanal nicht messbar.
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+FW_TS_WRAP_MS = 1 << 24            # cflib liefert den Log-Zeitstempel mit 3 Byte
+
+_WALL_ANCHOR = time.time() - time.monotonic()
+
+
+def now() -> float:
+    """Monotone Host-Zeit in s."""
+    return time.monotonic()
+
+
+def to_wall(t: float) -> float:
+    """Monotone Host-Zeit -> Unix-Zeit (fester Anker, keine NTP-Sprünge)."""
+    return t + _WALL_ANCHOR
+
+
+@dataclass
+class AlignedSample:
+    fw_s: float          # Firmware-Zeit (entpackt, s seit Boot)
+    host_s: float        # Empfangszeit now()
+    aligned_s: float     # fw_s auf die Host-Zeitbasis abgebildet
+    latency_ms: float    # host_s - aligned_s
+
+
+class ClockSync:
+    """Offset-/Drift-Schätzer Firmware -> Host aus Log-Zeitstempeln."""
+
+    def __init__(self, block_s: float = 2.0, window_blocks: int = 64,
+                 min_fit_span_s: float = 20.0, clock: Callable[[], float] = now):
+        self.block_s = block_s
+        self.min_fit_span_s = min_fit_span_s
+        self._clock = clock
+        self._points = deque(maxlen=window_blocks)   # (fw_s, min(host - fw))
+        self._blk_start = None
+        self._blk_min = None                         # (fw_s, d)
+        self._last_raw = None
+        self._wraps = 0
+        self.drift = 0.0                             # s/s
+        self.offset_s = None
+        self.samples = 0
+        self._lat_sum = 0.0
+        self.latency_max_ms = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self.offset_s is not None
+
+    @property
+    def drift_ppm(self) -> float:
+        return self.drift * 1e6
+
+    def unwrap(self, fw_ms: int) -> float:
+        """24-Bit-Zeitstempel in ms -> fortlaufende Firmware-Zeit in s."""
+        if self._last_raw is not None and fw_ms < self._last_raw - FW_TS_WRAP_MS // 2:
+            self._wraps += 1
+        self._last_raw = fw_ms
+        return (fw_ms + self._wraps * FW_TS_WRAP_MS) / 1000.0
+
+    def _refit(self) -> None:
+        pts = list(self._points)
+        if self._blk_min is not None:
+            pts.append(self._blk_min)
+        n = len(pts)
+        if n >= 3 and pts[-1][0] - pts[0][0] >= self.min_fit_span_s:
+            mx = sum(p[0] for p in pts) / n
+            my = sum(p[1] for p in pts) / n
+            sxx = sum((p[0] - mx) ** 2 for p in pts)
+            if sxx > 0:
+                self.drift = sum((p[0] - mx) * (p[1] - my) for p in pts) / sxx
+        self.offset_s = min(d - self.drift * fw for fw, d in pts)
+
+    def update(self, fw_ms: int, host_s: Optional[float] = None) -> AlignedSample:
+        """Ein Log-Paket einarbeiten; liefert die ausgerichteten Zeiten des Samples."""
+        if host_s is None:
+            host_s = self._clock()
+        fw_s = self.unwrap(int(fw_ms))
+        d = host_s - fw_s
+
+        if self._blk_start is None or fw_s - self._blk_start >= self.block_s or fw_s < self._blk_start:
+            if self._blk_min is not None:
+                self._points.append(self._blk_min)
+            self._blk_start = fw_s
+            self._blk_min = (fw_s, d)
+            self._refit()
+        elif d < self._blk_min[1]:
+            self._blk_min = (fw_s, d)
+            c = d - self.drift * fw_s
+            if c < self.offset_s:
+                self.offset_s = c
+
+        aligned = self.fw_to_host(fw_s)
+        lat_ms = (host_s - aligned) * 1000.0
+        self.samples += 1
+        self._lat_sum += lat_ms
+        self.latency_max_ms = max(self.latency_max_ms, lat_ms)
+        return AlignedSample(fw_s, host_s, aligned, lat_ms)
+
+    def fw_to_host(self, fw_s: float) -> float:
+        return fw_s + self.drift * fw_s + (self.offset_s or 0.0)
+
+    def host_to_fw(self, host_s: float) -> Optional[float]:
+        """Host-Zeit -> zugehörige Firmware-Zeit (None, solange noch kein Paket kam)."""
+        if not self.ready:
+            return None
+        return (host_s - self.offset_s) / (1.0 + self.drift)
+
+    def stats(self) -> dict:
+        return {
+            "samples": self.samples,
+            "offset_s": self.offset_s,
+            "drift_ppm": self.drift_ppm,
+            "latency_mean_ms": self._lat_sum / self.samples if self.samples else float("nan"),
+            "latency_max_ms": self.latency_max_ms,
+        }
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline-Closed-Loop: bis zu welcher Tick-Periode und Latenz schafft die
+WallFollowing-FSM noch ihre Missionen?
+
+Raum und Drohne wie pad_search_sim.py, die Physik läuft aber mit feinem
+Zeitschritt (PHYS_DT), die FSM nur zu den (gejitterten) Ticks. Dazwischen
+sitzt fault_injection.FaultInjector: Sensorlatenz, verlorene Samples,
+veraltetes Yaw und Kommandolatenz.
+
+Mission: Start an zufälliger Pose, Wall-Following für eine zufällige Dauer,
+dann Battery-Low. Erfolg = Landung auf dem Pad innerhalb CYCLE_TIMEOUT_S
+ohne Wandkontakt. Landungen in Ecken ohne Pad kosten TAKEOFF_PENALTY_S,
+danach geht die Suche weiter (Ausrichtung an der Wand und Eckrotation
+werden also mitgeprüft).
+
+Gitter: Periode x Sensorlatenz (je Periode aufsteigend, Abbruch nach zwei
+durchgefallenen Latenzen in Folge; einzelne Ausreißer sind meist nur eine
+lange Wandsuche, die in den Timeout läuft). Jitter, Drop, Stale-Yaw und
+Kommandolatenz kommen fest aus den Argumenten dazu.
+
+Beispiel:
+    python timing_limits_sim.py --missions 20 --periods 0.1,0.3,0.5,1.0 --delays 0,0.2,0.5
+"""
+
+import argparse
+import contextlib
+import io
+import math
+import random
+import time
+
+from wf_logging import start_new_session, LogConfig
+from wall_following import WallFollowing
+from fault_injection import FaultConfig, FaultInjector
+from pad_search_sim import (SimDrone, reset_after_takeoff, S, REFERENCE_DISTANCE,
+                            CYCLE_TIMEOUT_S, TAKEOFF_PENALTY_S)
+
+PHYS_DT = 0.02                   # s
+DEFAULT_PERIODS = "0.1,0.2,0.3,0.5,0.75,1.0"
+DEFAULT_DELAYS = "0,0.1,0.2,0.3,0.5,0.8"
+START_BOX = ((0.5, 3.5), (0.4, 1.1))   # Startposen im unteren Schenkel des L-Raums
+
+
+def run_mission(cfg, seed, mission_s=(20.0, 60.0)):
+    """Eine Mission mit Fault-Konfiguration; liefert (erfolg, grund, dauer ab Battery-Low)."""
+    rng = random.Random(seed)
+    drone = SimDrone(rng, rng.uniform(*START_BOX[0]), rng.uniform(*START_BOX[1]), rng.uniform(-math.pi, math.pi))
+    inj = FaultInjector(FaultConfig(**{**cfg.__dict__, "seed": seed}))
+    wf = WallFollowing(angle_value_buffer=0.1, reference_distance_from_wall=REFERENCE_DISTANCE,
+                       max_forward_speed=0.1, init_state=S.FORWARD)
+    direction = WallFollowing.WallFollowingDirection.RIGHT
+    t_low = rng.uniform(*mission_s)
+    t, next_tick = 0.0, 0.0
+
+    while t < t_low + CYCLE_TIMEOUT_S:
+        if t >= next_tick - 1e-9:
+            next_tick += inj.next_period()
+            rg = drone.ranges()
+            front = rg["front"] if rg["front"] is not None else 999
+            side = rg["left"] if rg["left"] is not None else 999
+            seen = inj.sense(t, (front, side), drone.yaw)
+            if seen is not None:
+                wf.is_battery_low = t >= t_low
+                (front, side), yaw = seen
+                vx, vy, yr, st = wf.wall_follower(front, side, yaw, direction, t)
+                if st == S.LANDING:
+                    if drone.collisions:
+                        return False, "collision", t - t_low
+                    if t >= t_low and drone.on_pad():
+                        return True, "ok", t - t_low
+                    # falsche Ecke (oder vor Battery-Low): abheben, weitersuchen
+                    t += TAKEOFF_PENALTY_S
+                    next_tick = t
+                    reset_after_takeoff(wf, t >= t_low, t)
+                    inj.command(t, (0.0, 0.0, 0.0))
+                    continue
+                inj.command(t, (vx, vy, yr))
+        drone.step(*inj.command(t), dt=PHYS_DT)
+        if drone.collisions:
+            return False, "collision", t - t_low
+        t += PHYS_DT
+    return False, "timeout", CYCLE_TIMEOUT_S
+
+
+def run_cell(cfg, missions, seed):
+    res = [run_mission(cfg, seed * 1000 + k) for k in range(missions)]
+    ok = sum(1 for r in res if r[0])
+    reasons = {}
+    for r in res:
+        if not r[0]:
+            reasons[r[1]] = reasons.get(r[1], 0) + 1
+    mean_ok = sum(r[2] for r in res if r[0]) / ok if ok else float("nan")
+    return ok / missions, mean_ok, reasons
+
+
+def _floats(spec):
+    return [float(v) for v in spec.split(",") if v.strip()]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Timing-Grenzen der WallFollowing-FSM (Periode x Latenz)")
+    ap.add_argument("--missions", type=int, default=20, help="Missionen je Gitterzelle")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--periods", default=DEFAULT_PERIODS, help="Tick-Perioden (s), kommagetrennt")
+    ap.add_argument("--delays", default=DEFAULT_DELAYS, help="Sensorlatenzen (s), kommagetrennt")
+    ap.add_argument("--jitter", type=float, default=0.0, help="Jitter als Anteil der Periode, in [0, 1)")
+    ap.add_argument("--drop", type=float, default=0.0, help="Verlustwahrscheinlichkeit je Sample, in [0, 1)")
+    ap.add_argument("--stale-yaw", type=float, default=0.0, help="zusätzliches Yaw-Alter (s)")
+    ap.add_argument("--cmd-delay", type=float, default=0.0, help="Latenz FSM -> Senke (s)")
+    ap.add_argument("--min-success", type=float, default=0.9, help="Erfolgsquote, ab der eine Zelle besteht")
+    args = ap.parse_args()
+    if not 0.0 <= args.jitter < 1.0:
+        ap.error(f"--jitter {args.jitter}: Anteil der Periode muss in [0, 1) liegen (Tick-Periode bleibt > 0)")
+    if not 0.0 <= args.drop < 1.0:
+        ap.error(f"--drop {args.drop}: Wahrscheinlichkeit muss in [0, 1) liegen")
+
+    start_new_session(LogConfig(console=False, to_file=False))
+    periods, delays = sorted(_floats(args.periods)), sorted(_floats(args.delays))
+    grid = {}
+    t0 = time.perf_counter()
+    for p in periods:
+        failed = 0
+        for d in delays:
+            cfg = FaultConfig(period=p, delay=d, jitter=args.jitter * p, drop=args.drop,
+                              stale_yaw=args.stale_yaw, cmd_delay=args.cmd_delay)
+            with contextlib.redirect_stdout(io.StringIO()):  # FSM-Debug-Prints unterdrücken
+                grid[(p, d)] = run_cell(cfg, args.missions, args.seed)
+            failed = failed + 1 if grid[(p, d)][0] < args.min_success else 0
+            if failed >= 2:
+                break                                       # größere Latenzen bei dieser Periode nicht mehr testen
+
+    print(f"[CFG] jitter={args.jitter:.0%} der Periode, drop={args.drop:.0%}, stale_yaw={args.stale_yaw} s, "
+          f"cmd_delay={args.cmd_delay} s, {args.missions} Missionen/Zelle, Laufzeit {time.perf_counter() - t0:.0f} s")
+    print("Erfolgsquote (mittlere Zeit ab Battery-Low bei Erfolg), Zeilen = Periode, Spalten = Sensorlatenz")
+    print(f"{'Periode s':>9s} " + " ".join(f"{d:>13.2f}" for d in delays))
+    for p in periods:
+        cells = []
+        for d in delays:
+            if (p, d) not in grid:
+                cells.append(f"{'-':>13s}")
+                continue
+            rate, mean_ok, _ = grid[(p, d)]
+            cells.append(f"{rate:6.0%} ({mean_ok:4.0f})" if mean_ok == mean_ok else f"{rate:6.0%}   ( - )")
+        print(f"{p:9.2f} " + " ".join(cells))
+
+    fails = {}
+    for rate, _, reasons in grid.values():
+        for k, v in reasons.items():
+            fails[k] = fails.get(k, 0) + v
+    if fails:
+        print("Fehlschläge: " + ", ".join(f"{k}={v}" for k, v in sorted(fails.items())))
+
+    passing = [(p, d) for (p, d), (rate, _, _) in grid.items() if rate >= args.min_success]
+    if not passing:
+        print(f"[RESULT] keine Zelle mit Erfolgsquote >= {args.min_success:.0%}")
+        return
+    max_p = max(p for p, d in passing if d == delays[0]) if any(d == delays[0] for _, d in passing) else None
+    max_d = max(d for p, d in passing if p == periods[0]) if any(p == periods[0] for p, _ in passing) else None
+    print(f"[RESULT] größte Periode (Latenz {delays[0]} s): {max_p} s | größte Latenz (Periode {periods[0]} s): {max_d} s")
+    frontier = ", ".join(f"{p} s -> {max(d for q, d in passing if q == p)} s"
+                         for p in periods if any(q == p for q, _ in passing))
+    print(f"[RESULT] je Periode größte bestandene Latenz: {frontier}")
+
+
+if __name__ == "__main__":
+    main()
@@ -35,8 +35,9 @@ demos/app_wall_following_demo
 Author:   Kimberly McGuire (Bitcraze AB)
 """
 import math
-import time
 from wf_logging import log_state_change, get_logger
+import timebase
+from wf_metrics import StateMetrics
 from enum import Enum
 
 
@@ -52,6 +53,7 @@ class WallFollowing():
         FIND_CORNER = 8
         PREPARE_TO_LAND = 9
         LANDING = 10
+        GO_TO_PAD = 11
 
     class WallFollowingDirection(Enum):
         LEFT = 1
@@ -71,7 +73,9 @@ class WallFollowing():
                  range_lost_threshold=0.3,
                  in_corner_angle=0.8,
                  wait_for_measurement_seconds=1.0,
-                 init_state=StateWallFollowing.FORWARD):
+                 init_state=StateWallFollowing.FORWARD,
+                 pad_map=None,
+                 landing_controller=None):
         """
         __init__ function for the WallFollowing class
 
@@ -96,6 +100,11 @@ class WallFollowing():
         wait_for_measurement_seconds is the time the Crazyflie should wait for a
             measurement before it starts the wall following demo (in s)
         init_state is the initial state of the Crazyflie (StateWallFollowing Enum)
+        pad_map is an optional PadMap (pad_map.py); with a learned pad the Crazyflie
+            flies there directly when the battery is low (GO_TO_PAD) before falling
+            back to the wall search
+        landing_controller is an optional PDAlignController (landing_align.py) for
+            PREPARE_TO_LAND; None keeps the saturated P-law with align_hold_time
         self.state is a shared state variable that is used to keep track of the current
             state of the Crazyflie's wall following
         self.time_now is a shared state variable that is used to keep track of the current (in s)
@@ -122,12 +131,45 @@ class WallFollowing():
         self.speed_redux_corner = 3.0
         self.speed_redux_straight = 2.0
 
+        # Verweildauer, Übergänge, Battery-Low -> LANDING (snapshot: self.metrics.snapshot())
+        self.metrics = StateMetrics(self.StateWallFollowing, landing_state=self.StateWallFollowing.LANDING)
         self.is_battery_low = False
         self.align_ok_since = None  # Zeitpunkt, seit dem beide Abstände innerhalb Toleranz sind
         self.align_hold_time = 2.0  # Haltezeit in s, bevor gelandet wird
-        self.state_change_time = time.time()
-
-
+        self.state_change_time = timebase.now()
+
+        # Gelernte Pad-Position (GO_TO_PAD)
+        self.pad_map = pad_map
+        self.pad_target = None          # Pad aus pad_map.best_pad()
+        self.pad_path = []              # verbleibende Wegpunkte (m)
+        self.pad_attempted = False      # nur ein Versuch je Battery-Low-Episode
+        self.pad_replans = 0
+        self.max_pad_replans = 3
+        self.go_to_pad_timeout = 40.0   # s, danach Wandsuche
+        self.pad_waypoint_radius = 0.10
+        self.pad_arrive_radius = 0.06
+        self.pad_heading_gain = 2.0
+        self.pad_min_clearance = 0.10   # m, näher an einem Hindernis (alle Richtungen): anhalten, neu planen
+        self.pad_near_radius = 0.30     # m, so nah am Pad gehören Wände zur Pad-Ecke (Odometrie-Drift)
+        self.pad_backoff_s = 1.0        # s, vom Hindernis wegfliegen, bevor der neue Pfad abgeflogen wird
+        self.pad_backoff_until = None
+
+        # Ausrichtregler für PREPARE_TO_LAND (None = P-Regler + Haltezeit)
+        self.landing_controller = landing_controller
+        self.last_command = (0.0, 0.0)  # (vx, vy) des letzten Ticks, Startwert der PD-Ratenbegrenzung
+
+
+
+    @property
+    def is_battery_low(self):
+        return self._is_battery_low
+
+    @is_battery_low.setter
+    def is_battery_low(self, value):
+        # Flanke geht erst im nächsten wall_follower()-Tick mit dessen Zeit in die Metriken:
+        # gesetzt wird auch aus Tastatur-/Batterie-Callbacks und nach der Landung, wo
+        # time_now noch die Zeit des letzten Ticks ist
+        self._is_battery_low = bool(value)
 
     # Helper function
     def value_is_close_to(self, real_value, checked_value, margin):
@@ -153,9 +195,14 @@ class WallFollowing():
         # konservative Stellgröße
         v_step = self.max_forward_speed / self.speed_redux_straight
 
-        # P-ähnliche Regelung mit Sättigung pro Achse
-        vx = max(-v_step, min(v_step, e_front / max(self.ranger_value_buffer, 1e-6) * v_step))
-        vy_body = max(-v_step, min(v_step, e_side / max(self.ranger_value_buffer, 1e-6) * v_step))
+        if self.landing_controller is not None:
+            # PD mit Ratenbegrenzung, gleiche Sättigung und Toleranz wie der P-Regler
+            vx, vy_body = self.landing_controller.update(
+                e_front, e_side, self.time_now, v_step, self.ranger_value_buffer * 0.5)
+        else:
+            # P-ähnliche Regelung mit Sättigung pro Achse
+            vx = max(-v_step, min(v_step, e_front / max(self.ranger_value_buffer, 1e-6) * v_step))
+            vy_body = max(-v_step, min(v_step, e_side / max(self.ranger_value_buffer, 1e-6) * v_step))
 
         # Richtungs-Konvention beibehalten (RIGHT = -1): vorzeichenkorrektes Seiten-Command
         vy = self.wall_following_direction_value * (-vy_body)
@@ -245,13 +292,63 @@ class WallFollowing():
                 velocity_y = self.wall_following_direction_value * (self.max_forward_speed / self.speed_redux_corner)
         return velocity_x, velocity_y, rate_yaw
 
+    def command_go_to_pad(self, current_heading):
+        """
+        Command the Crazyflie towards the next waypoint to the learned pad,
+            then turn to the heading it had when it landed there.
+            While backing off from an obstacle it only moves away from it.
+
+        current_heading is defined in rad, in the map frame (pad_map.pose)
+        velocity_x is defined in m/s, rate_yaw in rad/s (same convention as command_turn)
+        """
+        x, y, _ = self.pad_map.pose
+        if self.pad_backoff_until is not None and self.time_now < self.pad_backoff_until:
+            obstacle = self.pad_map.nearest_obstacle(self.pad_min_clearance + self.ranger_value_buffer)
+            if obstacle is None:
+                return 0.0, 0.0, 0.0
+            away = obstacle[1] + math.pi - current_heading
+            speed = self.max_forward_speed / self.speed_redux_straight
+            return speed * math.cos(away), speed * math.sin(away), 0.0
+        if self.pad_path:
+            wx, wy = self.pad_path[0]
+            dist = math.hypot(wx - x, wy - y)
+            heading_error = self.wrap_to_pi(math.atan2(wy - y, wx - x) - current_heading)
+            velocity_x = 0.0
+            if math.fabs(heading_error) < math.pi / 4:
+                velocity_x = min(self.max_forward_speed, dist) * math.cos(heading_error)
+        else:
+            heading_error = self.wrap_to_pi(self.pad_target.yaw - current_heading)
+            velocity_x = 0.0
+        rate_yaw = max(-self.max_turn_rate, min(self.max_turn_rate, self.pad_heading_gain * heading_error))
+        return velocity_x, 0.0, rate_yaw
+
+    def plan_to_pad(self):
+        """Plan a path to the best known pad, returns False if there is none."""
+        if self.pad_map is None or self.pad_map.pose is None:
+            return False
+        pad = self.pad_map.best_pad()
+        if pad is None:
+            return False
+        path = self.pad_map.plan_path(self.pad_map.pose[:2], (pad.x, pad.y))
+        if path is None:
+            get_logger().info("GO_TO_PAD: kein Pfad zum Pad (%.2f, %.2f)", pad.x, pad.y)
+            return False
+        self.pad_target = pad
+        self.pad_path = path
+        return True
+
     # state machine helper functions
     def state_transition(self, new_state):
         """Transition to a new state and reset the state timer (with logging)."""
         prev_state = getattr(self, 'state', None)
         # Reset timers
         self.state_start_time = self.time_now
-        self.state_change_time = time.time()
+        self.state_change_time = timebase.now()
+        self.metrics.transition(prev_state, new_state, self.time_now)
+        if new_state == self.StateWallFollowing.PREPARE_TO_LAND and self.landing_controller is not None:
+            # vy -> vy_body wie in calc_landing (Richtungswert ist +-1)
+            vx, vy = self.last_command
+            self.landing_controller.reset((vx, -vy * self.wall_following_direction_value))
         # Log transition
         try:
             log_state_change(prev_state, new_state, reason="state_transition")
@@ -279,7 +376,7 @@ class WallFollowing():
         front_range and side_range is defined in m
         current_heading is defined in rad
         wall_following_direction is defined as WallFollowingDirection enum
-        time_outer_loop is defined in seconds (double)
+        time_outer_loop is defined in seconds (double), monotonic host clock (timebase.now())
         command_velocity_x, command_velocity_ y is defined in m/s
         command_rate_yaw is defined in rad/s
         self.state is defined as StateWallFollowing enum
@@ -287,6 +384,8 @@ class WallFollowing():
 
         self.wall_following_direction_value = float(wall_following_direction.value)
         self.time_now = time_outer_loop
+        self.metrics.tick(self.state, self.time_now)
+        self.metrics.battery_low(self._is_battery_low, self.time_now)
 
         if self.first_run:
             self.prev_heading = current_heading
@@ -294,6 +393,18 @@ class WallFollowing():
             self.first_run = False
 
         # -------------- Handle state transitions ---------------- #
+        # Bekanntes Pad: bei Battery-Low zuerst direkt hinfliegen, erst danach Wandsuche
+        if not self.is_battery_low:
+            self.pad_attempted = False
+        elif self.pad_map is not None and not self.pad_attempted and self.state not in (
+                self.StateWallFollowing.PREPARE_TO_LAND, self.StateWallFollowing.LANDING,
+                self.StateWallFollowing.GO_TO_PAD, self.StateWallFollowing.HOVER):
+            self.pad_attempted = True
+            self.pad_replans = 0
+            self.pad_backoff_until = None
+            if self.plan_to_pad():
+                self.state = self.state_transition(self.StateWallFollowing.GO_TO_PAD)
+
         if self.state == self.StateWallFollowing.FORWARD:
             if front_range < self.reference_distance_from_wall + self.ranger_value_buffer:
                 self.state = self.state_transition(self.StateWallFollowing.TURN_TO_FIND_WALL)
@@ -348,20 +459,57 @@ class WallFollowing():
         elif self.state == self.StateWallFollowing.FIND_CORNER:
             if side_range <= self.reference_distance_from_wall:
                 self.state = self.state_transition(self.StateWallFollowing.ROTATE_AROUND_WALL)
+        elif self.state == self.StateWallFollowing.GO_TO_PAD:
+            x, y, _ = self.pad_map.pose
+            while self.pad_path:
+                wx, wy = self.pad_path[0]
+                radius = self.pad_waypoint_radius if len(self.pad_path) > 1 else self.pad_arrive_radius
+                if math.hypot(wx - x, wy - y) > radius:
+                    break
+                self.pad_path.pop(0)
+            backing_off = self.pad_backoff_until is not None and self.time_now < self.pad_backoff_until
+            obstacle = self.pad_map.nearest_obstacle(self.pad_min_clearance)
+            clearance = min(front_range, side_range, obstacle[0] if obstacle else math.inf)
+            if self.time_now - self.state_start_time > self.go_to_pad_timeout:
+                get_logger().info("GO_TO_PAD: Timeout -> Wandsuche")
+                self.state = self.state_transition(self.StateWallFollowing.FORWARD)
+            elif not self.pad_path:
+                # am Pad: auf das Lande-Heading drehen, dann wie gewohnt an den Wänden ausrichten
+                if math.fabs(self.wrap_to_pi(self.pad_target.yaw - self.pad_map.pose[2])) < self.angle_value_buffer:
+                    self.align_ok_since = None
+                    self.state = self.state_transition(self.StateWallFollowing.PREPARE_TO_LAND)
+            elif clearance < self.pad_min_clearance and not backing_off:
+                if len(self.pad_path) == 1 and math.hypot(self.pad_target.x - x, self.pad_target.y - y) < self.pad_near_radius:
+                    # Wand schon vor dem Pad-Punkt: Odometrie-Drift, das ist die Pad-Ecke.
+                    # Nicht weiter per Odometrie anfliegen, Ausrichten über die Abstände (PREPARE_TO_LAND)
+                    self.pad_path = []
+                else:
+                    # zu nah an einem Hindernis (vorne, seitlich oder diagonal): anhalten,
+                    # wegfliegen und mit dem jetzt eingetragenen Hindernis neu planen
+                    self.pad_replans += 1
+                    self.pad_backoff_until = self.time_now + self.pad_backoff_s
+                    if self.pad_replans > self.max_pad_replans or not self.plan_to_pad():
+                        get_logger().info("GO_TO_PAD: blockiert -> Wandsuche")
+                        self.state = self.state_transition(self.StateWallFollowing.TURN_TO_FIND_WALL)
         elif self.state == self.StateWallFollowing.PREPARE_TO_LAND:
             print("PREPARE to land")
-            # enge Toleranz: halber Ranger-Puffer
-            tol = self.ranger_value_buffer * 0.5
-            ready_front = self.value_is_close_to(front_range, self.reference_distance_from_wall, tol)
-            ready_side = self.value_is_close_to(side_range, self.reference_distance_from_wall, tol)
-
-            if ready_front and ready_side:
-                if self.align_ok_since is None:
-                    self.align_ok_since = self.time_now
-                elif (self.time_now - self.align_ok_since) >= self.align_hold_time:
+            if self.landing_controller is not None:
+                # Settling-Detektor des PD-Reglers (Zustand aus dem letzten calc_landing)
+                if self.landing_controller.settled:
                     self.state = self.state_transition(self.StateWallFollowing.LANDING)
             else:
-                self.align_ok_since = None
+                # enge Toleranz: halber Ranger-Puffer
+                tol = self.ranger_value_buffer * 0.5
+                ready_front = self.value_is_close_to(front_range, self.reference_distance_from_wall, tol)
+                ready_side = self.value_is_close_to(side_range, self.reference_distance_from_wall, tol)
+
+                if ready_front and ready_side:
+                    if self.align_ok_since is None:
+                        self.align_ok_since = self.time_now
+                    elif (self.time_now - self.align_ok_since) >= self.align_hold_time:
+                        self.state = self.state_transition(self.StateWallFollowing.LANDING)
+                else:
+                    self.align_ok_since = None
         else:
             self.state = self.state_transition(self.StateWallFollowing.HOVER)
 
@@ -421,6 +569,10 @@ class WallFollowing():
             command_velocity_y_temp, command_angle_rate_temp = self.command_align_corner(
                 -1 * self.max_turn_rate, side_range, self.reference_distance_from_wall)
             command_velocity_x_temp = 0.0
+        elif self.state == self.StateWallFollowing.GO_TO_PAD:
+            # Heading im Kartenrahmen: nach Relokalisierung gegen die Odometrie gedreht
+            command_velocity_x_temp, command_velocity_y_temp, command_angle_rate_temp = \
+                self.command_go_to_pad(self.pad_map.pose[2])
         elif self.state == self.StateWallFollowing.PREPARE_TO_LAND:
             command_velocity_x_temp, command_velocity_y_temp = self.calc_landing(front_range, side_range)
         elif self.state == self.StateWallFollowing.LANDING:
@@ -435,6 +587,7 @@ class WallFollowing():
         command_velocity_x = command_velocity_x_temp
         command_velocity_y = command_velocity_y_temp
         command_yaw_rate = command_angle_rate_temp
+        self.last_command = (command_velocity_x, command_velocity_y)
 
         return command_velocity_x, command_velocity_y, command_yaw_rate, self.state
 
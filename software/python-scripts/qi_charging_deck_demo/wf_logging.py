@@ -2,6 +2,9 @@
 # wf_logging.py
 # Zentrales Logging-Modul für die Wall-Following- und Ladezustandsmaschine.
 # Nutzt Python logging + Rolling File Handler sowie optionale CSV-Protokolle.
+# Zeitstempel kommen aus timebase (monotone Host-Uhr, optional Firmware-Zeit).
+# Kennzahlen (z. B. WallFollowing.metrics) werden am Session-Ende als JSON abgelegt
+# und optional periodisch exportiert (WF_METRICS_EXPORT=<datei.json> | udp://host:port).
 
 from __future__ import annotations
 import logging
@@ -9,10 +12,15 @@ from logging.handlers import RotatingFileHandler
 from dataclasses import dataclass
 from typing import Optional, Any, Callable, Dict
 import csv
+import json
+import socket
+import threading
 import time
 import os
 import uuid
 
+import timebase
+
 # ---------- Konfiguration ----------
 
 @dataclass
@@ -22,6 +30,7 @@ class LogConfig:
     log_file: str = "wall_following.log"
     events_csv: str = "wall_following_events.csv"
     status_csv: str = "wall_following_status.csv"
+    metrics_json: str = "wall_following_metrics.json"
     max_bytes: int = 2_000_000
     backup_count: int = 4
     console: bool = True
@@ -30,12 +39,17 @@ class LogConfig:
 _run_id: str = None
 _logger: Optional[logging.Logger] = None
 _cfg: LogConfig = LogConfig()
+_t_session0: float = timebase.now()
+_clock_sync: Optional["timebase.ClockSync"] = None
+_metrics_sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+_metrics_exporter: Optional["MetricsExporter"] = None
 
 def start_new_session(cfg: Optional[LogConfig] = None) -> str:
     """Initialisiert eine neue Logging-Session und liefert eine Run-ID."""
-    global _run_id, _cfg
+    global _run_id, _cfg, _t_session0
     if cfg is not None:
         _set_cfg(cfg)
+    _t_session0 = timebase.now()
     _run_id = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
     logger = get_logger()
     logger.info("SESSION START | run_id=%s", _run_id)
@@ -43,6 +57,102 @@ def start_new_session(cfg: Optional[LogConfig] = None) -> str:
     _ensure_csv_headers()
     return _run_id
 
+def set_clock_sync(sync: Optional["timebase.ClockSync"]) -> None:
+    """ClockSync der Log-Blöcke registrieren, damit jede CSV-Zeile auch Firmware-Zeit enthält."""
+    global _clock_sync
+    _clock_sync = sync
+
+def register_metrics(name: str, snapshot: Callable[[], Dict[str, Any]]) -> None:
+    """Kennzahlen-Quelle anmelden; snapshot() wird am Session-Ende und beim Export gelesen."""
+    _metrics_sources[name] = snapshot
+
+def metrics_snapshot() -> Dict[str, Any]:
+    """Aktueller Stand aller angemeldeten Kennzahlen-Quellen."""
+    out: Dict[str, Any] = {"run_id": _run_id, "t_host_s": round(timebase.now() - _t_session0, 3)}
+    for name, fn in list(_metrics_sources.items()):
+        try:
+            out[name] = fn()
+        except Exception as e:  # Export darf die Regelschleife nie stören
+            out[name] = {"error": repr(e)}
+    return out
+
+def end_session() -> Dict[str, Any]:
+    """Session abschließen: periodischen Export stoppen, Kennzahlen loggen und als JSON ablegen."""
+    global _metrics_exporter
+    if _metrics_exporter is not None:
+        _metrics_exporter.stop()
+        _metrics_exporter = None
+    snap = metrics_snapshot()
+    wf = snap.get("wall_following")
+    if isinstance(wf, dict) and "states" in wf:
+        log_event("METRICS", "Verweildauer je Zustand",
+                  **{k: v["total_s"] for k, v in wf["states"].items()})
+        log_event("METRICS", "Battery-Low -> LANDING", **wf["battery_low_to_landing"])
+    if _cfg.to_file:
+        _write_json_atomic(_cfg.metrics_json, snap)
+    get_logger().info("SESSION END | run_id=%s", _run_id)
+    return snap
+
+def _write_json_atomic(path: str, data: Dict[str, Any]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, path)
+
+class MetricsExporter:
+    """Hintergrund-Thread: alle interval_s metrics_snapshot() in eine Datei (atomar ersetzt) oder per UDP senden."""
+
+    def __init__(self, target: str, interval_s: float = 5.0):
+        self.target = target
+        self.interval_s = interval_s
+        self.exports = 0
+        self.errors = 0
+        self._stop = threading.Event()
+        self._sock = None
+        self._addr = None
+        if target.startswith("udp://"):
+            host, _, port = target[len("udp://"):].rpartition(":")
+            self._addr = (host or "127.0.0.1", int(port))
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._thread = threading.Thread(target=self._run, name="wf-metrics-export", daemon=True)
+        self._thread.start()
+
+    def export_once(self) -> None:
+        snap = metrics_snapshot()
+        try:
+            if self._sock is not None:
+                self._sock.sendto(json.dumps(snap).encode("utf-8"), self._addr)
+            else:
+                _write_json_atomic(self.target, snap)
+            self.exports += 1
+        except OSError:
+            self.errors += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            self.export_once()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=self.interval_s + 1.0)
+        self.export_once()  # letzter Stand
+        if self._sock is not None:
+            self._sock.close()
+
+def start_metrics_export(target: Optional[str] = None, interval_s: Optional[float] = None) -> Optional[MetricsExporter]:
+    """Periodischen Export starten; ohne Argumente aus WF_METRICS_EXPORT / WF_METRICS_INTERVAL_S (Default 5 s)."""
+    global _metrics_exporter
+    target = target or os.getenv("WF_METRICS_EXPORT", "")
+    if not target:
+        return None
+    if interval_s is None:
+        interval_s = float(os.getenv("WF_METRICS_INTERVAL_S", "5"))
+    if _metrics_exporter is not None:
+        _metrics_exporter.stop()
+    _metrics_exporter = MetricsExporter(target, interval_s)
+    get_logger().info("METRICS EXPORT | %s alle %.1f s", target, interval_s)
+    return _metrics_exporter
+
 def _set_cfg(cfg: LogConfig) -> None:
     global _cfg
     _cfg = cfg
@@ -76,20 +186,42 @@ def get_logger() -> logging.Logger:
     _logger = logger
     return _logger
 
+EVENTS_HEADER = ["ts","run_id","type","prev_state","new_state","reason","details",
+                 "t_host_s","t_fw_s"]  # details als JSON-ähnlicher String
+STATUS_HEADER = ["ts","run_id","state","front_m","side_m","battery_low","dt_in_state_s",
+                 "t_host_s","t_fw_s"]  # Minimal-Status
+
+def _ensure_csv_header(path: str, header: list[str]) -> None:
+    """
+    Header schreiben, falls die Datei fehlt. Passt der vorhandene Header nicht
+    (z. B. CSV aus einer älteren Version mit weniger Spalten), wird die Datei nach
+    <name>.<zeitstempel>.csv verschoben und neu begonnen.
+    """
+    if os.path.exists(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            existing = next(csv.reader(f), None)
+        if existing == header:
+            return
+        root, ext = os.path.splitext(path)
+        os.replace(path, f"{root}.{time.strftime('%Y%m%d-%H%M%S')}{ext}")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow(header)
+
 def _ensure_csv_headers() -> None:
-    # Events
-    if _cfg.to_file and not os.path.exists(_cfg.events_csv):
-        with open(_cfg.events_csv, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(["ts","run_id","type","prev_state","new_state","reason","details"])  # details als JSON-ähnlicher String
-    # Status
-    if _cfg.to_file and not os.path.exists(_cfg.status_csv):
-        with open(_cfg.status_csv, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(["ts","run_id","state","front_m","side_m","battery_low","dt_in_state_s"])  # Minimal-Status
+    if not _cfg.to_file:
+        return
+    _ensure_csv_header(_cfg.events_csv, EVENTS_HEADER)
+    _ensure_csv_header(_cfg.status_csv, STATUS_HEADER)
 
 def _now_str() -> str:
-    return time.strftime("%H:%M:%S", time.localtime())
+    return time.strftime("%H:%M:%S", time.localtime(timebase.to_wall(timebase.now())))
+
+def _times(t_fw_s: Optional[float] = None) -> list[str]:
+    """[t_host_s seit Session-Start (monoton), t_fw_s (Firmware-Zeit, s seit Boot)]."""
+    t = timebase.now()
+    if t_fw_s is None and _clock_sync is not None:
+        t_fw_s = _clock_sync.host_to_fw(t)
+    return [f"{t - _t_session0:.3f}", f"{t_fw_s:.3f}" if t_fw_s is not None else ""]
 
 def _csv_write(path: str, row: list[Any]) -> None:
     if not _cfg.to_file:
@@ -105,17 +237,18 @@ def log_state_change(prev_state: Any, new_state: Any, reason: str = "", **detail
     logger = get_logger()
     extras = " | ".join(f"{k}={v}" for k, v in details.items()) if details else ""
     logger.info("FSM: %s -> %s | %s%s", getattr(prev_state, "name", prev_state), getattr(new_state, "name", new_state), reason, (" | " + extras) if extras else "")
-    _csv_write(_cfg.events_csv, [_now_str(), _run_id, "STATE_CHANGE", getattr(prev_state, "name", prev_state), getattr(new_state, "name", new_state), reason, extras])
+    _csv_write(_cfg.events_csv, [_now_str(), _run_id, "STATE_CHANGE", getattr(prev_state, "name", prev_state), getattr(new_state, "name", new_state), reason, extras] + _times())
 
 def log_event(kind: str, msg: str, **details: Any) -> None:
     """Freie Ereignisse (z. B. Trigger, Safety-Stop, Sensorfehler)."""
     logger = get_logger()
     extras = " | ".join(f"{k}={v}" for k, v in details.items()) if details else ""
     logger.info("%s: %s%s", kind.upper(), msg, (" | " + extras) if extras else "")
-    _csv_write(_cfg.events_csv, [_now_str(), _run_id, kind.upper(), "", "", msg, extras])
+    _csv_write(_cfg.events_csv, [_now_str(), _run_id, kind.upper(), "", "", msg, extras] + _times())
 
-def log_status(state: Any, front_m: Optional[float], side_m: Optional[float], battery_low: Optional[bool], dt_in_state_s: Optional[float] = None) -> None:
-    """Regelmäßiger Status-Log (Konsole/Datei) und CSV."""
+def log_status(state: Any, front_m: Optional[float], side_m: Optional[float], battery_low: Optional[bool], dt_in_state_s: Optional[float] = None,
+               t_fw_s: Optional[float] = None) -> None:
+    """Regelmäßiger Status-Log (Konsole/Datei) und CSV. t_fw_s: Firmware-Zeit des zugrunde liegenden Samples."""
     logger = get_logger()
     sname = getattr(state, "name", state)
     logger.info("STATUS: %s, Front=%.2f m, Side=%.2f m, BatteryLow=%s, dt=%.1f s",
@@ -124,7 +257,7 @@ def log_status(state: Any, front_m: Optional[float], side_m: Optional[float], ba
                 float(side_m) if side_m is not None else float("nan"),
                 battery_low,
                 float(dt_in_state_s) if dt_in_state_s is not None else float("nan"))
-    _csv_write(_cfg.status_csv, [_now_str(), _run_id, sname, front_m, side_m, battery_low, dt_in_state_s])
+    _csv_write(_cfg.status_csv, [_now_str(), _run_id, sname, front_m, side_m, battery_low, dt_in_state_s] + _times(t_fw_s))
 
 def instrument_wall_following(wf: Any, reason_provider: Optional[Callable[[Any, Any], str]] = None) -> None:
     """Monkey-Patch der Methode 'state_transition' des FSM-Objekts 'wf', um Zustandswechsel automatisch zu loggen.
@@ -133,6 +266,9 @@ def instrument_wall_following(wf: Any, reason_provider: Optional[Callable[[Any,
     if not hasattr(wf, "state_transition") or not hasattr(wf, "state"):
         return  # keine Instrumentierung möglich
 
+    if hasattr(wf, "metrics"):
+        register_metrics("wall_following", wf.metrics.snapshot)
+
     original = wf.state_transition
 
     def wrapped(new_state: Any, *args, **kwargs):
@@ -144,7 +280,7 @@ def instrument_wall_following(wf: Any, reason_provider: Optional[Callable[[Any,
         except Exception:
             reason = ""
         try:
-            wf.state_change_time = time.time()
+            wf.state_change_time = timebase.now()
         except Exception:
             pass
         log_state_change(prev, new_state, reason=reason)
@@ -0,0 +1,115 @@
+# wf_metrics.py
+# Laufende Kennzahlen der WallFollowing-FSM, O(1) je Zustandswechsel:
+#  * Verweildauer je Zustand (gesamt und je Besuch)
+#  * N x N Übergangsmatrix
+#  * Zeit von is_battery_low = True bis LANDING
+# Zeitbasis ist die Zeit der äußeren Schleife (WallFollowing.time_now), damit
+# Offline-Simulationen mit Simulationszeit dieselben Zahlen liefern.
+
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+
+
+class StateMetrics:
+    """Zähler für eine Enum-Zustandsmenge; snapshot() ist jederzeit lesbar."""
+
+    def __init__(self, states, landing_state=None):
+        self._states = list(states)
+        self._idx = {s: i for i, s in enumerate(self._states)}
+        n = len(self._states)
+        self.total_s: List[float] = [0.0] * n
+        self.visits: List[int] = [0] * n
+        self.max_visit_s: List[float] = [0.0] * n
+        self.last_visit_s: List[float] = [0.0] * n
+        self.transitions: List[List[int]] = [[0] * n for _ in range(n)]
+        self.landing_state = landing_state
+        self.current = None
+        self.entered_t: Optional[float] = None
+        self.t_last = 0.0
+        # Battery-Low -> LANDING
+        self.battery_low_t: Optional[float] = None
+        self.to_landing_count = 0
+        self.to_landing_sum_s = 0.0
+        self.to_landing_min_s = float("inf")
+        self.to_landing_max_s = 0.0
+        self.to_landing_last_s: Optional[float] = None
+
+    def start(self, state, t: float) -> None:
+        """Ersten Zustand mit der ersten Tick-Zeit setzen (vorher gibt es keine gültige Zeit)."""
+        self.current = state
+        self.entered_t = t
+        self.t_last = t
+        self.visits[self._idx[state]] += 1
+
+    def tick(self, state, t: float) -> None:
+        """Je FSM-Tick: Zeit fortschreiben (für snapshot() ohne Zeitangabe)."""
+        if self.current is None:
+            self.start(state, t)
+        self.t_last = t
+
+    def transition(self, prev, new, t: float) -> None:
+        if self.current is None or prev is None:
+            self.start(new, t)
+            return
+        i, j = self._idx[prev], self._idx[new]
+        dwell = max(0.0, t - self.entered_t)
+        self.total_s[i] += dwell
+        self.last_visit_s[i] = dwell
+        if dwell > self.max_visit_s[i]:
+            self.max_visit_s[i] = dwell
+        self.transitions[i][j] += 1
+        self.visits[j] += 1
+        self.current = new
+        self.entered_t = t
+        self.t_last = t
+        if new == self.landing_state and self.battery_low_t is not None:
+            d = max(0.0, t - self.battery_low_t)
+            self.to_landing_count += 1
+            self.to_landing_sum_s += d
+            self.to_landing_min_s = min(self.to_landing_min_s, d)
+            self.to_landing_max_s = max(self.to_landing_max_s, d)
+            self.to_landing_last_s = d
+            self.battery_low_t = None
+
+    def battery_low(self, low: bool, t: float) -> None:
+        """Flanke von is_battery_low; nur die erste steigende Flanke je Episode zählt."""
+        if low and self.battery_low_t is None:
+            self.battery_low_t = t
+        elif not low:
+            self.battery_low_t = None
+
+    def snapshot(self, t: Optional[float] = None) -> Dict[str, Any]:
+        """Kopie aller Zähler; der laufende Besuch geht bis t (Default: letzter Tick) mit ein."""
+        t = self.t_last if t is None else t
+        in_state = max(0.0, t - self.entered_t) if self.entered_t is not None else 0.0
+        states = {}
+        for i, s in enumerate(self._states):
+            total = self.total_s[i] + (in_state if s == self.current else 0.0)
+            if not self.visits[i]:
+                continue
+            states[s.name] = {
+                "total_s": round(total, 3),
+                "visits": self.visits[i],
+                "mean_visit_s": round(total / self.visits[i], 3),
+                "max_visit_s": round(max(self.max_visit_s[i], in_state if s == self.current else 0.0), 3),
+                "last_visit_s": round(self.last_visit_s[i], 3),
+            }
+        n = self.to_landing_count
+        return {
+            "t": t,
+            "state": getattr(self.current, "name", None),
+            "in_state_s": round(in_state, 3),
+            "states": states,
+            "transitions": {
+                "states": [s.name for s in self._states],
+                "matrix": [row[:] for row in self.transitions],
+            },
+            "battery_low_to_landing": {
+                "count": n,
+                "last_s": round(self.to_landing_last_s, 3) if n else None,
+                "mean_s": round(self.to_landing_sum_s / n, 3) if n else None,
+                "min_s": round(self.to_landing_min_s, 3) if n else None,
+                "max_s": round(self.to_landing_max_s, 3) if n else None,
+                "pending_s": round(t - self.battery_low_t, 3) if self.battery_low_t is not None else None,
+            },
+        }
@@ -0,0 +1,283 @@
+# wf_trace.py
+# Optionales Span-Tracing für die Regelschleife (Opt-in per ENV, wie WF_LOG_LEVEL).
+#   WF_TRACE=1                -> Trace nach wall_following_trace.json
+#   WF_TRACE=<pfad.json>      -> Trace nach <pfad.json>
+#   WF_TRACE_EVENTS=<n>       -> Puffergröße (Events, Default 200000)
+# Export als Chrome-Trace-Event-JSON (chrome://tracing, https://ui.perfetto.dev).
+# Deaktiviert: span() liefert einen geteilten No-op-Kontext, begin()/end() kehren sofort zurück,
+# Wrapper werden gar nicht erst installiert.
+
+from __future__ import annotations
+from array import array
+from typing import Any, Callable, Dict, Iterable, Optional
+import atexit
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+
+DEFAULT_TRACE_FILE = "wall_following_trace.json"
+DEFAULT_CAPACITY = 200_000
+
+_clock_ns = time.monotonic_ns      # gleiche Uhr wie timebase.now()
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Tracer:
+    """
+    Ringfreier Event-Puffer fester Größe (parallele Arrays, beim Start allokiert).
+    Jeder Span wird beim Verlassen als Complete-Event ("X") in einen eigenen Slot
+    geschrieben; die Slot-Vergabe über itertools.count ist unter dem GIL atomar,
+    daher ohne Lock aus Regelschleife und cflib-Callback-Threads nutzbar.
+    Ist der Puffer voll, werden weitere Events nur noch gezählt (dropped).
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._ts = array("q", bytes(8 * capacity))      # Start (ns)
+        self._dur = array("q", bytes(8 * capacity))     # Dauer (ns), -1 = Instant-Event
+        self._name = array("i", [-1]) * capacity        # Index in _names, -1 = Slot leer
+        self._tid = array("q", bytes(8 * capacity))
+        self._args: list = [None] * capacity
+        self._names: list = []
+        self._name_idx: Dict[str, int] = {}
+        self._name_lock = threading.Lock()              # nur beim ersten Auftreten eines Namens
+        self._threads: Dict[int, str] = {}
+        self._next = itertools.count()
+        self.t0_ns = _clock_ns()
+        self.dropped = 0
+
+    def _intern(self, name: str) -> int:
+        i = self._name_idx.get(name)
+        if i is None:
+            with self._name_lock:
+                i = self._name_idx.get(name)
+                if i is None:
+                    self._names.append(name)
+                    i = self._name_idx[name] = len(self._names) - 1
+        return i
+
+    def record(self, name: str, start_ns: int, dur_ns: int, args: Optional[dict] = None) -> None:
+        i = next(self._next)
+        if i >= self.capacity:
+            self.dropped += 1
+            return
+        tid = threading.get_ident()
+        if tid not in self._threads:
+            self._threads[tid] = threading.current_thread().name
+        self._ts[i] = start_ns
+        self._dur[i] = dur_ns
+        self._name[i] = self._intern(name)
+        self._tid[i] = tid
+        if args:
+            self._args[i] = args
+
+    def events(self) -> list:
+        """Trace-Events im Chrome-Format (ts/dur in µs relativ zum Tracer-Start)."""
+        pid = os.getpid()
+        out = [{"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": tname}}
+               for tid, tname in list(self._threads.items())]
+        for i in range(self.capacity):
+            if self._name[i] < 0:
+                continue
+            ev = {"name": self._names[self._name[i]], "cat": "wf", "pid": pid, "tid": self._tid[i],
+                  "ts": (self._ts[i] - self.t0_ns) / 1000.0}
+            if self._dur[i] < 0:
+                ev["ph"] = "i"
+                ev["s"] = "t"
+            else:
+                ev["ph"] = "X"
+                ev["dur"] = self._dur[i] / 1000.0
+            if self._args[i] is not None:
+                ev["args"] = self._args[i]
+            out.append(ev)
+        return out
+
+    def export(self, path: str) -> str:
+        events = self.events()
+        data = {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"capacity": self.capacity, "recorded": len(events) - len(self._threads),
+                          "dropped": self.dropped},
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        return path
+
+
+class _Span:
+    __slots__ = ("_tracer", "_name", "_args", "_t0")
+
+    def __init__(self, tracer: Tracer, name: str, args: Optional[dict]):
+        self._tracer = tracer
+        self._name = name
+        self._args = args
+
+    def __enter__(self):
+        self._t0 = _clock_ns()
+        return self
+
+    def __exit__(self, *exc):
+        t1 = _clock_ns()
+        self._tracer.record(self._name, self._t0, t1 - self._t0, self._args)
+        return False
+
+
+# ---------- Globaler Zustand (per ENV) ----------
+
+_tracer: Optional[Tracer] = None
+_trace_file: Optional[str] = None
+_open = threading.local()          # begin()/end(): offene Spans je Thread, Name -> (t0, args)
+
+
+def enable(path: Optional[str] = None, capacity: int = DEFAULT_CAPACITY) -> Tracer:
+    """Tracing einschalten (auch ohne ENV, z.B. aus Tests/Benchmarks); Export beim Prozessende."""
+    global _tracer, _trace_file
+    if _tracer is None:
+        _tracer = Tracer(capacity)
+        atexit.register(export)
+    _trace_file = path or _trace_file or DEFAULT_TRACE_FILE
+    return _tracer
+
+
+def _enable_from_env() -> None:
+    env = os.getenv("WF_TRACE", "").strip()
+    if not env or env.lower() in ("0", "false", "off", "no"):
+        return
+    path = DEFAULT_TRACE_FILE if env.lower() in ("1", "true", "on", "yes") else env
+    enable(path, int(os.getenv("WF_TRACE_EVENTS", DEFAULT_CAPACITY)))
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def span(name: str, **args: Any):
+    """Kontextmanager für einen (verschachtelbaren) Span; args landen im Trace-Event."""
+    if _tracer is None:
+        return _NO_SPAN
+    return _Span(_tracer, name, args or None)
+
+
+def begin(name: str, **args: Any) -> None:
+    """
+    Span ohne Einrücken öffnen, z.B. "tick" am Anfang des Schleifenrumpfs. Ein noch offener
+    gleichnamiger Span desselben Threads wird dabei geschlossen; so endet der Tick auch
+    auf Pfaden mit 'continue' erst beim nächsten Schleifendurchlauf.
+    """
+    if _tracer is None:
+        return
+    spans = getattr(_open, "spans", None)
+    if spans is None:
+        spans = _open.spans = {}
+    t0 = _clock_ns()
+    prev = spans.pop(name, None)
+    if prev is not None:
+        _tracer.record(name, prev[0], t0 - prev[0], prev[1])
+    spans[name] = (t0, args or None)
+
+
+def end(name: str) -> None:
+    """Mit begin() geöffneten Span schließen; ohne offenen Span wirkungslos."""
+    if _tracer is None:
+        return
+    prev = getattr(_open, "spans", {}).pop(name, None)
+    if prev is not None:
+        _tracer.record(name, prev[0], _clock_ns() - prev[0], prev[1])
+
+
+def instant(name: str, **args: Any) -> None:
+    """Zeitpunkt-Event (z.B. Paketempfang im cflib-Thread)."""
+    if _tracer is not None:
+        _tracer.record(name, _clock_ns(), -1, args or None)
+
+
+def traced(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Decorator; ohne aktives Tracing wird die Funktion unverändert zurückgegeben."""
+    def deco(fn: Callable) -> Callable:
+        if _tracer is None:
+            return fn
+        label = name or getattr(fn, "__qualname__", repr(fn))
+        tracer = _tracer
+
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            t0 = _clock_ns()
+            try:
+                return fn(*a, **kw)
+            finally:
+                tracer.record(label, t0, _clock_ns() - t0)
+        wrapper.__wf_traced__ = True
+        return wrapper
+    return deco
+
+
+def export(path: Optional[str] = None) -> Optional[str]:
+    """Trace schreiben; liefert den Pfad oder None, wenn Tracing aus ist."""
+    if _tracer is None:
+        return None
+    return _tracer.export(path or _trace_file or DEFAULT_TRACE_FILE)
+
+
+# ---------- Wrapper für WallFollowing und wf_logging ----------
+
+def trace_wall_following(wf: Any, methods: Optional[Iterable[str]] = None) -> None:
+    """
+    Öffentliche Methoden der FSM-Instanz 'wf' (Default: alle) als Spans erfassen.
+    Nach instrument_wall_following() aufrufen, damit das State-Logging im Span liegt.
+    """
+    if _tracer is None:
+        return
+    cls = type(wf)
+    if methods is None:
+        methods = [n for n, v in vars(cls).items() if callable(v) and not n.startswith("_")
+                   and not isinstance(v, type)]
+    for n in methods:
+        fn = getattr(wf, n, None)
+        if fn is None or getattr(fn, "__wf_traced__", False):
+            continue
+        setattr(wf, n, traced(f"{cls.__name__}.{n}")(fn))
+
+
+WF_LOGGING_CALLS = ("log_state_change", "log_event", "log_status", "start_new_session")
+
+
+def trace_wf_logging(*namespaces: Dict[str, Any]) -> None:
+    """
+    wf_logging-Funktionen im Modul ersetzen und zusätzlich in den übergebenen
+    Namensräumen (globals() bzw. vars(modul)), die sie per 'from wf_logging import' kennen.
+    """
+    if _tracer is None:
+        return
+    import wf_logging
+    for n in WF_LOGGING_CALLS:
+        orig = getattr(wf_logging, n)
+        if getattr(orig, "__wf_traced__", False):
+            continue
+        wrapped = traced(f"wf_logging.{n}")(orig)
+        setattr(wf_logging, n, wrapped)
+        for ns in namespaces:
+            if ns.get(n) is orig:
+                ns[n] = wrapped
+
+
+_enable_from_env()
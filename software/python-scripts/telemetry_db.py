@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lokale SQLite-Telemetriedatenbank für alle Projekt-Logs.
+
+Lädt folgende Dateitypen per Bulk-Ingest (executemany, eine Transaktion pro Datei):
+ * cf_powerlog_*.csv            (Rotor_as_fan.py)
+ * wall_following_events.csv    (wf_logging)
+ * wall_following_status.csv    (wf_logging)
+ * manuelles Temperaturraster   (time_s, x_mm, y_mm, temperature_c)
+
+Bereits geladene Dateien werden über ihren SHA-256 erkannt und übersprungen.
+Hat sich eine bekannte Datei geändert (z. B. weiter angehängte wf_logging-CSV),
+werden ihre Zeilen ersetzt.
+
+run_id: relativer Pfad unterhalb des angegebenen Verzeichnisses ohne "cf_powerlog_"
+und Endung (sensor-logs/cf_powerlog_gr_07p.csv -> gr_07p, 2024-05/cf_powerlog_gr_07p.csv
+-> 2024-05/gr_07p). Liefert eine andere Datei schon denselben run_id, wird ein Hash
+ihres Pfads angehängt (gr_07p@1a2b3c4d); "runs" zeigt die vergebenen IDs.
+
+Beispiele:
+    python telemetry_db.py ingest ../../experiments/sensor-logs logs/
+    python telemetry_db.py runs
+    python telemetry_db.py time-in-state
+    python telemetry_db.py charge-curve --run gr_07p --bucket 30
+"""
+
+import argparse
+import csv
+import hashlib
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+# ------------------------------------------------------------
+# Konfiguration
+# ------------------------------------------------------------
+DB_PATH = Path("telemetry.sqlite")
+BATCH_SIZE = 5000          # Zeilen pro executemany-Aufruf
+
+KIND_POWER = "power"
+KIND_WF_EVENTS = "wf_events"
+KIND_WF_STATUS = "wf_status"
+KIND_TEMP_GRID = "temp_grid"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_id     INTEGER PRIMARY KEY,
+    path        TEXT NOT NULL UNIQUE,
+    sha256      TEXT NOT NULL,
+    kind        TEXT NOT NULL,
+    rows        INTEGER NOT NULL,
+    ingested_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_sha ON files(sha256);
+
+CREATE TABLE IF NOT EXISTS power_samples (
+    file_id     INTEGER NOT NULL REFERENCES files(file_id) ON DELETE CASCADE,
+    run_id      TEXT NOT NULL,
+    t_s         REAL NOT NULL,
+    temp_c      REAL,
+    battery_pct REAL,
+    charge_ma   REAL,
+    state       INTEGER,
+    vbat_v      REAL
+);
+CREATE INDEX IF NOT EXISTS idx_power_run_t ON power_samples(run_id, t_s);
+CREATE INDEX IF NOT EXISTS idx_power_state ON power_samples(state, run_id);
+CREATE INDEX IF NOT EXISTS idx_power_file ON power_samples(file_id);
+
+CREATE TABLE IF NOT EXISTS wf_events (
+    file_id     INTEGER NOT NULL REFERENCES files(file_id) ON DELETE CASCADE,
+    run_id      TEXT NOT NULL,
+    ts          TEXT,
+    t_s         REAL,
+    type        TEXT,
+    prev_state  TEXT,
+    new_state   TEXT,
+    reason      TEXT,
+    details     TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_wfe_run_t ON wf_events(run_id, t_s);
+CREATE INDEX IF NOT EXISTS idx_wfe_state ON wf_events(new_state, run_id);
+CREATE INDEX IF NOT EXISTS idx_wfe_file ON wf_events(file_id);
+
+CREATE TABLE IF NOT EXISTS wf_status (
+    file_id       INTEGER NOT NULL REFERENCES files(file_id) ON DELETE CASCADE,
+    run_id        TEXT NOT NULL,
+    ts            TEXT,
+    t_s           REAL,
+    state         TEXT,
+    front_m       REAL,
+    side_m        REAL,
+    battery_low   INTEGER,
+    dt_in_state_s REAL
+);
+CREATE INDEX IF NOT EXISTS idx_wfs_run_t ON wf_status(run_id, t_s);
+CREATE INDEX IF NOT EXISTS idx_wfs_state ON wf_status(state, run_id);
+CREATE INDEX IF NOT EXISTS idx_wfs_file ON wf_status(file_id);
+
+CREATE TABLE IF NOT EXISTS temp_grid (
+    file_id       INTEGER NOT NULL REFERENCES files(file_id) ON DELETE CASCADE,
+    run_id        TEXT NOT NULL,
+    t_s           REAL NOT NULL,
+    x_mm          REAL,
+    y_mm          REAL,
+    temperature_c REAL
+);
+CREATE INDEX IF NOT EXISTS idx_grid_run_t ON temp_grid(run_id, t_s);
+CREATE INDEX IF NOT EXISTS idx_grid_file ON temp_grid(file_id);
+"""
+
+# ------------------------------------------------------------
+# Canned Queries
+# ------------------------------------------------------------
+# Verweildauer je Zustand: Dauer einer Stichprobe = Abstand zur nächsten
+# Stichprobe desselben Runs (LEAD über den (run_id, t_s)-Index).
+Q_TIME_IN_STATE_POWER = """
+SELECT run_id, state, ROUND(SUM(dt), 3) AS seconds, COUNT(*) AS samples
+FROM (
+    SELECT run_id, state,
+           LEAD(t_s) OVER (PARTITION BY run_id ORDER BY t_s) - t_s AS dt
+    FROM power_samples
+    WHERE (:run IS NULL OR run_id = :run)
+)
+WHERE dt IS NOT NULL
+GROUP BY run_id, state
+ORDER BY run_id, state
+"""
+
+Q_TIME_IN_STATE_WF = """
+SELECT run_id, state, ROUND(SUM(dt), 3) AS seconds, COUNT(*) AS samples
+FROM (
+    SELECT run_id, state,
+           LEAD(t_s) OVER (PARTITION BY run_id ORDER BY t_s) - t_s AS dt
+    FROM wf_status
+    WHERE (:run IS NULL OR run_id = :run)
+)
+WHERE dt IS NOT NULL AND dt >= 0
+GROUP BY run_id, state
+ORDER BY run_id, seconds DESC
+"""
+
+# Ladekurve je Run, in Zeit-Buckets verdichtet
+Q_CHARGE_CURVE = """
+SELECT run_id,
+       CAST(t_s / :bucket AS INTEGER) * :bucket AS t_bucket_s,
+       ROUND(AVG(vbat_v), 4)    AS vbat_v,
+       ROUND(AVG(charge_ma), 4) AS charge_ma,
+       ROUND(MAX(temp_c), 3)    AS temp_max_c,
+       MAX(state)               AS state
+FROM power_samples
+WHERE (:run IS NULL OR run_id = :run)
+GROUP BY run_id, t_bucket_s
+ORDER BY run_id, t_bucket_s
+"""
+
+Q_RUNS = """
+SELECT f.kind,
+       COALESCE((SELECT GROUP_CONCAT(DISTINCT run_id) FROM power_samples t WHERE t.file_id = f.file_id),
+                (SELECT GROUP_CONCAT(DISTINCT run_id) FROM temp_grid t WHERE t.file_id = f.file_id),
+                (SELECT GROUP_CONCAT(DISTINCT run_id) FROM wf_events t WHERE t.file_id = f.file_id),
+                (SELECT GROUP_CONCAT(DISTINCT run_id) FROM wf_status t WHERE t.file_id = f.file_id)) AS run_id,
+       f.path, f.rows, f.sha256
+FROM files f
+ORDER BY f.kind, f.path
+"""
+
+CANNED_QUERIES = {
+    "time-in-state": Q_TIME_IN_STATE_POWER,
+    "time-in-state-wf": Q_TIME_IN_STATE_WF,
+    "charge-curve": Q_CHARGE_CURVE,
+}
+
+
+# ------------------------------------------------------------
+# Hilfsfunktionen
+# ------------------------------------------------------------
+def _float(val):
+    try:
+        f = float(val)
+    except (TypeError, ValueError):
+        return None
+    return None if f != f else f  # NaN -> NULL
+
+def _int(val):
+    f = _float(val)
+    return int(f) if f is not None else None
+
+def _bool(val):
+    if val in (None, ""):
+        return None
+    return 1 if str(val).strip().lower() in ("1", "true", "yes") else 0
+
+def _hms_to_s(val):
+    """'HH:MM:SS' (wf_logging) -> Sekunden seit Mitternacht."""
+    try:
+        h, m, s = str(val).split(":")
+        return int(h) * 3600 + int(m) * 60 + float(s)
+    except (TypeError, ValueError):
+        return None
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def detect_kind(path: Path, header):
+    """Ordnet eine CSV anhand des Headers einem Log-Typ zu."""
+    cols = set(header)
+    if "pm.vbat_V" in cols and "t_host_s" in cols:
+        return KIND_POWER
+    if {"run_id", "type", "new_state"} <= cols:
+        return KIND_WF_EVENTS
+    if {"run_id", "state", "front_m", "side_m"} <= cols:
+        return KIND_WF_STATUS
+    if {"time_s", "x_mm", "y_mm", "temperature_c"} <= cols:
+        return KIND_TEMP_GRID
+    return None
+
+def run_id_from_path(path: Path, root=None) -> str:
+    """
+    cf_powerlog_<RUN_ID>.csv -> <RUN_ID>, sonst Dateiname ohne Endung.
+    Mit root (Ingest-Verzeichnis) wird der relative Ordner vorangestellt: sub/<RUN_ID>.
+    """
+    path = Path(path)
+    stem = path.stem
+    prefix = "cf_powerlog_"
+    run_id = stem[len(prefix):] if stem.startswith(prefix) else stem
+    if root is not None:
+        try:
+            parent = path.resolve().parent.relative_to(Path(root).resolve())
+        except ValueError:
+            parent = Path()
+        if parent.parts:
+            run_id = f"{parent.as_posix()}/{run_id}"
+    return run_id
+
+def _unique_run_id(con: sqlite3.Connection, table: str, run_id: str, key: str) -> str:
+    """Gleicher run_id aus einer anderen Datei (gleicher Name, anderer Ordner): Pfad-Hash anhängen."""
+    clash = con.execute(
+        f"SELECT 1 FROM {table} t JOIN files f ON f.file_id = t.file_id "
+        "WHERE t.run_id = ? AND f.path != ? LIMIT 1", (run_id, key)).fetchone()
+    if clash is None:
+        return run_id
+    return f"{run_id}@{hashlib.sha256(key.encode('utf-8')).hexdigest()[:8]}"
+
+
+# ------------------------------------------------------------
+# Zeilen-Konverter je Log-Typ
+# ------------------------------------------------------------
+def _rows_power(reader, file_id, run_id):
+    for r in reader:
+        # Firmware-Zeit auf Host-Achse (timebase), ältere Logs nur t_host_s
+        t = _float(r.get("t_fw_aligned_s"))
+        if t is None:
+            t = _float(r.get("t_host_s"))
+        if t is None:
+            continue
+        yield (file_id, run_id, t,
+               _float(r.get("baro.temp_C")),
+               _float(r.get("pm.batteryLevel_pct")),
+               _float(r.get("pm.chargeCurrent_mA")),
+               _int(r.get("pm.state")),
+               _float(r.get("pm.vbat_V")))
+
+def _row_t(r):
+    """Monotone Session-Zeit t_host_s, sonst ts (HH:MM:SS) aus älteren Logs."""
+    t = _float(r.get("t_host_s"))
+    return t if t is not None else _hms_to_s(r.get("ts"))
+
+def _rows_wf_events(reader, file_id, run_id):
+    for r in reader:
+        ts = r.get("ts")
+        yield (file_id, r.get("run_id") or run_id, ts, _row_t(r),
+               r.get("type"), r.get("prev_state"), r.get("new_state"),
+               r.get("reason"), r.get("details"))
+
+def _rows_wf_status(reader, file_id, run_id):
+    for r in reader:
+        ts = r.get("ts")
+        yield (file_id, r.get("run_id") or run_id, ts, _row_t(r),
+               r.get("state"), _float(r.get("front_m")), _float(r.get("side_m")),
+               _bool(r.get("battery_low")), _float(r.get("dt_in_state_s")))
+
+def _rows_temp_grid(reader, file_id, run_id):
+    for r in reader:
+        t = _float(r.get("time_s"))
+        if t is None:
+            continue
+        yield (file_id, run_id, t, _float(r.get("x_mm")), _float(r.get("y_mm")),
+               _float(r.get("temperature_c")))
+
+_INGESTERS = {
+    KIND_POWER: ("power_samples", "INSERT INTO power_samples VALUES (?,?,?,?,?,?,?,?)", _rows_power),
+    KIND_WF_EVENTS: ("wf_events", "INSERT INTO wf_events VALUES (?,?,?,?,?,?,?,?,?)", _rows_wf_events),
+    KIND_WF_STATUS: ("wf_status", "INSERT INTO wf_status VALUES (?,?,?,?,?,?,?,?,?)", _rows_wf_status),
+    KIND_TEMP_GRID: ("temp_grid", "INSERT INTO temp_grid VALUES (?,?,?,?,?,?)", _rows_temp_grid),
+}
+
+
+# ------------------------------------------------------------
+# Öffentliche API
+# ------------------------------------------------------------
+def connect(db_path=DB_PATH) -> sqlite3.Connection:
+    """Öffnet (bzw. erzeugt) die Datenbank und legt das Schema an."""
+    con = sqlite3.connect(str(db_path))
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    con.execute("PRAGMA foreign_keys=ON")
+    con.executescript(SCHEMA)
+    return con
+
+def ingest_file(con: sqlite3.Connection, path: Path, root=None) -> str:
+    """
+    Lädt eine einzelne CSV inkrementell; root: Ingest-Verzeichnis für den run_id.
+    Rückgabe: 'loaded', 'replaced', 'skipped' oder 'unknown'.
+    """
+    path = Path(path)
+    digest = file_sha256(path)
+    if con.execute("SELECT 1 FROM files WHERE sha256 = ?", (digest,)).fetchone():
+        return "skipped"
+
+    with path.open("r", newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        kind = detect_kind(path, reader.fieldnames or [])
+        if kind is None:
+            return "unknown"
+        table, sql, rows_fn = _INGESTERS[kind]
+        key = str(path.resolve())
+
+        with con:  # eine Transaktion je Datei
+            old = con.execute("SELECT file_id FROM files WHERE path = ?", (key,)).fetchone()
+            if old:
+                # Geänderte Datei: alte Zeilen fallen per ON DELETE CASCADE weg
+                con.execute("DELETE FROM files WHERE file_id = ?", (old[0],))
+            cur = con.execute(
+                "INSERT INTO files(path, sha256, kind, rows, ingested_at) VALUES (?,?,?,0,?)",
+                (key, digest, kind, time.time()))
+            file_id = cur.lastrowid
+            run_id = _unique_run_id(con, table, run_id_from_path(path, root), key)
+
+            n = 0
+            batch = []
+            for row in rows_fn(reader, file_id, run_id):
+                batch.append(row)
+                if len(batch) >= BATCH_SIZE:
+                    con.executemany(sql, batch)
+                    n += len(batch)
+                    batch.clear()
+            if batch:
+                con.executemany(sql, batch)
+                n += len(batch)
+            con.execute("UPDATE files SET rows = ? WHERE file_id = ?", (n, file_id))
+    return "replaced" if old else "loaded"
+
+def ingest_paths(con: sqlite3.Connection, paths) -> dict:
+    """Lädt Dateien und Verzeichnisse (rekursiv *.csv). Liefert Zähler je Ergebnis."""
+    stats = {"loaded": 0, "replaced": 0, "skipped": 0, "unknown": 0}
+    for p in paths:
+        p = Path(p)
+        files = sorted(p.rglob("*.csv")) if p.is_dir() else [p]
+        root = p if p.is_dir() else None
+        for fp in files:
+            result = ingest_file(con, fp, root)
+            stats[result] += 1
+            print(f"[INGEST] {result:8s} {fp}")
+    return stats
+
+def query(con: sqlite3.Connection, name: str, run=None, bucket: float = 10.0):
+    """Führt eine Canned Query aus und liefert (Spalten, Zeilen)."""
+    cur = con.execute(CANNED_QUERIES[name], {"run": run, "bucket": float(bucket)})
+    return [d[0] for d in cur.description], cur.fetchall()
+
+
+# ------------------------------------------------------------
+# Kommandozeile
+# ------------------------------------------------------------
+def _print_table(cols, rows):
+    writer = csv.writer(sys.stdout)
+    writer.writerow(cols)
+    writer.writerows(rows)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="SQLite-Telemetriedatenbank für Qi-Deck-Logs")
+    ap.add_argument("--db", default=str(DB_PATH), help="Pfad zur SQLite-Datei")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p_ing = sub.add_parser("ingest", help="CSV-Dateien/Verzeichnisse laden")
+    p_ing.add_argument("paths", nargs="+")
+
+    sub.add_parser("runs", help="geladene Dateien auflisten")
+
+    for name in CANNED_QUERIES:
+        p_q = sub.add_parser(name)
+        p_q.add_argument("--run", default=None, help="nur diesen run_id auswerten")
+        p_q.add_argument("--bucket", type=float, default=10.0, help="Bucket-Breite in s (charge-curve)")
+
+    args = ap.parse_args(argv)
+    con = connect(args.db)
+    try:
+        if args.cmd == "ingest":
+            t_start = time.perf_counter()
+            stats = ingest_paths(con, args.paths)
+            print(f"[INFO] {stats} in {time.perf_counter() - t_start:.2f} s")
+        elif args.cmd == "runs":
+            cur = con.execute(Q_RUNS)
+            _print_table([d[0] for d in cur.description], cur.fetchall())
+        else:
+            t_start = time.perf_counter()
+            cols, rows = query(con, args.cmd, run=args.run, bucket=args.bucket)
+            _print_table(cols, rows)
+            print(f"[INFO] {len(rows)} Zeilen in {(time.perf_counter() - t_start) * 1e3:.1f} ms")
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+# Die Skripte liegen flach im Elternverzeichnis (kein Paket): für die Tests importierbar machen.
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,79 @@
+# test_cf_link_emulator.py
+# Smoke-Test: Emulator im Prozess starten und den echten cflib-Stack per udp:// dagegen fahren
+# (Verbindung inkl. TOC, ein Log-Block, ein Param-Roundtrip, Rotor_as_fan im Sweep-Modus).
+# Läuft in wenigen Sekunden, ohne Crazyradio und Drohne.
+
+import csv
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("cflib")
+
+import cflib.crtp
+from cflib.crazyflie import Crazyflie
+from cflib.crazyflie.log import LogConfig
+from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
+from cflib.crazyflie.syncLogger import SyncLogger
+
+from cf_link_emulator import CrazyflieEmulator
+
+SCRIPTS = Path(__file__).resolve().parents[1]
+TOC_CACHE = SCRIPTS / "qi_charging_deck_demo" / "cache" / "FCFF06F2.json"
+
+
+@pytest.fixture
+def emu():
+    cflib.crtp.init_drivers()
+    # neben dem Pad: der custom_qi-Task bleibt IDLE und schreibt keine Motor-PWM dazwischen
+    with CrazyflieEmulator(port=0, toc_path=str(TOC_CACHE), on_pad=False) as e:
+        yield e
+
+
+def test_connect_log_block_and_param_roundtrip(emu, tmp_path):
+    with SyncCrazyflie(emu.uri, cf=Crazyflie(rw_cache=str(tmp_path))) as scf:
+        lg = LogConfig(name="Smoke", period_in_ms=50)
+        lg.add_variable("pm.vbat", "float")
+        lg.add_variable("pm.state", "int8_t")
+        lg.add_variable("custom_qi.state", "uint8_t")
+        with SyncLogger(scf, lg) as logger:
+            ts, data, _ = logger.next()
+        assert set(data) == {"pm.vbat", "pm.state", "custom_qi.state"}
+        assert 3.0 < data["pm.vbat"] < 4.3
+
+        # Param schreiben, Bestätigung der "Firmware" abwarten
+        updated = threading.Event()
+        values = []
+        assert scf.cf.param.get_value("pm.lowVoltage") is not None   # Param-Werte vollständig geladen
+        scf.cf.param.add_update_callback(group="pm", name="lowVoltage",
+                                         cb=lambda name, value: (values.append(value), updated.set()))
+        scf.cf.param.set_value("pm.lowVoltage", 3.3)
+        assert updated.wait(5.0)
+        assert float(values[-1]) == pytest.approx(3.3, abs=1e-6)
+        assert emu.params.get("pm.lowVoltage") == pytest.approx(3.3, abs=1e-6)
+    assert emu.stats["log_packets"] > 0
+    assert emu.stats["param_writes"] == 1
+
+
+def test_rotor_as_fan_sweep_against_emulator(emu, tmp_path):
+    r = subprocess.run(
+        [sys.executable, str(SCRIPTS / "Rotor_as_fan.py"), "--mode", "sweep",
+         "--schedule", "0.05:1,0.10:1", "--settle", "0"],
+        cwd=tmp_path, env={**os.environ, "CFLIB_URI": emu.uri},
+        capture_output=True, text=True, timeout=60)
+    assert r.returncode == 0, r.stdout[-2000:] + r.stderr[-2000:]
+    assert "Exception while doing callback" not in r.stderr
+
+    logs = list((tmp_path / "logs").glob("cf_powerlog_*.csv"))
+    assert len(logs) == 1
+    with logs[0].open(newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) > 10
+    assert {row["pwm_mode"] for row in rows} == {"sweep"}
+    # safe_stop(): Motoren aus, Direkt-PWM wieder abgeschaltet
+    assert emu.params.get("motorPowerSet.enable") == 0
+    assert all(emu.params.get(f"motorPowerSet.m{i}") == 0 for i in range(1, 5))
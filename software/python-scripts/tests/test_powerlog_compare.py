@@ -0,0 +1,30 @@
+# test_powerlog_compare.py
+# Batch-Vergleich: Nicht-Power-Logs und leere Logs werden mit Warnung übersprungen statt abzubrechen.
+
+import json
+
+import powerlog_compare
+
+HEADER = "t_host_s,baro.temp_C,pm.batteryLevel_pct,pm.chargeCurrent_mA,pm.state,pm.vbat_V\n"
+
+
+def write_powerlog(path, v0):
+    rows = [f"{0.2 * k:.1f},30.0,10,0.7,1,{v0 + 0.001 * k:.3f}\n" for k in range(100)]
+    path.write_text(HEADER + "".join(rows), encoding="utf-8")
+
+
+def test_non_power_logs_are_skipped(tmp_path, capsys):
+    write_powerlog(tmp_path / "cf_powerlog_a.csv", 3.60)
+    write_powerlog(tmp_path / "cf_powerlog_b.csv", 3.65)
+    (tmp_path / "cf_powerlog_grid.csv").write_text("time_s,x_mm,y_mm,temperature_c\n0,0,0,25\n", encoding="utf-8")
+    (tmp_path / "cf_powerlog_empty.csv").write_text(HEADER, encoding="utf-8")
+    out = tmp_path / "report.json"
+    assert powerlog_compare.main([str(tmp_path), "--jobs", "1", "--out", str(out)]) == 0
+    warn = capsys.readouterr().out
+    assert "cf_powerlog_grid.csv" in warn and "cf_powerlog_empty.csv" in warn
+    assert [r["run_id"] for r in json.loads(out.read_text(encoding="utf-8"))["runs"]] == ["a", "b"]
+
+
+def test_only_non_power_logs_is_an_error(tmp_path):
+    (tmp_path / "cf_powerlog_x.csv").write_text("foo,bar\n1,2\n", encoding="utf-8")
+    assert powerlog_compare.main([str(tmp_path), "--jobs", "1"]) == 1
@@ -0,0 +1,48 @@
+# test_telemetry_db.py
+# run_id je Datei: relativer Ordner unter dem Ingest-Verzeichnis, gleichnamige Logs kollidieren nicht.
+
+import telemetry_db
+from telemetry_db import run_id_from_path
+
+HEADER = "t_host_s,baro.temp_C,pm.batteryLevel_pct,pm.chargeCurrent_mA,pm.state,pm.vbat_V\n"
+
+
+def write_powerlog(path, v0, n=10):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rows = [f"{0.2 * k:.1f},30.0,10,0.7,1,{v0 + 0.001 * k:.3f}\n" for k in range(n)]
+    path.write_text(HEADER + "".join(rows), encoding="utf-8")
+
+
+def run_ids(con):
+    return dict(con.execute("SELECT run_id, COUNT(*) FROM power_samples GROUP BY run_id").fetchall())
+
+
+def test_run_id_from_path(tmp_path):
+    assert run_id_from_path(tmp_path / "cf_powerlog_gr_07p.csv") == "gr_07p"
+    assert run_id_from_path(tmp_path / "grid.csv") == "grid"
+    assert run_id_from_path(tmp_path / "2024-05" / "cf_powerlog_gr_07p.csv", tmp_path) == "2024-05/gr_07p"
+    assert run_id_from_path(tmp_path / "cf_powerlog_gr_07p.csv", tmp_path / "other") == "gr_07p"
+
+
+def test_same_name_in_subdirectories_gets_relative_run_id(tmp_path):
+    write_powerlog(tmp_path / "logs" / "cf_powerlog_x.csv", 3.6)
+    write_powerlog(tmp_path / "logs" / "day2" / "cf_powerlog_x.csv", 3.7, n=5)
+    con = telemetry_db.connect(tmp_path / "t.sqlite")
+    telemetry_db.ingest_paths(con, [tmp_path / "logs"])
+    assert run_ids(con) == {"x": 10, "day2/x": 5}
+
+
+def test_same_name_as_separate_files_does_not_collide(tmp_path):
+    a, b = tmp_path / "a" / "cf_powerlog_x.csv", tmp_path / "b" / "cf_powerlog_x.csv"
+    write_powerlog(a, 3.6)
+    write_powerlog(b, 3.7, n=5)
+    con = telemetry_db.connect(tmp_path / "t.sqlite")
+    telemetry_db.ingest_paths(con, [a, b])
+    ids = run_ids(con)
+    assert ids.pop("x") == 10
+    (other, n), = ids.items()
+    assert other.startswith("x@") and n == 5
+    # geänderte Datei ersetzt ihre Zeilen und behält ihren run_id
+    write_powerlog(b, 3.7, n=7)
+    assert telemetry_db.ingest_file(con, b) == "replaced"
+    assert run_ids(con) == {"x": 10, other: 7}
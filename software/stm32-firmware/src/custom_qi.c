@@ -48,6 +48,7 @@ static volatile uint16_t cfgHoldPct  = 5;      // %
 static volatile uint16_t cfgKickMs   = 200;    // ms
 static volatile uint8_t  cfgEnable   = 1;      // 1=aktiv
 static volatile uint8_t  cfgForceRun = 0;      // 1=erzwinge Rotorlauf (Test)
+static volatile uint16_t cfgSupervisorMs = 250; // ms, Überwachungstakt ohne Ereignis
 
 /* pm.state-Wert, der "Charging" bedeutet
    0 Battery
@@ -63,12 +64,20 @@ static volatile uint8_t  cfgMockCharging = 0;     // 1: "laden"-Ersatz
 static volatile uint16_t cfgMockTtlMs    = 3000;  // Gültigkeit in ms
 static TickType_t        mockTouchedTick = 0;
 static int               prevMockCharging = -1;
+static TickType_t        mockRemaining   = portMAX_DELAY; // Ticks bis Mock-TTL abläuft
 
 // ---------------- Laufzeit-/Log-Status ----------------
-typedef enum { QI_IDLE=0, QI_RUNNING } QiState;
+typedef enum { QI_IDLE=0, QI_RUNNING, QI_KICK } QiState;
 static volatile uint8_t  lgState      = QI_IDLE;
 static volatile uint8_t  lgCharging   = 0;
 static volatile uint32_t lgPmStateRaw = 0;
+static volatile uint32_t lgWakeups    = 0;  // Task-Durchläufe
+static volatile uint32_t lgPwmWrites  = 0;  // paramSetInt auf motorPowerSet.m1..m4
+static volatile uint32_t lgOverrides  = 0;  // von außen überschriebene Halte-PWM
+
+static TaskHandle_t qiTaskHandle = NULL;
+static uint16_t     lastRaw      = 0;       // zuletzt geschriebene PWM
+static bool         lastRawValid = false;
 
 // -------------- IDs für motorPowerSet & pm.state --------------
 static paramVarId_t idMpEnable, idM1, idM2, idM3, idM4;
@@ -83,10 +92,34 @@ static inline void setMotorRawAll(uint16_t raw) {
   paramSetInt(idM2, (int32_t)raw);
   paramSetInt(idM3, (int32_t)raw);
   paramSetInt(idM4, (int32_t)raw);
+  lgPwmWrites += 4;
+  lastRaw = raw;
+  lastRawValid = true;
 }
 static inline void motorsStopAll(void) { setMotorRawAll(0); }
 
+// Halte-PWM nur schreiben, wenn sich der Sollwert ändert oder ein Motor
+// von außen überschrieben wurde (Rücklesen kostet keinen Param-Write)
+static void motorsApplyRaw(uint16_t raw) {
+  if (lastRawValid && raw == lastRaw) {
+    if (paramGetUint(idM1) == raw && paramGetUint(idM2) == raw &&
+        paramGetUint(idM3) == raw && paramGetUint(idM4) == raw) {
+      return;
+    }
+    lgOverrides++;
+  }
+  setMotorRawAll(raw);
+}
+
+// Param-Callback: Task sofort wecken statt auf den Überwachungstakt zu warten
+static void customQiWake(void) {
+  if (qiTaskHandle != NULL) {
+    xTaskNotifyGive(qiTaskHandle);
+  }
+}
+
 static bool detectCharging(void) {
+  mockRemaining = portMAX_DELAY;
   // --- Mock mit TTL vorschalten ---
   if (cfgMockEnable) {
     if ((int)cfgMockCharging != prevMockCharging) {
@@ -96,6 +129,7 @@ static bool detectCharging(void) {
     const TickType_t now = xTaskGetTickCount();
     const TickType_t ttl = M2T(cfgMockTtlMs);
     if (ttl > 0 && (now - mockTouchedTick) < ttl) {
+      mockRemaining = ttl - (now - mockTouchedTick);   // Task zum TTL-Ablauf wecken
       lgCharging = cfgMockCharging ? 1 : 0;
       return cfgMockCharging != 0;
     }
@@ -122,35 +156,54 @@ static bool detectCharging(void) {
 }
 
 // ---------------- Param/Log-Gruppen ----------------
+// Schreibzugriffe auf die Steuer-Params wecken die Task sofort
 PARAM_GROUP_START(custom_qi)
-PARAM_ADD(PARAM_UINT8,  enable,          &cfgEnable)
-PARAM_ADD(PARAM_UINT8,  forceRun,        &cfgForceRun)
+PARAM_ADD_WITH_CALLBACK(PARAM_UINT8,  enable,          &cfgEnable,        customQiWake)
+PARAM_ADD_WITH_CALLBACK(PARAM_UINT8,  forceRun,        &cfgForceRun,      customQiWake)
 PARAM_ADD(PARAM_UINT16, kickPct,         &cfgKickPct)
-PARAM_ADD(PARAM_UINT16, holdPct,         &cfgHoldPct)
+PARAM_ADD_WITH_CALLBACK(PARAM_UINT16, holdPct,         &cfgHoldPct,       customQiWake)
 PARAM_ADD(PARAM_UINT16, kickMs,          &cfgKickMs)
-PARAM_ADD(PARAM_INT32,  pmChargingValue, &cfgPmChargingVal)
+PARAM_ADD_WITH_CALLBACK(PARAM_INT32,  pmChargingValue, &cfgPmChargingVal, customQiWake)
+PARAM_ADD(PARAM_UINT16, supervisorMs,    &cfgSupervisorMs)
 // Mock-Steuerung
-PARAM_ADD(PARAM_UINT8,  mockEnable,      &cfgMockEnable)
-PARAM_ADD(PARAM_UINT8,  mockCharging,    &cfgMockCharging)
-PARAM_ADD(PARAM_UINT16, mockTtlMs,       &cfgMockTtlMs)
+PARAM_ADD_WITH_CALLBACK(PARAM_UINT8,  mockEnable,      &cfgMockEnable,    customQiWake)
+PARAM_ADD_WITH_CALLBACK(PARAM_UINT8,  mockCharging,    &cfgMockCharging,  customQiWake)
+PARAM_ADD_WITH_CALLBACK(PARAM_UINT16, mockTtlMs,       &cfgMockTtlMs,     customQiWake)
 PARAM_GROUP_STOP(custom_qi)
 
 LOG_GROUP_START(custom_qi)
 LOG_ADD(LOG_UINT8,  state,     &lgState)
 LOG_ADD(LOG_UINT8,  charging,  &lgCharging)
 LOG_ADD(LOG_UINT32, pmState,   &lgPmStateRaw)
+LOG_ADD(LOG_UINT32, wakeups,   &lgWakeups)
+LOG_ADD(LOG_UINT32, pwmWrites, &lgPwmWrites)
+LOG_ADD(LOG_UINT32, overrides, &lgOverrides)
 LOG_GROUP_STOP(custom_qi)
 
 // --------------- Worker-Task ----------------------
+// Ereignisgesteuert: die Task schläft bis zu einer Param-Änderung (Notify),
+// dem Ende der Kick-Phase, dem Ablauf der Mock-TTL oder dem Überwachungstakt.
+// Der Ladezustand selbst liefert kein Ereignis und wird im Überwachungstakt geprüft.
 static void customQiTask(void *arg) {
   (void)arg;
   QiState st = QI_IDLE;
+  TickType_t kickEnd = 0;
   lgState = st;
 
   DEBUG_PRINT("[CUSTOM_QI] task started\n");
 
   for (;;) {
-    vTaskDelay(M2T(20));
+    TickType_t wait = M2T(cfgSupervisorMs > 0 ? cfgSupervisorMs : 1);
+    if (st == QI_KICK) {
+      const TickType_t now = xTaskGetTickCount();
+      const TickType_t left = (TickType_t)(kickEnd - now);
+      wait = ((int32_t)left <= 0) ? 0 : (left < wait ? left : wait);
+    }
+    if (mockRemaining < wait) {
+      wait = mockRemaining;
+    }
+    ulTaskNotifyTake(pdTRUE, wait);
+    lgWakeups++;
 
     if (!cfgEnable) {
       if (st != QI_IDLE) {
@@ -162,14 +215,26 @@ static void customQiTask(void *arg) {
 
     const bool chg = detectCharging();
     const bool shouldRun = (cfgForceRun != 0) || chg;
+    const TickType_t now = xTaskGetTickCount();
 
     switch (st) {
       case QI_IDLE:
         if (shouldRun) {
           paramSetInt(idMpEnable, 1);                         // Bypass an
           setMotorRawAll(pctToRaw(cfgKickPct));               // Kick
-          vTaskDelay(M2T(cfgKickMs));
-          setMotorRawAll(pctToRaw(cfgHoldPct));               // Halte-PWM
+          kickEnd = now + M2T(cfgKickMs);                     // zeitgesteuert statt vTaskDelay
+          st = QI_KICK; lgState = st;
+        }
+        break;
+
+      case QI_KICK:
+        if (!shouldRun) {
+          motorsStopAll();
+          paramSetInt(idMpEnable, 0);
+          st = QI_IDLE; lgState = st;
+          DEBUG_PRINT("[CUSTOM_QI] kick aborted -> IDLE\n");
+        } else if ((int32_t)(now - kickEnd) >= 0) {
+          motorsApplyRaw(pctToRaw(cfgHoldPct));               // Halte-PWM
           st = QI_RUNNING; lgState = st;
           DEBUG_PRINT("[CUSTOM_QI] -> RUN (chg=%d, force=%d)\n", chg, cfgForceRun);
         }
@@ -182,8 +247,8 @@ static void customQiTask(void *arg) {
           st = QI_IDLE; lgState = st;
           DEBUG_PRINT("[CUSTOM_QI] -> IDLE\n");
         } else {
-          // Halte-PWM regelmäßig setzen (robust ggü. Überschreiben)
-          setMotorRawAll(pctToRaw(cfgHoldPct));
+          // Halte-PWM nur bei Änderung oder Überschreiben neu setzen
+          motorsApplyRaw(pctToRaw(cfgHoldPct));
         }
         break;
     }
@@ -215,7 +280,7 @@ static void __attribute__((used)) customQiInit(DeckInfo *info) {
 
   // Task starten
   xTaskCreate(customQiTask, "custom_qi", configMINIMAL_STACK_SIZE*2,
-              NULL, tskIDLE_PRIORITY + 1, NULL);
+              NULL, tskIDLE_PRIORITY + 1, &qiTaskHandle);
 
   DEBUG_PRINT("[CUSTOM_QI] driver initialized\n");
 }